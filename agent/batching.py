@@ -0,0 +1,90 @@
+"""Batching of platform actions issued together.
+
+When one LLM turn calls several tools at once (lookup_patient +
+check_availability, get_account_snapshot + check_benefits...), LiveKit runs
+them concurrently and each used to be its own POST. Reads submitted within
+`window` seconds of each other now go out as ONE request (writes are never
+batched — a failed batch can't say which of them ran):
+
+  POST /voice-engine/actions  {"actions": [<action body>, ...]}
+  →                           {"results": [<action result>, ...]}  (same order)
+
+and each awaiting tool gets its own result back. Batching is only used while
+the platform advertises it (the X-Omnira-Actions-Batch response header, see
+agent/http_client.py); otherwise, or for a lone action, the plain
+single-action request is sent as before.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from agent.log_pipeline import HIGH_VOLUME, Lazy
+
+logger = logging.getLogger("omnira-batching")
+
+SendOne = Callable[[dict], Awaitable[dict]]
+# Returns None when the platform rejects the batch format (nothing executed)
+SendBatch = Callable[[list[dict]], Awaitable[list[dict] | None]]
+
+
+class ActionBatcher:
+    """Collects concurrent action bodies and flushes them as one request."""
+
+    def __init__(self, send_one: SendOne, send_batch: SendBatch, window: float = 0.015):
+        self.send_one = send_one
+        self.send_batch = send_batch
+        self.window = window
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"requests": 0, "batches": 0, "batched_actions": 0, "fallbacks": 0}
+
+    async def submit(self, body: dict, max_size: int) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((body, future))
+        if len(self._pending) >= max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # A tool cancelled before the flush never reaches the platform
+        pending = [(body, future) for body, future in self._pending if not future.done()]
+        self._pending = []
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._send(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, pending: list[tuple[dict, asyncio.Future]]) -> None:
+        bodies = [body for body, _ in pending]
+        try:
+            self.stats["requests"] += 1
+            if len(bodies) == 1:
+                results = [await self.send_one(bodies[0])]
+            else:
+                results = await self.send_batch(bodies)
+                if results is None:
+                    self.stats["fallbacks"] += 1
+                    self.stats["requests"] += len(bodies)
+                    results = await asyncio.gather(*(self.send_one(body) for body in bodies))
+                else:
+                    self.stats["batches"] += 1
+                    self.stats["batched_actions"] += len(bodies)
+                    logger.info(
+                        "Batched %d actions: %s", len(bodies), Lazy(", ".join, [b["action"] for b in bodies]),
+                        extra=HIGH_VOLUME,
+                    )
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
@@ -7,7 +7,16 @@ the verification gate server-side (spec 59): the call_session_id travels on
 EVERY action so the platform, not the LLM, decides what may be disclosed.
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from agent.config import PracticeConfig
+    from agent.latency import TurnLatency
+    from agent.prefetch import AvailabilityPrefetch
+    from agent.slots import SlotEngine
+    from agent.tool_cache import ToolCache
+    from agent.tool_results import ToolTokens
 
 
 @dataclass
@@ -19,6 +28,18 @@ class CallContext:
     # server keeps the authoritative state).
     recognized_first_name: str = ""
     recent_call_topic: str = ""
+    # The call's per-turn latency recorder (CallLogger.latency), so platform
+    # round trips show up as tool spans
+    latency: "TurnLatency | None" = None
+    # Availability fetched speculatively at call start (agent/prefetch.py)
+    availability: "AvailabilityPrefetch | None" = None
+    # Read results reused within the call (agent/tool_cache.py)
+    tool_cache: "ToolCache | None" = None
+    # Local slot engine over the synced schedule snapshot (agent/slots.py)
+    slots: "SlotEngine | None" = None
+    # Estimated tokens tool results add to the LLM context (agent/tool_results.py)
+    tool_tokens: "ToolTokens | None" = None
+    practice_config: "PracticeConfig | None" = None
 
     def reset(self) -> None:
         self.call_id = ""
@@ -26,6 +47,12 @@ class CallContext:
         self.caller_number = ""
         self.recognized_first_name = ""
         self.recent_call_topic = ""
+        self.latency = None
+        self.availability = None
+        self.tool_cache = None
+        self.slots = None
+        self.tool_tokens = None
+        self.practice_config = None
 
 
 current_call = CallContext()
@@ -0,0 +1,101 @@
+"""Wire formats for the post-call webhook.
+
+CallLogger.get_full_payload() builds the v1 record: every event carries an
+ISO timestamp, and the transcript text and tool_calls list repeat what the
+events already say. That record is what the spool stores and what any
+endpoint accepts. When the webhook advertises it, delivery instead sends
+
+  omnira-call/2   the same record minus "transcript" and "tool_calls"
+                  (the platform rebuilds both from the events), each event
+                  as [offset_ms, type] or [offset_ms, type, {data}] with the
+                  offset from started_at
+
+compressed with the best Content-Encoding the endpoint accepts (zstd when
+the zstandard package is installed, else gzip). The endpoint advertises on
+its responses (and on a HEAD probed at call setup):
+
+  X-Omnira-Payload-Formats: omnira-call/1, omnira-call/2
+  Accept-Encoding: zstd, gzip          (RFC 7694)
+  X-Omnira-Webhook-Deltas: 1           events may be streamed during the
+                                       call (agent/logger.py)
+"""
+import gzip
+import json
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:  # optional — gzip is always available
+    zstandard = None
+
+FULL_FORMAT = "omnira-call/1"
+COMPACT_FORMAT = "omnira-call/2"
+
+# Response header listing the formats the webhook accepts; request header
+# naming the format of the body sent
+FORMATS_HEADER = "x-omnira-payload-formats"
+FORMAT_HEADER = "x-omnira-payload-format"
+
+# Bodies smaller than this go out uncompressed — the framing costs more
+# than it saves
+MIN_COMPRESS_BYTES = 1024
+
+# Derived server-side from the events in the compact format
+_DERIVED_KEYS = ("transcript", "tool_calls")
+
+
+def _parse_time(value) -> datetime | None:
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def compact_events(events: list[dict], started_at: str) -> list[list]:
+    """Events as [offset_ms, type] / [offset_ms, type, {data}] from started_at."""
+    base = _parse_time(started_at)
+    compact = []
+    for event in events:
+        data = dict(event)
+        at = _parse_time(data.pop("timestamp", None))
+        kind = data.pop("type", "")
+        offset = round((at - base).total_seconds() * 1000) if at and base else None
+        compact.append([offset, kind, data] if data else [offset, kind])
+    return compact
+
+
+def compact_payload(payload: dict) -> dict:
+    """The omnira-call/2 form of a get_full_payload() record."""
+    compact = {k: v for k, v in payload.items() if k not in _DERIVED_KEYS}
+    compact["format"] = COMPACT_FORMAT
+    compact["events"] = compact_events(payload.get("events", []), payload.get("started_at"))
+    return compact
+
+
+def header_values(value: str | None) -> list[str]:
+    """Comma-separated header tokens, lower-cased, q-values dropped."""
+    if not value:
+        return []
+    return [token.split(";")[0].strip().lower() for token in value.split(",") if token.strip()]
+
+
+def choose_encoding(accepted: list[str]) -> str:
+    """Best Content-Encoding both sides support ("" for none)."""
+    if "zstd" in accepted and zstandard is not None:
+        return "zstd"
+    if "gzip" in accepted:
+        return "gzip"
+    return ""
+
+
+def dumps(body) -> bytes:
+    return json.dumps(body, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+
+
+def encode(data: bytes, encoding: str) -> tuple[bytes, str]:
+    """Compress a JSON body; returns it with the encoding actually applied."""
+    if not encoding or len(data) < MIN_COMPRESS_BYTES:
+        return data, ""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data), "zstd"
+    return gzip.compress(data, compresslevel=6), "gzip"
@@ -4,7 +4,7 @@ import logging
 from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
-import httpx
+from agent.config_cache import PracticeConfigCache
 
 load_dotenv()
 
@@ -52,6 +52,128 @@ class Config:
     AGENT_NAME = os.getenv("AGENT_NAME", "Relay")
     TTS_PROVIDER = os.getenv("TTS_PROVIDER", "elevenlabs")
 
+    # Kokoro (self-hosted kokoro-web). Streams raw PCM unless
+    # KOKORO_RESPONSE_FORMAT=mp3 / KOKORO_STREAM=false. Only used when a base
+    # URL is set — otherwise tts_provider "kokoro" falls back to Deepgram
+    KOKORO_BASE_URL = os.getenv("KOKORO_BASE_URL", "")
+    KOKORO_API_KEY = os.getenv("KOKORO_API_KEY", "kokoro-local-key")
+    KOKORO_VOICE = os.getenv("KOKORO_VOICE", "af_heart")
+    KOKORO_RESPONSE_FORMAT = os.getenv("KOKORO_RESPONSE_FORMAT", "pcm")
+    KOKORO_STREAM = os.getenv("KOKORO_STREAM", "true").lower() != "false"
+    # Several replicas (comma-separated) are load-balanced; each gets at most
+    # MAX_CONCURRENCY requests host-wide, extra requests wait up to
+    # QUEUE_TIMEOUT seconds (at most MAX_QUEUE waiting per process)
+    KOKORO_BASE_URLS = [
+        url.strip() for url in os.getenv("KOKORO_BASE_URLS", KOKORO_BASE_URL).split(",") if url.strip()
+    ]
+    KOKORO_MAX_CONCURRENCY = int(os.getenv("KOKORO_MAX_CONCURRENCY", "2"))
+    KOKORO_MAX_QUEUE = int(os.getenv("KOKORO_MAX_QUEUE", "8"))
+    KOKORO_QUEUE_TIMEOUT = float(os.getenv("KOKORO_QUEUE_TIMEOUT", "2.0"))
+
+    # Host-local cache directory shared by all job processes
+    CACHE_DIR = os.getenv("OMNIRA_CACHE_DIR", "/tmp/omnira-cache")
+    # Practice config: fresh for TTL seconds, then served stale while a
+    # background refresh runs, up to STALE_TTL seconds old
+    PRACTICE_CONFIG_TTL = float(os.getenv("PRACTICE_CONFIG_TTL", "300"))
+    PRACTICE_CONFIG_STALE_TTL = float(os.getenv("PRACTICE_CONFIG_STALE_TTL", "86400"))
+
+    # Knowledge bases longer than this (chars) are indexed and searched via
+    # the search_knowledge_base tool instead of being pasted into the prompt
+    KB_INLINE_MAX_CHARS = int(os.getenv("KB_INLINE_MAX_CHARS", "3000"))
+
+    # Synthesized-phrase cache in front of the TTS (tts/phrase_cache.py).
+    # Sentences up to MAX_CHARS are cached; memory is per process, disk is
+    # shared under CACHE_DIR/tts-phrases
+    TTS_PHRASE_CACHE = os.getenv("TTS_PHRASE_CACHE", "true").lower() != "false"
+    TTS_PHRASE_CACHE_MAX_CHARS = int(os.getenv("TTS_PHRASE_CACHE_MAX_CHARS", "200"))
+    TTS_PHRASE_CACHE_MEMORY_MB = int(os.getenv("TTS_PHRASE_CACHE_MEMORY_MB", "32"))
+    TTS_PHRASE_CACHE_DISK_MB = int(os.getenv("TTS_PHRASE_CACHE_DISK_MB", "256"))
+
+    # Availability for today / tomorrow / next Monday is fetched at call
+    # start for these procedure types and served from memory for TTL seconds
+    AVAILABILITY_PREFETCH = os.getenv("AVAILABILITY_PREFETCH", "true").lower() != "false"
+    AVAILABILITY_PREFETCH_TTL = float(os.getenv("AVAILABILITY_PREFETCH_TTL", "120"))
+    AVAILABILITY_PREFETCH_PROCEDURES = [
+        p.strip() for p in os.getenv("AVAILABILITY_PREFETCH_PROCEDURES", "general,cleaning").split(",") if p.strip()
+    ]
+
+    # Successful read actions are reused within a call for TOOL_CACHE_TTL
+    # seconds (availability for AVAILABILITY_PREFETCH_TTL); writes invalidate
+    TOOL_CACHE = os.getenv("TOOL_CACHE", "true").lower() != "false"
+    TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "300"))
+
+    # Actions issued within ACTION_BATCH_WINDOW_MS of each other share one
+    # request, when the platform advertises batching (X-Omnira-Actions-Batch)
+    ACTION_BATCHING = os.getenv("ACTION_BATCHING", "true").lower() != "false"
+    ACTION_BATCH_WINDOW_MS = float(os.getenv("ACTION_BATCH_WINDOW_MS", "15"))
+    ACTION_BATCH_MAX = int(os.getenv("ACTION_BATCH_MAX", "8"))
+
+    # Reads slower than their recent p95 get a duplicate request raced
+    # against them; an action failing CIRCUIT_FAILURES times in a row fails
+    # fast with a spoken fallback for CIRCUIT_COOLDOWN seconds. Both are
+    # shared host-wide through CACHE_DIR/action-health.json
+    HEDGED_READS = os.getenv("HEDGED_READS", "true").lower() != "false"
+    CIRCUIT_FAILURES = int(os.getenv("CIRCUIT_FAILURES", "3"))
+    CIRCUIT_COOLDOWN = float(os.getenv("CIRCUIT_COOLDOWN", "20"))
+
+    # send_sms / send_confirmation_email / log_message are queued in a SQLite
+    # outbox under CACHE_DIR and delivered in the background; at call end the
+    # job spends up to OUTBOX_DRAIN_TIMEOUT seconds flushing it
+    OUTBOX = os.getenv("OUTBOX", "true").lower() != "false"
+    OUTBOX_DRAIN_TIMEOUT = float(os.getenv("OUTBOX_DRAIN_TIMEOUT", "10"))
+
+    # Post-call records are spooled under CACHE_DIR before hangup handling;
+    # the ending call waits up to POST_CALL_DRAIN_TIMEOUT for delivery, then
+    # the drainer (any job process on the host) retries, up to
+    # POST_CALL_BATCH_MAX records per pass, split into concurrent requests
+    # of the webhook's advertised batch limit
+    POST_CALL_SPOOL = os.getenv("POST_CALL_SPOOL", "true").lower() != "false"
+    POST_CALL_DRAIN_TIMEOUT = float(os.getenv("POST_CALL_DRAIN_TIMEOUT", "8"))
+    POST_CALL_BATCH_MAX = int(os.getenv("POST_CALL_BATCH_MAX", "10"))
+    # Send the compact omnira-call/2 record, gzip/zstd-compressed, when the
+    # webhook advertises it (agent/call_payload.py); plain JSON otherwise
+    POST_CALL_COMPACT = os.getenv("POST_CALL_COMPACT", "true").lower() != "false"
+
+    # Stream call events to the platform while the call runs (when the
+    # webhook advertises it), every TRANSCRIPT_FLUSH_INTERVAL seconds or
+    # TRANSCRIPT_FLUSH_EVENTS new events — a crashed job loses only the
+    # last few seconds and the post-call record carries just the tail
+    TRANSCRIPT_STREAMING = os.getenv("TRANSCRIPT_STREAMING", "true").lower() != "false"
+    TRANSCRIPT_FLUSH_INTERVAL = float(os.getenv("TRANSCRIPT_FLUSH_INTERVAL", "5"))
+    TRANSCRIPT_FLUSH_EVENTS = int(os.getenv("TRANSCRIPT_FLUSH_EVENTS", "20"))
+    # Most events a call keeps in memory; past it the oldest (already
+    # streamed, when streaming) are dropped
+    CALL_EVENTS_MAX = int(os.getenv("CALL_EVENTS_MAX", "5000"))
+
+    # check_availability is answered locally from a schedule snapshot synced
+    # at call start (SLOT_ENGINE_DAYS ahead, re-synced after SLOT_SNAPSHOT_TTL)
+    SLOT_ENGINE = os.getenv("SLOT_ENGINE", "true").lower() != "false"
+    SLOT_ENGINE_DAYS = int(os.getenv("SLOT_ENGINE_DAYS", "21"))
+    SLOT_SNAPSHOT_TTL = float(os.getenv("SLOT_SNAPSHOT_TTL", "300"))
+    SLOT_GRANULARITY_MINUTES = int(os.getenv("SLOT_GRANULARITY_MINUTES", "5"))
+    SLOT_INCREMENT_MINUTES = int(os.getenv("SLOT_INCREMENT_MINUTES", "15"))
+
+    # Tool results are projected to speakable fields and compact JSON before
+    # they enter the LLM context; slot lists keep TOOL_RESULT_SLOT_GROUPS
+    # date/provider groups
+    COMPACT_TOOL_RESULTS = os.getenv("COMPACT_TOOL_RESULTS", "true").lower() != "false"
+    TOOL_RESULT_SLOT_GROUPS = int(os.getenv("TOOL_RESULT_SLOT_GROUPS", "6"))
+
+    # Hard deadlines (seconds) for optional call-setup phases — past these
+    # the call proceeds without caller recognition / recording
+    RECOGNITION_DEADLINE = float(os.getenv("RECOGNITION_DEADLINE", "2.5"))
+    RECORDING_DEADLINE = float(os.getenv("RECORDING_DEADLINE", "5.0"))
+
+    # Logging is queued on the event loop and written by a listener thread
+    # (agent/log_pipeline.py). LOG_FORMAT (json | text) applies when LiveKit
+    # hasn't installed its own handler; per-utterance / per-tool-call lines
+    # are sampled at LOG_SAMPLE_RATE and capped at LOG_RATE_LIMIT lines per
+    # second per call site (0 = no cap)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+    LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", "20"))
+
 
 @dataclass
 class PracticeConfig:
@@ -86,43 +208,70 @@ class PracticeConfig:
             tts_provider=Config.TTS_PROVIDER,
         )
 
+    @classmethod
+    def from_dict(cls, data: dict, practice_id: str = "") -> "PracticeConfig":
+        """Build from a /voice-engine/practice-config response body."""
+        return cls(
+            practice_id=data.get("practice_id", practice_id),
+            practice_name=data.get("practice_name", Config.PRACTICE_NAME),
+            practice_phone=data.get("practice_phone", Config.PRACTICE_PHONE),
+            practice_timezone=data.get("practice_timezone", Config.PRACTICE_TIMEZONE),
+            practice_hours=data.get("practice_hours", Config.PRACTICE_HOURS),
+            practice_address=data.get("practice_address", Config.PRACTICE_ADDRESS),
+            practice_website=data.get("practice_website", ""),
+            emergency_info=data.get("emergency_info", ""),
+            agent_name=data.get("agent_name", Config.AGENT_NAME),
+            tts_provider=data.get("tts_provider", Config.TTS_PROVIDER),
+            tts_voice_id=data.get("tts_voice_id", ""),
+            knowledge_base=data.get("knowledge_base", ""),
+            operating_hours=data.get("operating_hours", []),
+            providers=data.get("providers", []),
+            services=data.get("services", []),
+        )
+
+    @staticmethod
+    async def _fetch_remote(params: dict) -> dict | None:
+        """GET /voice-engine/practice-config; None on any non-JSON/non-200."""
+        from agent.http_client import get_client, timeout_for
+
+        resp = await get_client().get(
+            f"{Config.OMNIRA_API_URL}/voice-engine/practice-config",
+            params=params,
+            timeout=timeout_for("practice_config"),
+        )
+        if resp.status_code == 200 and resp.headers.get("content-type", "").startswith("application/json"):
+            return resp.json()
+        logger.warning(f"Failed to fetch config for {params}: {resp.status_code}")
+        return None
+
     @classmethod
     async def fetch(cls, practice_id: str) -> "PracticeConfig":
-        """Fetch practice config from Omnira API."""
-        url = f"{Config.OMNIRA_API_URL}/voice-engine/practice-config"
-        try:
-            async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-                resp = await client.get(
-                    url,
-                    params={"practice_id": practice_id},
-                    headers={
-                        "Authorization": f"Bearer {Config.OMNIRA_API_KEY}",
-                    },
-                )
-                if resp.status_code == 200 and resp.headers.get("content-type", "").startswith("application/json"):
-                    data = resp.json()
-                    return cls(
-                        practice_id=data.get("practice_id", practice_id),
-                        practice_name=data.get("practice_name", Config.PRACTICE_NAME),
-                        practice_phone=data.get("practice_phone", Config.PRACTICE_PHONE),
-                        practice_timezone=data.get("practice_timezone", Config.PRACTICE_TIMEZONE),
-                        practice_hours=data.get("practice_hours", Config.PRACTICE_HOURS),
-                        practice_address=data.get("practice_address", Config.PRACTICE_ADDRESS),
-                        practice_website=data.get("practice_website", ""),
-                        emergency_info=data.get("emergency_info", ""),
-                        agent_name=data.get("agent_name", Config.AGENT_NAME),
-                        tts_provider=data.get("tts_provider", Config.TTS_PROVIDER),
-                        tts_voice_id=data.get("tts_voice_id", ""),
-                        knowledge_base=data.get("knowledge_base", ""),
-                        operating_hours=data.get("operating_hours", []),
-                        providers=data.get("providers", []),
-                        services=data.get("services", []),
-                    )
-                else:
-                    logger.warning(f"Failed to fetch config for {practice_id}: {resp.status_code}")
-        except Exception as e:
-            logger.error(f"Config fetch failed for {practice_id}: {e}")
+        """Fetch practice config via the cache (see agent/config_cache.py)."""
+        data = await practice_config_cache.get(
+            f"id:{practice_id}",
+            lambda: cls._fetch_remote({"practice_id": practice_id}),
+        )
+        if data is not None:
+            return cls.from_dict(data, practice_id)
 
+        logger.error(f"Config fetch failed for {practice_id} and nothing cached — using env fallback")
         fallback = cls.from_env()
         fallback.practice_id = practice_id
         return fallback
+
+    @classmethod
+    async def fetch_by_phone(cls, phone_number: str) -> "PracticeConfig | None":
+        """Resolve a practice from the number that was called."""
+        data = await practice_config_cache.get(
+            f"phone:{phone_number}",
+            lambda: cls._fetch_remote({"phone_number": phone_number}),
+            alias_keys=lambda d: [f"id:{d['practice_id']}"] if d.get("practice_id") else [],
+        )
+        return cls.from_dict(data) if data is not None else None
+
+
+practice_config_cache = PracticeConfigCache(
+    path=os.path.join(Config.CACHE_DIR, "practice-config.json"),
+    ttl=Config.PRACTICE_CONFIG_TTL,
+    stale_ttl=Config.PRACTICE_CONFIG_STALE_TTL,
+)
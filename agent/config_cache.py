@@ -0,0 +1,211 @@
+"""Practice-config cache — TTL + stale-while-revalidate, persisted to disk.
+
+The config fetch sits between "phone rings" and "caller hears a greeting",
+so a slow Vercel cold start used to become ring time. Entries are keyed by
+practice_id ("id:<practice_id>") and by called number ("phone:<number>"):
+
+  - fresh (age < ttl)          → served from memory, no network
+  - stale (age < stale_ttl)    → served immediately, refreshed in background
+  - expired                    → refetch with a deadline; if the platform is
+                                 slow or down, the last-known-good copy still
+                                 wins over the env fallback
+
+The cache file is shared by every job process on the host so a freshly
+spawned process starts warm.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("omnira-config-cache")
+
+Fetcher = Callable[[], Awaitable[dict | None]]
+
+
+class PracticeConfigCache:
+    """LRU of raw practice-config dicts (the API response shape)."""
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 300.0,
+        stale_ttl: float = 86400.0,
+        max_entries: int = 256,
+        fetch_deadline: float = 3.0,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.fetch_deadline = fetch_deadline
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._loaded = False
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._writer: asyncio.Task | None = None
+        self._dirty = False
+        self.stats = {"fresh": 0, "stale": 0, "miss": 0, "last_known_good": 0, "refresh_failed": 0}
+
+    # ── persistence ──────────────────────────────────────────────────────
+    #
+    # The file holds up to max_entries configs (knowledge bases included), so
+    # reading, merging and rewriting it happens in a worker thread: once
+    # before the first lookup, and after puts via a single background writer.
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                on_disk = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable config cache {self.path}: {e}")
+            return {}
+        if not isinstance(on_disk, dict):
+            return {}
+        return {
+            key: entry
+            for key, entry in on_disk.items()
+            if isinstance(entry, dict) and "data" in entry and "fetched_at" in entry
+        }
+
+    def _merge(self, on_disk: dict) -> None:
+        for key, entry in on_disk.items():
+            current = self._entries.get(key)
+            if current is None or current["fetched_at"] < entry["fetched_at"]:
+                self._entries[key] = entry
+        self._evict()
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        on_disk = await asyncio.to_thread(self._read)
+        self._merge(on_disk)
+        if on_disk:
+            logger.info(f"Loaded {len(on_disk)} cached practice config(s) from {self.path}")
+
+    def _persist(self, entries: dict) -> dict:
+        """Worker thread: merge with whatever other job processes wrote since,
+        then replace atomically so a reader never sees a half-written file."""
+        merged = OrderedDict(self._read())
+        for key, entry in entries.items():
+            current = merged.get(key)
+            if current is None or current["fetched_at"] <= entry["fetched_at"]:
+                merged[key] = entry
+                merged.move_to_end(key)
+        while len(merged) > self.max_entries:
+            merged.popitem(last=False)
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".practice-config-")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(merged, f)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            logger.warning(f"Could not persist config cache to {self.path}: {e}")
+        return merged
+
+    def _schedule_save(self) -> None:
+        self._dirty = True
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._save())
+
+    async def _save(self) -> None:
+        # Puts that land while a write is running are picked up by one more pass
+        while self._dirty:
+            self._dirty = False
+            merged = await asyncio.to_thread(self._persist, dict(self._entries))
+            self._merge(merged)
+
+    async def flush(self) -> None:
+        """Wait for pending writes (call before the process exits)."""
+        if self._writer is not None:
+            await asyncio.shield(self._writer)
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ── lookups ──────────────────────────────────────────────────────────
+
+    def peek(self, key: str) -> tuple[dict | None, float]:
+        """Return (data, age_seconds) without touching the network or disk."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, float("inf")
+        self._entries.move_to_end(key)
+        return entry["data"], time.time() - entry["fetched_at"]
+
+    def put(self, data: dict, *keys: str) -> None:
+        now = time.time()
+        for key in keys:
+            if not key:
+                continue
+            self._entries[key] = {"data": data, "fetched_at": now}
+            self._entries.move_to_end(key)
+        self._evict()
+        self._schedule_save()
+
+    async def get(self, key: str, fetcher: Fetcher, alias_keys: Callable[[dict], list[str]] | None = None) -> dict | None:
+        """Resolve `key`, calling `fetcher` only when the cache can't answer.
+
+        `alias_keys` maps fetched data to extra keys to store it under (e.g. a
+        phone lookup also fills the practice_id entry). Returns None only
+        when there is no cached copy AND the fetch failed.
+        """
+        await self._ensure_loaded()
+        data, age = self.peek(key)
+
+        if data is not None and age < self.ttl:
+            self.stats["fresh"] += 1
+            return data
+
+        if data is not None and age < self.stale_ttl:
+            self.stats["stale"] += 1
+            self._refresh_in_background(key, fetcher, alias_keys)
+            return data
+
+        self.stats["miss"] += 1
+        try:
+            fresh = await asyncio.wait_for(fetcher(), timeout=self.fetch_deadline if data is not None else None)
+        except Exception as e:
+            logger.warning(f"Config fetch for {key} failed: {type(e).__name__}: {e}")
+            fresh = None
+
+        if fresh is not None:
+            self.put(fresh, key, *(alias_keys(fresh) if alias_keys else []))
+            return fresh
+        if data is not None:
+            self.stats["last_known_good"] += 1
+            logger.warning(f"Serving last-known-good config for {key} (age {age:.0f}s)")
+            return data
+        return None
+
+    def _refresh_in_background(self, key: str, fetcher: Fetcher, alias_keys) -> None:
+        if key in self._refreshing:
+            return
+
+        async def _refresh() -> None:
+            try:
+                fresh = await fetcher()
+                if fresh is not None:
+                    self.put(fresh, key, *(alias_keys(fresh) if alias_keys else []))
+                else:
+                    self.stats["refresh_failed"] += 1
+            except Exception as e:
+                self.stats["refresh_failed"] += 1
+                logger.warning(f"Background config refresh for {key} failed: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(_refresh())
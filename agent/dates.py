@@ -0,0 +1,274 @@
+"""Local resolution of spoken dates for check_availability.
+
+The LLM used to forward whatever the caller said ("next Tuesday", "the
+21st") and the platform answered empty for anything it couldn't parse or
+that fell on a closed day, costing another LLM turn each time. Dates are
+now resolved here, in the practice's timezone, before any network call:
+
+  - single days: ISO dates, today / tomorrow / day after tomorrow,
+    weekdays ("Tuesday", "this Tuesday", "next Tuesday"), "October 21st",
+    "the 21st", "10/21", "in 3 days"
+  - ranges: "Tuesday through Friday", "between the 21st and the 24th",
+    "this week", "next week", "early next week", "later this week",
+    "this weekend", "the next few days"
+
+Weekday words follow the system prompt: a bare "Monday" is the next
+upcoming Monday, "next Tuesday" is the Tuesday of the week starting next
+Monday. Closed days (operating_hours, else the practice_hours text when it
+can be read in full) are dropped, and a request that lands only on closed
+days moves to the next open day, so one tool call can cover a whole range of open business days.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from agent.config import PracticeConfig
+from agent.prompts import _next_monday, _now_for
+from agent.slots import _hours_by_weekday
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_MONTHS = [
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+]
+_NUMBERS = {"a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "ten": 10, "couple": 2}
+
+_WEEKDAY_RE = r"(mon|tue|tues|wed|weds|thu|thur|thurs|fri|sat|sun)(?:day|nesday|sday|urday|rsday)?"
+_MONTH_RE = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_RANGE_SPLIT = re.compile(r"\s+(?:through|thru|to|until|till|and)\s+|\s*[–—]\s*|\s+-\s+|(?<=[a-z])-(?=[a-z])")
+
+MAX_RANGE_DAYS = 14
+
+# Hours-text words naming several days at once
+_DAY_WORDS = [
+    (re.compile(r"\b(?:daily|every ?day|7 days|seven days|all week)\b"), range(7)),
+    (re.compile(r"\bweek ?days?\b"), range(5)),
+    (re.compile(r"\bweek ?ends?\b"), (5, 6)),
+]
+_DAY_SPAN_RE = re.compile(
+    r"\b" + _WEEKDAY_RE + r"s?\b(?:\s*(?:[-–]|to|through|thru)\s*\b" + _WEEKDAY_RE + r"s?\b)?"
+)
+# Words an hours segment may carry besides its days and times
+_HOURS_FILLER = frozenset({
+    "open", "from", "to", "through", "thru", "until", "till", "and", "am", "pm", "a", "m", "p",
+    "noon", "midnight", "hours", "only", "week",
+})
+
+
+@dataclass
+class ResolvedDates:
+    dates: list[date]  # open business days to check, in order
+    closed: list[date] = field(default_factory=list)  # requested days the office is closed
+    moved: bool = False  # every requested day was closed; `dates` is the next open day
+
+
+def _weekday_index(token: str) -> int | None:
+    token = token.lower()[:3]
+    for i, name in enumerate(_WEEKDAYS):
+        if name.startswith(token):
+            return i
+    return None
+
+
+def _month_index(token: str) -> int | None:
+    token = token.lower()[:3]
+    for i, name in enumerate(_MONTHS):
+        if name.startswith(token):
+            return i + 1
+    return None
+
+
+def open_weekdays(config: PracticeConfig) -> set[int] | None:
+    """date.weekday() values the practice is open, from operating_hours or the practice_hours text.
+
+    None when the text isn't fully understood — then no day counts as closed
+    rather than guessing and telling a caller the office is shut.
+    """
+    hours = _hours_by_weekday(config.operating_hours)
+    if hours:
+        return set(hours)
+    days: set[int] = set()
+    closed: set[int] = set()
+    for segment in re.split(r"[,;\n]", (config.practice_hours or "").lower()):
+        found: set[int] = set()
+        for pattern, span in _DAY_WORDS:
+            if pattern.search(segment):
+                found.update(span)
+                segment = pattern.sub(" ", segment)
+        for match in _DAY_SPAN_RE.finditer(segment):
+            first, last = _weekday_index(match.group(1)), _weekday_index(match.group(2) or match.group(1))
+            if first is None or last is None:
+                return None
+            found.update((first + i) % 7 for i in range((last - first) % 7 + 1))
+        segment = _DAY_SPAN_RE.sub(" ", segment)
+        words = set(re.findall(r"[a-z]+", segment))
+        if words - _HOURS_FILLER - {"closed"}:
+            return None  # "by appointment Thursdays", "M-F", "alternate Saturdays"...
+        (closed if "closed" in words else days).update(found)
+    return (days - closed) or None
+
+
+def _clean(text: str) -> str:
+    text = text.lower().strip().rstrip(".?!")
+    text = re.sub(r"\b(?:on|the|of|for|sometime|any ?time|any ?day|maybe|like|um|uh)\b", " ", text)
+    return re.sub(r"\s+", " ", text.replace(",", " ")).strip()
+
+
+def _with_year(month: int, day: int, today: date, year: int | None = None) -> date | None:
+    try:
+        candidate = date(year or today.year, month, day)
+    except ValueError:
+        return None
+    if year is None and candidate < today:
+        try:
+            candidate = date(today.year + 1, month, day)
+        except ValueError:
+            return None
+    return candidate
+
+
+def parse_day(text: str, today: date) -> date | None:
+    """One spoken or written date → a concrete date (None if not understood)."""
+    raw = text.strip()
+    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", raw):
+        try:
+            return date.fromisoformat(raw)
+        except ValueError:
+            return None
+    text = _clean(raw)
+    if text in ("today", "tonight", "this morning", "this afternoon"):
+        return today
+    if text in ("tomorrow", "tomorrow morning", "tomorrow afternoon"):
+        return today + timedelta(days=1)
+    if text in ("day after tomorrow", "day after"):
+        return today + timedelta(days=2)
+
+    match = re.fullmatch(r"in (\d+|[a-z]+) (day|days|week|weeks)", text)
+    if match:
+        count = int(match.group(1)) if match.group(1).isdigit() else _NUMBERS.get(match.group(1))
+        if count is not None:
+            return today + timedelta(days=count * (7 if match.group(2).startswith("week") else 1))
+
+    match = re.fullmatch(r"(this|next|coming)?\s*" + _WEEKDAY_RE + r"(?:\s+(morning|afternoon|evening))?(\s+after next)?", text)
+    if match:
+        weekday = _weekday_index(match.group(2))
+        if weekday is None:
+            return None
+        qualifier = match.group(1)
+        if qualifier == "next":
+            # The week starting next Monday (matches the prompt's "next week")
+            monday = date.fromisoformat(_next_monday(today.isoformat()))
+            result = monday + timedelta(days=weekday)
+        elif qualifier == "this":
+            result = today + timedelta(days=(weekday - today.weekday()) % 7)
+        else:
+            result = today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+        return result + timedelta(days=7) if match.group(4) else result
+
+    # "October 21st", "oct 21 2026"
+    match = re.fullmatch(_MONTH_RE + r"\s+(\d{1,2})(?:st|nd|rd|th)?(?:\s+(\d{4}))?", text)
+    if match:
+        month = _month_index(match.group(1))
+        return _with_year(month, int(match.group(2)), today, int(match.group(3)) if match.group(3) else None) if month else None
+    # "21st October"
+    match = re.fullmatch(r"(\d{1,2})(?:st|nd|rd|th)?\s+" + _MONTH_RE + r"(?:\s+(\d{4}))?", text)
+    if match:
+        month = _month_index(match.group(2))
+        return _with_year(month, int(match.group(1)), today, int(match.group(3)) if match.group(3) else None) if month else None
+    # "10/21", "10/21/2026"
+    match = re.fullmatch(r"(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?", text)
+    if match:
+        year = int(match.group(3)) if match.group(3) else None
+        if year is not None and year < 100:
+            year += 2000
+        return _with_year(int(match.group(1)), int(match.group(2)), today, year)
+    # "the 21st" — this month, or next month if it's already passed
+    match = re.fullmatch(r"(\d{1,2})(?:st|nd|rd|th)", text)
+    if match:
+        day = int(match.group(1))
+        month_start = today.replace(day=1)
+        for offset in (0, 1):
+            month = (month_start.month - 1 + offset) % 12 + 1
+            year = month_start.year + (month_start.month - 1 + offset) // 12
+            try:
+                candidate = date(year, month, day)
+            except ValueError:
+                continue
+            if candidate >= today:
+                return candidate
+    return None
+
+
+def parse_span(text: str, today: date) -> tuple[date, date] | None:
+    """A date or a range → (first, last), inclusive."""
+    cleaned = _clean(text)
+    cleaned = re.sub(r"^(?:between|from)\s+", "", cleaned)
+    week_end = today + timedelta(days=6 - today.weekday())
+    next_monday = date.fromisoformat(_next_monday(today.isoformat()))
+    if re.search(r"\b(?:early|beginning of|start of) next week\b", cleaned):
+        return next_monday, next_monday + timedelta(days=2)
+    if re.search(r"\b(?:late|end of) next week\b", cleaned):
+        return next_monday + timedelta(days=3), next_monday + timedelta(days=6)
+    if re.search(r"\bnext week\b", cleaned):
+        return next_monday, next_monday + timedelta(days=6)
+    if re.search(r"\b(?:later|end of|rest of) (?:this |the )?week\b", cleaned):
+        return max(today + timedelta(days=1), week_end - timedelta(days=3)), week_end
+    if re.search(r"\bthis week\b", cleaned):
+        return today, week_end
+    if re.search(r"\b(?:this )?weekend\b", cleaned):
+        saturday = today + timedelta(days=(5 - today.weekday()) % 7)
+        return saturday, saturday + timedelta(days=1)
+    match = re.search(r"\bnext (few|couple|\d+|[a-z]+) days\b", cleaned)
+    if match:
+        word = match.group(1)
+        count = 3 if word == "few" else int(word) if word.isdigit() else _NUMBERS.get(word, 3)
+        return today + timedelta(days=1), today + timedelta(days=count)
+
+    parts = [p for p in _RANGE_SPLIT.split(cleaned) if p.strip()]
+    if len(parts) == 2:
+        first, last = parse_day(parts[0], today), parse_day(parts[1], today)
+        if first and last:
+            if last < first and (last + timedelta(days=7)) >= first:
+                last += timedelta(days=7)  # "Friday through Monday"
+            return first, last
+    single = parse_day(text, today)
+    return (single, single) if single else None
+
+
+def resolve_dates(
+    text: str,
+    config: PracticeConfig,
+    *,
+    end: str = "",
+    now: datetime | None = None,
+    max_days: int = MAX_RANGE_DAYS,
+) -> ResolvedDates | None:
+    """Spoken date(s) → the open business days to check, or None if not understood."""
+    today = (now or _now_for(config)).date()
+    span = parse_span(text, today)
+    if span is None:
+        return None
+    first, last = span
+    if end:
+        end_day = parse_day(end, today)
+        if end_day is None:
+            return None
+        last = end_day
+    if last < first or last < today:
+        return None  # the prompt keeps the LLM off past dates; let the platform answer as before
+    first = max(first, today)
+    last = min(last, first + timedelta(days=max_days - 1))
+
+    open_days = open_weekdays(config)
+    if open_days is None:
+        open_days = set(range(7))
+    days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    dates = [d for d in days if d.weekday() in open_days]
+    closed = [d for d in days if d.weekday() not in open_days]
+    if dates:
+        return ResolvedDates(dates=dates, closed=closed)
+    for i in range(1, 15):
+        candidate = last + timedelta(days=i)
+        if candidate.weekday() in open_days:
+            return ResolvedDates(dates=[candidate], closed=closed, moved=True)
+    return None
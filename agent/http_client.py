@@ -0,0 +1,218 @@
+"""Shared HTTP client for all Omnira platform traffic.
+
+LiveKit agents runs ONE job per subprocess and that process keeps a single
+event loop for its whole life, so one module-level httpx.AsyncClient is safe
+to share: every tool call, config fetch and webhook reuses the same
+keep-alive (HTTP/2 when available) connections instead of paying DNS + TCP +
+TLS on each round trip — that handshake was 100-300 ms of dead air per tool.
+"""
+import asyncio
+import importlib.util
+import logging
+import time
+
+import httpx
+
+from agent.config import Config
+
+logger = logging.getLogger("omnira-http")
+
+# Per-action read timeouts (seconds). The caller is sitting in silence while
+# these run, so reads are tight; writes that fan out to Twilio/Resend/the PMS
+# get more room. Anything not listed uses DEFAULT_TIMEOUT.
+ACTION_TIMEOUTS: dict[str, float] = {
+    "start_call_session": 6.0,
+    "lookup_patient": 6.0,
+    "check_availability": 8.0,
+    "get_my_appointments": 6.0,
+    "get_account_snapshot": 8.0,
+    "check_benefits": 10.0,
+    "estimate_copay": 10.0,
+    "verify_caller": 8.0,
+    "send_verification_code": 10.0,
+    "confirm_verification_code": 6.0,
+    "book_appointment": 15.0,
+    "send_sms": 12.0,
+    "send_confirmation_email": 12.0,
+    "log_message": 10.0,
+    "practice_config": 10.0,
+    "post_call": 30.0,
+    "transcript_delta": 5.0,
+}
+DEFAULT_TIMEOUT = 15.0
+CONNECT_TIMEOUT = 5.0
+
+# Per-action latency budgets (seconds): how long the caller should wait in
+# silence. Reads are cut off here with a spoken fallback; writes run to their
+# timeout above and only count the overrun (agent/resilience.py).
+ACTION_BUDGETS: dict[str, float] = {
+    "lookup_patient": 2.5,
+    "check_availability": 3.0,
+    "get_my_appointments": 2.5,
+    "get_account_snapshot": 3.0,
+    "check_benefits": 8.0,
+    "estimate_copay": 4.0,
+    "verify_caller": 4.0,
+    "send_verification_code": 5.0,
+    "confirm_verification_code": 3.0,
+    "book_appointment": 6.0,
+    "send_sms": 5.0,
+    "send_confirmation_email": 5.0,
+    "log_message": 4.0,
+}
+DEFAULT_BUDGET = 5.0
+
+# The platform advertises batched /voice-engine/actions requests (and the
+# most actions it accepts per batch) with this header on its responses
+BATCH_HEADER = "x-omnira-actions-batch"
+
+_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=10,
+    keepalive_expiry=120.0,
+)
+
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+_stats = {
+    "requests": 0,
+    "errors": 0,
+    "total_ms": 0.0,
+    "warmed": False,
+    "batch_limit": 0,
+    "batch_rejected": False,
+}
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+async def _on_request(request: httpx.Request) -> None:
+    request.extensions["omnira_started"] = time.monotonic()
+    _stats["requests"] += 1
+
+
+async def _on_response(response: httpx.Response) -> None:
+    started = response.request.extensions.get("omnira_started")
+    if started is not None:
+        _stats["total_ms"] += (time.monotonic() - started) * 1000
+    advertised = response.headers.get(BATCH_HEADER)
+    if advertised is not None and not _stats["batch_rejected"] and response.request.url.path.endswith("/voice-engine/actions"):
+        try:
+            _stats["batch_limit"] = max(0, int(advertised))
+        except ValueError:
+            _stats["batch_limit"] = 0
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide client, creating it on first use.
+
+    httpx connections are bound to the loop that opened them, so a client
+    created under a different (closed) loop is replaced rather than reused.
+    """
+    global _client, _client_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if _client is None or _client.is_closed or (loop is not None and _client_loop not in (None, loop)):
+        _client = httpx.AsyncClient(
+            http2=_http2_available(),
+            limits=_LIMITS,
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT),
+            follow_redirects=True,
+            headers={"Authorization": f"Bearer {Config.OMNIRA_API_KEY}"},
+            event_hooks={"request": [_on_request], "response": [_on_response]},
+        )
+        _client_loop = loop
+    elif _client_loop is None:
+        _client_loop = loop
+    return _client
+
+
+def timeout_for(action: str) -> httpx.Timeout:
+    """Timeout for one platform action, falling back to DEFAULT_TIMEOUT."""
+    return httpx.Timeout(ACTION_TIMEOUTS.get(action, DEFAULT_TIMEOUT), connect=CONNECT_TIMEOUT)
+
+
+def budget_for(action: str) -> float:
+    return ACTION_BUDGETS.get(action, DEFAULT_BUDGET)
+
+
+def timeout_for_batch(actions: list[str]) -> httpx.Timeout:
+    """A batch is answered at once, so it gets its slowest action's timeout."""
+    return httpx.Timeout(max(ACTION_TIMEOUTS.get(a, DEFAULT_TIMEOUT) for a in actions), connect=CONNECT_TIMEOUT)
+
+
+def batch_limit() -> int:
+    """Most actions per batched request the platform accepts (0 = no batching)."""
+    return _stats["batch_limit"]
+
+
+def disable_batching() -> None:
+    """The platform refused a batch despite advertising it — stop for this process."""
+    _stats["batch_limit"] = 0
+    _stats["batch_rejected"] = True
+
+
+async def warm() -> None:
+    """Open the first connection to the platform before it's needed.
+
+    Any response (even a 404/405) means DNS, TCP and TLS are done and the
+    connection is parked in the pool for the first real request.
+
+    Called at the top of the job entrypoint, concurrently with ctx.connect(),
+    not at process start: LiveKit's prewarm runs before the job process's
+    event loop exists, and the client's connections belong to that loop. As
+    each process serves one call, the handshake overlaps room connection
+    instead of leaving the call path entirely.
+    """
+    if not Config.OMNIRA_API_URL:
+        return
+    started = time.monotonic()
+    try:
+        await get_client().head(f"{Config.OMNIRA_API_URL}/voice-engine/actions", timeout=CONNECT_TIMEOUT)
+        _stats["warmed"] = True
+        logger.info(f"Platform connection warmed in {(time.monotonic() - started) * 1000:.0f}ms")
+    except Exception as e:
+        logger.warning(f"Platform connection warm-up failed (will connect on demand): {e}")
+
+
+def pool_stats() -> dict:
+    """Snapshot of connection reuse for logging / post-call metrics."""
+    stats = {
+        "requests": _stats["requests"],
+        "errors": _stats["errors"],
+        "avg_ms": round(_stats["total_ms"] / _stats["requests"], 1) if _stats["requests"] else 0.0,
+        "warmed": _stats["warmed"],
+        "batch_limit": _stats["batch_limit"],
+        "http2_enabled": _http2_available(),
+        "connections": 0,
+        "idle": 0,
+        "http2_connections": 0,
+    }
+    if _client is None:
+        return stats
+    try:
+        # httpx doesn't expose its pool publicly; httpcore's pool does.
+        connections = _client._transport._pool.connections
+    except AttributeError:
+        return stats
+    stats["connections"] = len(connections)
+    stats["idle"] = sum(1 for c in connections if c.is_idle())
+    stats["http2_connections"] = sum(1 for c in connections if "HTTP/2" in c.info())
+    return stats
+
+
+def record_error() -> None:
+    _stats["errors"] += 1
+
+
+async def aclose() -> None:
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
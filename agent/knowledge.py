@@ -0,0 +1,142 @@
+"""In-process retrieval over PracticeConfig.knowledge_base.
+
+Practices that scrape a big website used to have the whole thing pasted
+into the system prompt, which is re-sent on every LLM turn — thousands of
+extra input tokens and a slower time-to-first-token on each reply. Large
+knowledge bases are instead chunked and indexed here (Okapi BM25, pure
+Python, built once per practice and cached) and the agent pulls only the
+top few passages through the search_knowledge_base tool.
+"""
+import logging
+import math
+import re
+import time
+from collections import Counter, OrderedDict
+
+logger = logging.getLogger("omnira-knowledge")
+
+CHUNK_CHARS = 700
+_MAX_CACHED_INDEXES = 32
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from have how i if in is it its me my "
+    "of on or our so that the their them there this to was we what when where which who "
+    "will with you your".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 chars/token for English)."""
+    return (len(text) + 3) // 4
+
+
+def _terms(text: str) -> list[str]:
+    terms = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        if tok in _STOPWORDS:
+            continue
+        # Light plural folding so "implants" matches "implant"
+        if len(tok) > 4 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        terms.append(tok)
+    return terms
+
+
+def chunk_text(text: str, max_chars: int = CHUNK_CHARS) -> list[str]:
+    """Split on blank lines / headings, then pack paragraphs up to max_chars.
+
+    A heading always starts a new chunk and is carried into the section's
+    continuation chunks, so a passage like "We accept Delta Dental..." keeps
+    its "## Insurance" context and never mixes with the next section.
+    """
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n|\n(?=#)", text) if p.strip()]
+    chunks: list[str] = []
+    current = ""
+    heading = ""
+    for para in paragraphs:
+        if para.startswith("#"):
+            heading = para.splitlines()[0]
+            if current:
+                chunks.append(current)
+                current = ""
+        # Oversized paragraphs are split on sentence boundaries
+        pieces = [para] if len(para) <= max_chars else re.split(r"(?<=[.!?])\s+", para)
+        for piece in pieces:
+            if current and len(current) + len(piece) + 2 > max_chars:
+                chunks.append(current)
+                current = heading if heading and not piece.startswith("#") else ""
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over knowledge-base chunks."""
+
+    def __init__(self, chunks: list[str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self._tf: list[Counter] = [Counter(_terms(c)) for c in chunks]
+        self._len = [sum(tf.values()) for tf in self._tf]
+        self._avg_len = (sum(self._len) / len(self._len)) if self._len else 0.0
+        df: Counter = Counter()
+        for tf in self._tf:
+            df.update(tf.keys())
+        n = len(chunks)
+        self._idf = {term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+        self.stats = {"queries": 0, "query_ms_total": 0.0, "build_ms": 0.0}
+
+    def search(self, query: str, k: int = 3) -> list[tuple[float, str]]:
+        started = time.perf_counter()
+        q_terms = [t for t in set(_terms(query)) if t in self._idf]
+        scored = []
+        if q_terms and self._avg_len:
+            for i, tf in enumerate(self._tf):
+                norm = self.k1 * (1 - self.b + self.b * self._len[i] / self._avg_len)
+                score = 0.0
+                for term in q_terms:
+                    freq = tf.get(term)
+                    if freq:
+                        score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+                if score > 0:
+                    scored.append((score, i))
+        scored.sort(reverse=True)
+        self.stats["queries"] += 1
+        self.stats["query_ms_total"] += (time.perf_counter() - started) * 1000
+        return [(round(score, 3), self.chunks[i]) for score, i in scored[:k]]
+
+
+_indexes: OrderedDict[tuple[str, str], BM25Index] = OrderedDict()
+_by_practice: dict[str, BM25Index] = {}
+
+
+def index_for(practice_id: str, knowledge_base: str) -> BM25Index | None:
+    """Build (or reuse) the index for one practice's knowledge base."""
+    if not knowledge_base.strip():
+        return None
+    key = (practice_id, knowledge_base)
+    index = _indexes.get(key)
+    if index is None:
+        started = time.perf_counter()
+        index = BM25Index(chunk_text(knowledge_base))
+        index.stats["build_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        # Input tokens every LLM turn would have carried with the KB inlined
+        index.stats["inline_tokens"] = estimate_tokens(knowledge_base)
+        _indexes[key] = index
+        while len(_indexes) > _MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+        logger.info(
+            f"Indexed knowledge base for practice={practice_id or '-'}: "
+            f"{len(knowledge_base)} chars → {len(index.chunks)} chunks in {index.stats['build_ms']:.1f}ms"
+        )
+    else:
+        _indexes.move_to_end(key)
+    _by_practice[practice_id] = index
+    return index
+
+
+def get_index(practice_id: str) -> BM25Index | None:
+    return _by_practice.get(practice_id)
@@ -0,0 +1,173 @@
+"""Per-turn voice latency: how long the caller waits after they stop talking.
+
+Each turn runs from VAD reporting the end of the caller's speech to the
+first agent audio frame played back. Every stage in between is recorded as
+a span on the monotonic clock (offsets relative to call start):
+
+  stt_final       caller stopped → final transcript (0 if it arrived first)
+  end_of_turn     caller stopped → LLM request (endpointing delay)
+  llm_ttft        LLM request → first token, for every LLM round
+  tool            platform action round trip, for every action
+  tts_first_byte  first text into the TTS → first synthesized frame
+  playout         first synthesized frame → agent audibly speaking
+  response        caller stopped → agent audibly speaking
+
+Spans that land before the caller has said anything (the greeting) go to
+turn 0. CallLogger carries one TurnLatency per call; its summary (p50/p95
+per stage) and raw turns go out in the post-call payload.
+"""
+import logging
+import time
+
+from agent.log_pipeline import HIGH_VOLUME, Lazy
+
+logger = logging.getLogger("omnira-latency")
+
+STAGES = ("response", "stt_final", "end_of_turn", "llm_ttft", "tool", "tts_first_byte", "playout")
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return values[min(len(values) - 1, max(0, round(q * (len(values) - 1))))]
+
+
+class TurnLatency:
+    """Monotonic-clock spans for each caller turn of one call."""
+
+    def __init__(self, call_id: str = ""):
+        self.call_id = call_id
+        self._t0 = time.monotonic()
+        self.turns: list[dict] = []
+        # Which providers/models served the call, e.g. {"tts": "kokoro/model_q8f16"}
+        self.labels: dict[str, str] = {}
+        self._turn: dict | None = None
+        self._turn_count = 0
+        self._stopped_at: float | None = None
+        self._answered = False
+        self._last_final: float | None = None
+        self._tts_first_frame: float | None = None
+
+    def _ms(self, t: float) -> float:
+        return round((t - self._t0) * 1000, 1)
+
+    def _current(self) -> dict:
+        if self._turn is None:
+            # Agent activity before the caller's first words (the greeting)
+            self._turn = {"turn": 0, "caller_stopped_ms": None, "spans": []}
+            self.turns.append(self._turn)
+        return self._turn
+
+    def _add(self, stage: str, start: float, end: float, **detail) -> None:
+        span = {"stage": stage, "start_ms": self._ms(start), "ms": round(max(0.0, end - start) * 1000, 1)}
+        span.update(detail)
+        self._current()["spans"].append(span)
+
+    # ── caller side (session events) ─────────────────────────────────────
+
+    def caller_started(self) -> None:
+        self._last_final = None
+
+    def caller_stopped(self) -> None:
+        """VAD end of speech — opens a new turn."""
+        now = time.monotonic()
+        self._turn_count += 1
+        self._turn = {"turn": self._turn_count, "caller_stopped_ms": self._ms(now), "spans": []}
+        self.turns.append(self._turn)
+        self._stopped_at = now
+        self._answered = False
+        self._tts_first_frame = None
+        if self._last_final is not None:
+            # The transcript was final before VAD called end of speech
+            self._add("stt_final", now, now)
+            self._last_final = None
+
+    def transcript_final(self) -> None:
+        now = time.monotonic()
+        turn = self._turn
+        if (
+            self._stopped_at is not None
+            and not self._answered
+            and turn is not None
+            and not any(s["stage"] == "stt_final" for s in turn["spans"])
+        ):
+            self._add("stt_final", self._stopped_at, now)
+        else:
+            self._last_final = now
+
+    # ── agent side (pipeline nodes, tools) ───────────────────────────────
+
+    def llm_request(self) -> float:
+        """Mark an LLM round starting; pass the result to llm_first_token()."""
+        now = time.monotonic()
+        turn = self._current()
+        if self._stopped_at is not None and not any(s["stage"] == "end_of_turn" for s in turn["spans"]):
+            self._add("end_of_turn", self._stopped_at, now)
+        return now
+
+    def llm_first_token(self, started: float) -> None:
+        self._add("llm_ttft", started, time.monotonic())
+
+    def tool(self, name: str, started: float) -> None:
+        self._add("tool", started, time.monotonic(), name=name)
+
+    def tts_first_frame(self, text_started: float | None) -> None:
+        now = time.monotonic()
+        self._add("tts_first_byte", text_started if text_started is not None else now, now)
+        if not self._answered and self._tts_first_frame is None:
+            self._tts_first_frame = now
+
+    def agent_speaking(self) -> None:
+        """First audio frame played — closes the caller's wait for this turn."""
+        if self._answered:
+            return
+        now = time.monotonic()
+        if self._tts_first_frame is not None:
+            self._add("playout", self._tts_first_frame, now)
+        self._answered = True
+        if self._stopped_at is None:
+            return
+        self._add("response", self._stopped_at, now)
+        turn = self._current()
+        logger.info("[%s] Turn %s latency: %s", self.call_id, turn["turn"], Lazy(self._describe, turn), extra=HIGH_VOLUME)
+
+    # ── reporting ────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _describe(turn: dict) -> str:
+        parts = []
+        for stage in STAGES:
+            spans = [s for s in turn["spans"] if s["stage"] == stage]
+            if not spans:
+                continue
+            if stage == "tool":
+                parts.append(" ".join(f"tool:{s['name']}={s['ms']:.0f}ms" for s in spans))
+            else:
+                parts.append(f"{stage}={spans[0]['ms']:.0f}ms")
+        return " ".join(parts)
+
+    def summary(self) -> dict[str, dict]:
+        """{stage: {"n", "p50", "p95", "max"}} in ms across every turn."""
+        values: dict[str, list[float]] = {}
+        for turn in self.turns:
+            for span in turn["spans"]:
+                values.setdefault(span["stage"], []).append(span["ms"])
+        result = {}
+        for stage in STAGES:
+            samples = sorted(values.get(stage, []))
+            if samples:
+                result[stage] = {
+                    "n": len(samples),
+                    "p50": _percentile(samples, 0.5),
+                    "p95": _percentile(samples, 0.95),
+                    "max": samples[-1],
+                }
+        return result
+
+    def label_components(self, **components) -> None:
+        """Record provider/model for each stage owner (stt=, llm=, tts=)."""
+        for name, component in components.items():
+            if component is not None:
+                self.labels[name] = f"{getattr(component, 'provider', 'unknown')}/{getattr(component, 'model', 'unknown')}"
+
+    def summary_line(self) -> str:
+        return " ".join(f"{stage}={s['p50']:.0f}/{s['p95']:.0f}ms" for stage, s in self.summary().items())
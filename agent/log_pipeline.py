@@ -0,0 +1,245 @@
+"""Logging off the event loop.
+
+The job process's event loop also drives call audio, so a log call only
+enqueues. _QueueHandler, the one handler left on the root logger, attaches
+call_id / practice_id from current_call, thins high-volume lines and puts
+the record on a bounded queue. A QueueListener thread does the formatting
+(msg % args, tracebacks, JSON) and the writes, to whatever handlers were on
+the root logger — LiveKit's stdout handler in the worker, its IPC forwarder
+in job processes, also when they are added after setup — or, with none, a
+JSON-lines stderr handler.
+
+Hot paths log with %-style arguments so the message is built on the
+listener thread (arguments are formatted later: don't pass objects that
+change afterwards; preview() / Lazy() defer JSON dumps and summaries).
+Per-utterance / per-tool-call lines pass extra=HIGH_VOLUME: they are sampled
+at LOG_SAMPLE_RATE and capped at LOG_RATE_LIMIT lines per second per call
+site, and the next line let through carries how many were suppressed.
+Warnings and errors are never thinned.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from agent.call_context import current_call
+from agent.config import Config
+
+# extra= for lines logged per utterance or per tool call
+HIGH_VOLUME = {"_high_volume": True}
+
+TEXT_FORMAT = "%(asctime)s [%(name)s] %(levelname)s: %(message)s"
+
+# Records waiting for the listener; past this they are dropped (and counted)
+# rather than blocking the loop behind a stalled stdout
+QUEUE_SIZE = 10_000
+
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_stats = {"queued": 0, "dropped": 0, "sampled_out": 0, "rate_limited": 0}
+_pipeline: dict = {"handler": None, "listener": None, "fallback": None}
+_lock = threading.Lock()
+
+
+class Lazy:
+    """Log argument computed only if the line is written."""
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args))
+
+
+def _preview(value, limit: int) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return text[:limit]
+
+
+def preview(value, limit: int = 200) -> Lazy:
+    """JSON of value (or the string itself), truncated, built off the loop."""
+    return Lazy(_preview, value, limit)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, call context and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _CallContext(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if current_call.call_id and not hasattr(record, "call_id"):
+            record.call_id = current_call.call_id
+        if current_call.practice_id and not hasattr(record, "practice_id"):
+            record.practice_id = current_call.practice_id
+        return True
+
+
+class _Throttle(logging.Filter):
+    """Sampling and a per-call-site token bucket for HIGH_VOLUME lines."""
+
+    def __init__(self, rate: float, sample: float):
+        super().__init__()
+        self.rate = rate
+        self.sample = sample
+        self._buckets: dict[tuple[str, int], tuple[float, float]] = {}
+        self._suppressed: dict[tuple[str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, "_high_volume", False):
+            return True
+        if self.sample < 1.0 and random.random() >= self.sample:
+            _stats["sampled_out"] += 1
+            return False
+        if self.rate <= 0:
+            return True
+        site = (record.pathname, record.lineno)
+        tokens, last = self._buckets.get(site, (self.rate, record.created))
+        tokens = min(self.rate, tokens + (record.created - last) * self.rate)
+        if tokens < 1.0:
+            self._buckets[site] = (tokens, record.created)
+            self._suppressed[site] = self._suppressed.get(site, 0) + 1
+            _stats["rate_limited"] += 1
+            return False
+        self._buckets[site] = (tokens - 1.0, record.created)
+        suppressed = self._suppressed.pop(site, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def handle(self, record: logging.LogRecord) -> bool:
+        if len(logging.root.handlers) > 1:
+            _adopt()
+        return super().handle(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Left as is — the listener thread builds the message
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _stats["dropped"] += 1
+            return
+        _stats["queued"] += 1
+
+
+def _start(handlers: list[logging.Handler]) -> None:
+    records: queue.Queue = queue.Queue(QUEUE_SIZE)
+    handler = _QueueHandler(records)
+    handler.addFilter(_CallContext())
+    handler.addFilter(_Throttle(Config.LOG_RATE_LIMIT, Config.LOG_SAMPLE_RATE))
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    _pipeline["handler"] = handler
+    _pipeline["listener"] = listener
+    logging.getLogger().addHandler(handler)
+
+
+def configure_logging() -> None:
+    """Move the root logger's handlers behind the queue (idempotent)."""
+    root = logging.getLogger()
+    with _lock:
+        if _pipeline["listener"] is None:
+            handlers = list(root.handlers)
+            if not handlers:
+                fallback = logging.StreamHandler()
+                fallback.setFormatter(JsonFormatter() if Config.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+                handlers = [fallback]
+                _pipeline["fallback"] = fallback
+                root.setLevel(Config.LOG_LEVEL.upper())
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            _start(handlers)
+            return
+    _adopt()
+
+
+def _adopt() -> None:
+    """Handlers added to the root logger since setup move behind the listener;
+    once someone else writes the logs the fallback handler goes."""
+    root = logging.getLogger()
+    with _lock:
+        listener = _pipeline["listener"]
+        added = [h for h in root.handlers if h is not _pipeline["handler"]]
+        if listener is None or not added:
+            return
+        for handler in added:
+            root.removeHandler(handler)
+        kept = [h for h in listener.handlers if h is not _pipeline["fallback"]]
+        _pipeline["fallback"] = None
+        listener.handlers = tuple(kept + added)
+
+
+def stop_logging() -> None:
+    """Write what's queued and put the handlers back on the root logger."""
+    root = logging.getLogger()
+    with _lock:
+        listener = _pipeline["listener"]
+        if listener is None:
+            return
+        root.removeHandler(_pipeline["handler"])
+        listener.stop()
+        for handler in listener.handlers:
+            root.addHandler(handler)
+        _pipeline.update(handler=None, listener=None, fallback=None)
+
+
+def drain_logs(timeout: float = 2.0) -> bool:
+    """Wait (blocking — run it in a thread) until queued records are written."""
+    listener = _pipeline["listener"]
+    if listener is None:
+        return True
+    deadline = time.monotonic() + timeout
+    while listener.queue.unfinished_tasks:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def logging_stats() -> dict:
+    listener = _pipeline["listener"]
+    return {**_stats, "pending": listener.queue.qsize() if listener is not None else 0}
+
+
+def _after_fork_in_child() -> None:
+    # The listener thread doesn't survive fork(); start a new one on the same handlers
+    global _lock
+    _lock = threading.Lock()
+    listener = _pipeline["listener"]
+    if listener is None:
+        return
+    logging.getLogger().removeHandler(_pipeline["handler"])
+    _start(list(listener.handlers))
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -1,14 +1,62 @@
 """Call transcript logger — logs every call and sends data to Omnira platform."""
+import asyncio
 import json
 import logging
-from datetime import datetime, timezone
-
-import httpx
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 
+from agent.call_payload import (
+    COMPACT_FORMAT, FORMAT_HEADER, FORMATS_HEADER, FULL_FORMAT, choose_encoding, compact_payload, dumps, encode,
+    header_values,
+)
 from agent.config import Config
+from agent.http_client import get_client, record_error, timeout_for
+from agent.latency import TurnLatency
+from agent.log_pipeline import HIGH_VOLUME, preview
+from agent.outbox import get_post_call_spool
 
 logger = logging.getLogger("call-logger")
 
+# The webhook advertises how many call records it accepts per request
+# ({"calls": [...]}) with this header; 0 until it does
+WEBHOOK_BATCH_HEADER = "x-omnira-webhook-batch"
+# ...and that it takes event deltas during the call (POST .../deltas)
+WEBHOOK_DELTAS_HEADER = "x-omnira-webhook-deltas"
+_BATCH_UNSUPPORTED = {400, 404, 405, 413, 415, 422, 501}
+# A compact or compressed body refused with one of these is resent as plain
+# v1 JSON; if that goes through, this process stops compacting
+_COMPACT_REFUSED = {400, 415, 422}
+_webhook = {
+    "batch_limit": 0,
+    "batch_rejected": False,
+    "formats": [],
+    "encodings": [],
+    "compact_rejected": False,
+    "deltas": False,
+}
+_wire = {"requests": 0, "records": 0, "json_bytes": 0, "sent_bytes": 0, "deltas": 0, "delta_bytes": 0}
+
+
+@dataclass(slots=True)
+class CallEvent:
+    """One logged event, kept as recorded until a payload or delta is built."""
+
+    at: float  # time.monotonic()
+    type: str
+    data: dict
+
+    def as_dict(self, started_wall: datetime, started: float) -> dict:
+        """The v1 payload entry: ISO timestamp, type and the data's keys."""
+        at = started_wall + timedelta(seconds=self.at - started)
+        return {"timestamp": at.isoformat(), "type": self.type, **self.data}
+
+    def compact(self, started: float) -> list:
+        """The omnira-call/2 entry (agent/call_payload.py)."""
+        offset = round((self.at - started) * 1000)
+        return [offset, self.type, self.data] if self.data else [offset, self.type]
+
 
 class CallLogger:
     """Logs call transcripts and events, sends post-call data to Omnira."""
@@ -18,20 +66,52 @@ class CallLogger:
         self.from_number = from_number
         self.to_number = to_number
         self.practice_id = practice_id
-        self.started_at = datetime.now(timezone.utc).isoformat()
-        self.events: list[dict] = []
+        self._started = time.monotonic()
+        self._started_wall = datetime.now(timezone.utc)
+        self.started_at = self._started_wall.isoformat()
+        self.events: list[CallEvent] = []
+        # Events dropped from the front once a call passes CALL_EVENTS_MAX;
+        # an event's index in the call is _trimmed + its position in events
+        self._trimmed = 0
         self.collected_info: dict = {}
-        self.tool_results: list[dict] = []
         self.recording_url: str = ""
+        self.setup_timings: dict = {}
+        self.latency = TurnLatency(call_id)
+        # Streaming: the call's first _acked events are on the platform;
+        # _delta is the (seq, start, end) being sent, resent unchanged until
+        # acknowledged
+        self._acked = 0
+        self._seq = 0
+        self._delta: tuple[int, int, int] | None = None
+        self._flush_wanted = asyncio.Event()
+        self._streamer: asyncio.Task | None = None
 
     def log_event(self, event_type: str, data: dict):
-        entry = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "type": event_type,
-            **data,
-        }
-        self.events.append(entry)
-        logger.info(f"[{self.call_id}] {event_type}: {json.dumps(data)[:200]}")
+        """Record an event. Runs inside LiveKit's event callbacks, so nothing
+        is serialized here; data is kept by reference and must not change
+        afterwards."""
+        self.events.append(CallEvent(time.monotonic(), event_type, data))
+        if len(self.events) > Config.CALL_EVENTS_MAX:
+            self._trim()
+        if (
+            self._streamer is not None and _webhook["deltas"]
+            and self.event_count - self._acked >= Config.TRANSCRIPT_FLUSH_EVENTS
+        ):
+            self._flush_wanted.set()
+        logger.info("[%s] %s: %s", self.call_id, event_type, preview(data), extra=HIGH_VOLUME)
+
+    @property
+    def event_count(self) -> int:
+        """Events logged this call, including any trimmed from memory."""
+        return self._trimmed + len(self.events)
+
+    def _trim(self):
+        # The oldest tenth goes; with streaming on those were already sent
+        drop = max(1, len(self.events) // 10)
+        del self.events[:drop]
+        self._trimmed += drop
+        if self._trimmed > self._acked:
+            logger.warning(f"[{self.call_id}] Over CALL_EVENTS_MAX — {self._trimmed - self._acked} unsent events dropped")
 
     def log_caller_speech(self, text: str):
         self.log_event("caller_speech", {"text": text})
@@ -39,9 +119,15 @@ class CallLogger:
     def log_agent_speech(self, text: str):
         self.log_event("agent_speech", {"text": text})
 
-    def log_tool_call(self, tool_name: str, args: dict, result: str):
-        self.log_event("tool_call", {"tool": tool_name, "args": args, "result": result[:500]})
-        self.tool_results.append({"tool": tool_name, "args": args, "result": result[:500]})
+    def log_tool_call(self, tool_name: str, args: dict, result: str, cache: str = "", tokens: dict | None = None):
+        entry = {"tool": tool_name, "args": args, "result": result[:500]}
+        if cache:
+            # hit / miss / joined / bypass / prefetch / slot_engine / write / queued / circuit_open (agent/tool_cache.py)
+            entry["cache"] = cache
+        if tokens:
+            # tokens / raw_tokens / context_tokens (agent/tool_results.py)
+            entry.update(tokens)
+        self.log_event("tool_call", entry)
 
         if tool_name == "book_appointment":
             self.collected_info.update({
@@ -59,24 +145,90 @@ class CallLogger:
     def set_recording_url(self, url: str):
         self.recording_url = url
 
+    def set_setup_timings(self, timings: dict):
+        """Attach the entrypoint's PhaseTimer.timings (kept by reference so
+        phases finishing after this call are still reported)."""
+        self.setup_timings = timings
+
     def log_call_end(self, reason: str = "completed"):
         self.log_event("call_end", {"reason": reason})
 
+    @property
+    def tool_results(self) -> list[dict]:
+        return [dict(ev.data) for ev in self.events if ev.type == "tool_call"]
+
     def get_transcript_text(self) -> str:
         """Build a human-readable transcript from events."""
         lines = []
         for ev in self.events:
-            if ev["type"] == "caller_speech":
-                lines.append(f"Caller: {ev['text']}")
-            elif ev["type"] == "agent_speech":
-                lines.append(f"Agent: {ev['text']}")
-            elif ev["type"] == "tool_call":
-                lines.append(f"[Tool: {ev['tool']}]")
+            if ev.type == "caller_speech":
+                lines.append(f"Caller: {ev.data['text']}")
+            elif ev.type == "agent_speech":
+                lines.append(f"Agent: {ev.data['text']}")
+            elif ev.type == "tool_call":
+                lines.append(f"[Tool: {ev.data['tool']}]")
         return "\n".join(lines)
 
+    def start_streaming(self):
+        """Send event deltas to the platform in the background during the call."""
+        if Config.TRANSCRIPT_STREAMING and Config.OMNIRA_API_URL and self._streamer is None:
+            self._streamer = asyncio.create_task(self._stream(), name="transcript-stream")
+
+    async def _stream(self):
+        failures = 0
+        while True:
+            if failures:
+                await asyncio.sleep(min(Config.TRANSCRIPT_FLUSH_INTERVAL * 2 ** failures, 60.0))
+            try:
+                await asyncio.wait_for(self._flush_wanted.wait(), Config.TRANSCRIPT_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wanted.clear()
+            try:
+                sent = await self._flush_delta()
+            except Exception:
+                logger.exception(f"[{self.call_id}] Event delta failed")
+                sent = False
+            failures = 0 if sent else failures + 1
+
+    async def _flush_delta(self) -> bool:
+        if not _webhook["deltas"]:
+            # Not advertised — everything goes out in the final record
+            return True
+        if self._delta is None:
+            if self.event_count == self._acked:
+                return True
+            self._seq += 1
+            self._delta = (self._seq, max(self._acked, self._trimmed), self.event_count)
+        seq, start, end = self._delta
+        # Only a call past CALL_EVENTS_MAX with the platform down trims a pending delta
+        start = max(start, self._trimmed)
+        events = self.events[start - self._trimmed:end - self._trimmed]
+        if not await deliver_delta(self, seq, start, events):
+            return False
+        self._acked, self._delta = end, None
+        return True
+
+    async def _stop_streaming(self):
+        if self._streamer is None:
+            return
+        # A delta cut off mid-flight isn't acknowledged, so its events go out
+        # again in the final record; the platform places events by position
+        self._streamer.cancel()
+        await asyncio.gather(self._streamer, return_exceptions=True)
+        self._streamer = None
+
     def get_full_payload(self) -> dict:
-        """Build the payload to send to Omnira's webhook."""
+        """Build the payload to send to Omnira's webhook.
+
+        Once deltas were acknowledged during the call this is the closing
+        record: the events after them ("events_offset" says where they
+        start) plus the summary; the platform rebuilds the transcript and
+        tool_calls from all of the call's events.
+        """
         ended_at = datetime.now(timezone.utc).isoformat()
+        start = max(self._acked, self._trimmed)
+        events = [ev.as_dict(self._started_wall, self._started) for ev in self.events[start - self._trimmed:]]
 
         payload = {
             "source": "omnira-voice-engine",
@@ -90,37 +242,267 @@ class CallLogger:
             "transcript": self.get_transcript_text(),
             "collected_info": self.collected_info,
             "tool_calls": self.tool_results,
-            "events": self.events,
+            "events": events,
         }
+        if self._acked:
+            del payload["transcript"], payload["tool_calls"]
+            payload["events_offset"] = start
+        if self._trimmed > self._acked:
+            payload["events_dropped"] = self._trimmed - self._acked
         if self.recording_url:
             payload["recording_url"] = self.recording_url
+        if self.setup_timings:
+            payload["setup_timings"] = self.setup_timings
+        if self.latency.turns:
+            payload["latency"] = {
+                "summary": self.latency.summary(),
+                "providers": self.latency.labels,
+                "turns": self.latency.turns,
+            }
         return payload
 
     async def send_to_omnira(self):
-        """Send the completed call data to the Omnira platform webhook."""
+        """Spool the completed call record, then try to deliver it to the Omnira webhook.
+
+        The spool row (agent/outbox.py) is written first, so a record that
+        can't be delivered within POST_CALL_DRAIN_TIMEOUT — or whose process
+        is killed after the room disconnects — is retried by the drainer of
+        whichever job process on the host runs next.
+        """
         if not Config.OMNIRA_API_URL:
             logger.warning("OMNIRA_API_URL not configured — skipping post-call report")
             return
 
-        url = f"{Config.OMNIRA_API_URL}/webhooks/voice-engine"
+        await self._stop_streaming()
         payload = self.get_full_payload()
+        if Config.POST_CALL_SPOOL:
+            spool = get_post_call_spool(Config.CACHE_DIR)
+            try:
+                await spool.enqueue(payload, key=self.call_id)
+            except sqlite3.Error as e:
+                logger.warning(f"[{self.call_id}] Post-call spool unavailable ({e}) — sending directly")
+            else:
+                spool.start(deliver_post_call, deliver_post_call_batch, Config.POST_CALL_BATCH_MAX)
+                try:
+                    await asyncio.wait_for(spool.drain(Config.POST_CALL_DRAIN_TIMEOUT), Config.POST_CALL_DRAIN_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.warning(f"[{self.call_id}] Post-call data still spooled — the drainer will retry it")
+                return
+
+        await deliver_post_call(payload)
 
-        logger.info(f"[{self.call_id}] Sending post-call data to {url}")
 
+def _note_capabilities(resp) -> None:
+    """Batch limit, payload formats and encodings the webhook advertises."""
+    advertised = resp.headers.get(WEBHOOK_BATCH_HEADER)
+    if advertised is not None and not _webhook["batch_rejected"]:
         try:
-            async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-                resp = await client.post(
-                    url,
-                    json=payload,
-                    headers={
-                        "Authorization": f"Bearer {Config.OMNIRA_API_KEY}",
-                        "Content-Type": "application/json",
-                        "X-Engine-Source": "omnira-voice-engine",
-                    },
-                )
-                if resp.status_code < 300:
-                    logger.info(f"[{self.call_id}] Post-call data sent to Omnira (status {resp.status_code})")
-                else:
-                    logger.error(f"[{self.call_id}] Omnira webhook returned {resp.status_code}: {resp.text[:300]}")
-        except Exception as e:
-            logger.error(f"[{self.call_id}] Failed to send post-call data to Omnira: {e}")
+            _webhook["batch_limit"] = max(0, int(advertised))
+        except ValueError:
+            _webhook["batch_limit"] = 0
+    if FORMATS_HEADER in resp.headers:
+        _webhook["formats"] = header_values(resp.headers[FORMATS_HEADER])
+    if "accept-encoding" in resp.headers:
+        _webhook["encodings"] = header_values(resp.headers["accept-encoding"])
+    if WEBHOOK_DELTAS_HEADER in resp.headers:
+        _webhook["deltas"] = resp.headers[WEBHOOK_DELTAS_HEADER].strip() not in ("", "0")
+
+
+async def probe_post_call_webhook() -> None:
+    """Learn what the webhook accepts while the call is still running.
+
+    Each job process usually sends one call record, so waiting for the
+    first webhook response to advertise the compact format would mean it
+    is never used. A HEAD at call setup costs nothing the caller notices.
+    """
+    if not Config.OMNIRA_API_URL or not (Config.POST_CALL_COMPACT or Config.TRANSCRIPT_STREAMING):
+        return
+    try:
+        resp = await get_client().head(f"{Config.OMNIRA_API_URL}/webhooks/voice-engine", timeout=timeout_for("post_call"))
+    except Exception as e:
+        logger.debug(f"Post-call webhook probe failed (sending plain JSON): {e}")
+        return
+    _note_capabilities(resp)
+
+
+async def _post_webhook(records: list[dict], *, batch: bool, compact: bool = True):
+    """POST call records in the best format the webhook accepts.
+
+    Returns the response and a label like "48.2 KB → 6.1 KB omnira-call/2+gzip".
+    """
+    plain = dumps({"calls": records} if batch else records[0])
+    compact = compact and Config.POST_CALL_COMPACT and not _webhook["compact_rejected"]
+    headers = {"X-Engine-Source": "omnira-voice-engine", "Content-Type": "application/json"}
+    data, fmt = plain, ""
+    if compact and COMPACT_FORMAT in _webhook["formats"]:
+        fmt = COMPACT_FORMAT
+        short = [compact_payload(r) for r in records]
+        data = dumps({"calls": short} if batch else short[0])
+        headers[FORMAT_HEADER] = fmt
+    data, encoding = encode(data, choose_encoding(_webhook["encodings"]) if compact else "")
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    resp = await get_client().post(
+        f"{Config.OMNIRA_API_URL}/webhooks/voice-engine",
+        content=data,
+        headers=headers,
+        timeout=timeout_for("post_call"),
+    )
+    if (fmt or encoding) and resp.status_code in _COMPACT_REFUSED:
+        retry, label = await _post_webhook(records, batch=batch, compact=False)
+        if retry.status_code < 300:
+            logger.warning(
+                f"Omnira webhook refused {'+'.join(filter(None, (fmt, encoding)))} ({resp.status_code}) — sending plain JSON"
+            )
+            _webhook["compact_rejected"] = True
+        return retry, label
+
+    _wire["requests"] += 1
+    _wire["records"] += len(records)
+    _wire["json_bytes"] += len(plain)
+    _wire["sent_bytes"] += len(data)
+    label = f"{_kb(len(plain))} → {_kb(len(data))} {'+'.join(filter(None, (fmt, encoding))) or 'json'}"
+    return resp, label
+
+
+def _kb(size: int) -> str:
+    return f"{size / 1024:.1f} KB"
+
+
+async def deliver_delta(call_logger: CallLogger, seq: int, offset: int, events: list[CallEvent]) -> bool:
+    """POST a call's events offset..offset + len(events) while it's in progress.
+
+    seq numbers the deltas of one call and a failed one is resent unchanged,
+    so (call_id, seq) identifies it; offset places its events, so a resend
+    or a final record overlapping it can't duplicate them.
+    """
+    body = {
+        "call_id": call_logger.call_id,
+        "practice_id": call_logger.practice_id,
+        "started_at": call_logger.started_at,
+        "seq": seq,
+        "offset": offset,
+        "events": [ev.compact(call_logger._started) for ev in events],
+    }
+    compact = Config.POST_CALL_COMPACT and not _webhook["compact_rejected"]
+    data, encoding = encode(dumps(body), choose_encoding(_webhook["encodings"]) if compact else "")
+    headers = {"X-Engine-Source": "omnira-voice-engine", "Content-Type": "application/json"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    try:
+        resp = await get_client().post(
+            f"{Config.OMNIRA_API_URL}/webhooks/voice-engine/deltas",
+            content=data,
+            headers=headers,
+            timeout=timeout_for("transcript_delta"),
+        )
+    except Exception as e:
+        record_error()
+        logger.warning(f"[{call_logger.call_id}] Event delta {seq} not sent ({e}) — will resend")
+        return False
+    if resp.status_code in (404, 405, 501):
+        logger.warning(f"[{call_logger.call_id}] Omnira webhook refused event deltas ({resp.status_code}) — sending at call end")
+        _webhook["deltas"] = False
+        return False
+    if resp.status_code >= 300:
+        logger.warning(f"[{call_logger.call_id}] Event delta {seq} returned {resp.status_code} — will resend")
+        return False
+    _wire["deltas"] += 1
+    _wire["delta_bytes"] += len(data)
+    logger.debug(f"[{call_logger.call_id}] Event delta {seq} sent ({len(events)} events, {_kb(len(data))})")
+    return True
+
+
+def post_call_stats() -> dict:
+    """Post-call bytes on the wire for this process vs the plain v1 JSON,
+    and what was streamed as event deltas during calls."""
+    stats = dict(_wire)
+    stats["ratio"] = round(_wire["sent_bytes"] / _wire["json_bytes"], 3) if _wire["json_bytes"] else None
+    compact = Config.POST_CALL_COMPACT and not _webhook["compact_rejected"]
+    stats["format"] = COMPACT_FORMAT if compact and COMPACT_FORMAT in _webhook["formats"] else FULL_FORMAT
+    stats["encoding"] = choose_encoding(_webhook["encodings"]) if compact else ""
+    return stats
+
+
+def _webhook_result(resp) -> dict:
+    if resp.status_code < 300:
+        return {"success": True}
+    # Outages and throttling are retried; anything else the platform rejected
+    retry = resp.status_code >= 500 or resp.status_code in (408, 429)
+    return {"success": False, "error": f"{resp.status_code}: {resp.text[:300]}", "unavailable": retry}
+
+
+async def deliver_post_call(payload: dict) -> dict:
+    """POST one call record to the webhook (the spool's single delivery)."""
+    call_id = payload.get("call_id", "")
+    logger.info(f"[{call_id}] Sending post-call data to {Config.OMNIRA_API_URL}/webhooks/voice-engine")
+    try:
+        resp, label = await _post_webhook([payload], batch=False)
+    except Exception as e:
+        record_error()
+        logger.error(f"[{call_id}] Failed to send post-call data to Omnira: {e}")
+        return {"success": False, "error": str(e), "unavailable": True}
+    _note_capabilities(resp)
+    if resp.status_code < 300:
+        logger.info(f"[{call_id}] Post-call data sent to Omnira (status {resp.status_code}, {label})")
+    else:
+        logger.error(f"[{call_id}] Omnira webhook returned {resp.status_code}: {resp.text[:300]}")
+    return _webhook_result(resp)
+
+
+async def deliver_post_call_batch(payloads: list[dict]) -> list[dict] | None:
+    """POST several call records, in concurrent requests of up to the
+    webhook's advertised batch limit, or None to send them one by one."""
+    if _webhook["batch_rejected"]:
+        return None
+    if _webhook["batch_limit"] == 0:
+        # A fresh process doesn't know the limit yet; the first record's response says
+        first = await deliver_post_call(payloads[0])
+        return [first, *await _deliver_in_chunks(payloads[1:])]
+    return await _deliver_in_chunks(payloads)
+
+
+async def _deliver_in_chunks(payloads: list[dict]) -> list[dict]:
+    size = max(_webhook["batch_limit"], 1)
+    chunks = [payloads[i:i + size] for i in range(0, len(payloads), size)]
+    results = await asyncio.gather(*(_deliver_chunk(chunk) for chunk in chunks))
+    return [result for chunk in results for result in chunk]
+
+
+async def _deliver_chunk(payloads: list[dict]) -> list[dict]:
+    if len(payloads) > 1:
+        results = await _post_batch(payloads)
+        if results is not None:
+            return results
+    return list(await asyncio.gather(*(deliver_post_call(p) for p in payloads)))
+
+
+async def _post_batch(payloads: list[dict]) -> list[dict] | None:
+    """One batched request; None if the webhook refuses batches."""
+    try:
+        resp, label = await _post_webhook(payloads, batch=True)
+    except Exception as e:
+        record_error()
+        logger.error(f"Failed to send {len(payloads)} post-call records to Omnira: {e}")
+        return [{"success": False, "error": str(e), "unavailable": True}] * len(payloads)
+    if resp.status_code in _BATCH_UNSUPPORTED:
+        logger.warning(f"Omnira webhook refused a batch ({resp.status_code}) — sending call records one by one")
+        _webhook["batch_limit"] = 0
+        _webhook["batch_rejected"] = True
+        return None
+    if resp.status_code >= 300:
+        return [_webhook_result(resp)] * len(payloads)
+    _note_capabilities(resp)
+    try:
+        results = resp.json().get("results")
+    except (ValueError, AttributeError):
+        results = None
+    if not isinstance(results, list) or len(results) != len(payloads):
+        # Accepted as a whole without per-record results
+        results = [{"success": True}] * len(payloads)
+    logger.info(f"Post-call data for {len(payloads)} calls sent to Omnira in one request ({label})")
+    return [
+        {"success": False, "error": str(r.get("error", "rejected"))}
+        if isinstance(r, dict) and r.get("success") is False else {"success": True}
+        for r in results
+    ]
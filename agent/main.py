@@ -3,22 +3,56 @@ import asyncio
 import json
 import logging
 import uuid
+from typing import Awaitable, Callable
 
 from dotenv import load_dotenv
 from livekit import rtc
-from livekit.agents import WorkerOptions, cli, ConversationItemAddedEvent, FunctionToolsExecutedEvent
+from livekit.agents import (
+    WorkerOptions,
+    JobProcess,
+    cli,
+    AgentStateChangedEvent,
+    ConversationItemAddedEvent,
+    FunctionToolsExecutedEvent,
+    UserInputTranscribedEvent,
+    UserStateChangedEvent,
+)
 
-from agent.voice_agent import OmniraReceptionist, create_agent_session
-from agent.logger import CallLogger
-from agent.config import Config, PracticeConfig
+from agent.voice_agent import (
+    OmniraReceptionist,
+    create_agent_session,
+    prewarm_components,
+    warm_provider_connections,
+)
+from agent.logger import (
+    CallLogger, deliver_post_call, deliver_post_call_batch, post_call_stats, probe_post_call_webhook,
+)
+from agent.config import Config, PracticeConfig, practice_config_cache
 from agent.recording import start_room_recording, get_recording_url, wait_for_egress
+from agent.http_client import get_client, pool_stats, timeout_for, warm
+from agent.call_context import current_call
+from agent.phases import PhaseTimer
+from agent.prompts import kb_is_indexed
+from agent import knowledge
+from agent.prefetch import AvailabilityPrefetch, likely_dates
+from agent.tool_cache import ToolCache
+from agent.tool_results import ToolTokens
+from agent.outbox import get_outbox, get_post_call_spool
+from agent.log_pipeline import HIGH_VOLUME, configure_logging, drain_logs, logging_stats, preview
+from agent.tools import (
+    action_health,
+    batching_stats,
+    deliver_queued_action,
+    load_action_health,
+    prefetch_availability,
+    save_action_health,
+    sync_schedule,
+)
+from tts.phrase_cache import CachedTTS, phrase_cache_stats
 
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
-)
+configure_logging()
 logger = logging.getLogger("omnira")
 logger.info(f"Worker started | Default practice: {Config.PRACTICE_NAME} | Agent: {Config.AGENT_NAME}")
 
@@ -52,50 +86,20 @@ async def _resolve_practice_config(participant, room_name: str = "") -> Practice
     to_number = attrs.get("sip.calledNumber", attrs.get("sip.to", ""))
     if to_number:
         logger.info(f"Resolving practice by phone number: {to_number}")
-        try:
-            import httpx
-            async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-                resp = await client.get(
-                    f"{Config.OMNIRA_API_URL}/voice-engine/practice-config",
-                    params={"phone_number": to_number},
-                    headers={"Authorization": f"Bearer {Config.OMNIRA_API_KEY}"},
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    return PracticeConfig(
-                        practice_id=data.get("practice_id", ""),
-                        practice_name=data.get("practice_name", Config.PRACTICE_NAME),
-                        practice_phone=data.get("practice_phone", Config.PRACTICE_PHONE),
-                        practice_timezone=data.get("practice_timezone", Config.PRACTICE_TIMEZONE),
-                        practice_hours=data.get("practice_hours", Config.PRACTICE_HOURS),
-                        practice_address=data.get("practice_address", Config.PRACTICE_ADDRESS),
-                        agent_name=data.get("agent_name", Config.AGENT_NAME),
-                        tts_provider=data.get("tts_provider", Config.TTS_PROVIDER),
-                        tts_voice_id=data.get("tts_voice_id", ""),
-                        knowledge_base=data.get("knowledge_base", ""),
-                        operating_hours=data.get("operating_hours", []),
-                    )
-        except Exception as e:
-            logger.error(f"Failed to resolve practice by phone: {e}")
+        config = await PracticeConfig.fetch_by_phone(to_number)
+        if config is not None:
+            return config
+        logger.error(f"Failed to resolve practice by phone: {to_number}")
 
     logger.info("No practice_id found — using env fallback config")
     return PracticeConfig.from_env()
 
 
-async def _send_post_call_and_disconnect(ctx, call_id: str, call_logger: CallLogger, egress_id: str | None, post_call_sent: asyncio.Event):
-    """Send post-call data THEN disconnect the room. Must happen in this order
-    because LiveKit kills the process immediately after room disconnect."""
+async def _send_post_call_and_disconnect(ctx, call_id: str, finish_call: Callable[[str], Awaitable[None]]):
+    """Spool and send post-call data THEN disconnect the room. Must happen in this
+    order because LiveKit kills the process immediately after room disconnect."""
     try:
-        if not post_call_sent.is_set():
-            post_call_sent.set()
-            call_logger.log_call_end(reason="agent_ended")
-            if egress_id:
-                recording_url = get_recording_url(call_id)
-                call_logger.set_recording_url(recording_url)
-                logger.info(f"[{call_id}] Recording URL (optimistic): {recording_url}")
-            logger.info(f"Call {call_id} ended — sending data to Omnira")
-            await call_logger.send_to_omnira()
-            logger.info(f"Call {call_id} — post-call data sent")
+        await finish_call("agent_ended")
     except Exception as e:
         logger.error(f"[{call_id}] Post-call send error: {e}")
 
@@ -106,25 +110,100 @@ async def _send_post_call_and_disconnect(ctx, call_id: str, call_logger: CallLog
         logger.warning(f"[{call_id}] Room disconnect error: {e}")
 
 
+def prewarm(proc: JobProcess):
+    """Worker prewarm_fnc — runs once per idle job process, before any call."""
+    prewarm_components(proc.userdata)
+
+
+async def _start_call_session(call_id: str, practice_id: str, from_number: str, to_number: str) -> None:
+    """Register the verification session + caller-ID recognition (spec 59).
+
+    Optional for the call: on failure the caller is simply treated as
+    anonymous. Recognition fills current_call so the greeting can personalize
+    ("Am I speaking with Sarah?").
+    """
+    try:
+        resp = await get_client().post(
+            f"{Config.OMNIRA_API_URL}/voice-engine/actions",
+            json={
+                "action": "start_call_session",
+                "practice_id": practice_id,
+                "params": {"call_id": call_id, "caller_number": from_number, "called_number": to_number},
+            },
+            timeout=timeout_for("start_call_session"),
+        )
+        if resp.status_code < 400:
+            data = resp.json()
+            if data.get("recognized"):
+                current_call.recognized_first_name = data.get("greeting_name", "") or ""
+                recent = data.get("recent_call") or {}
+                current_call.recent_call_topic = (recent.get("topic") or "") if isinstance(recent, dict) else ""
+                logger.info(f"[{call_id}] Caller recognized: {current_call.recognized_first_name}")
+    except Exception as e:
+        logger.warning(f"[{call_id}] start_call_session failed (continuing anonymous): {e}")
+
+
 async def entrypoint(ctx):
-    """Handle a new call/room connection."""
+    """Handle a new call/room connection.
+
+    Setup runs as a dependency graph rather than a straight line:
+
+        connect ─┬─ recording (optional, deadline)
+                 └─ participant ── practice_config ─┬─ recognition (optional, deadline)
+                                                     └─ agent_session ── session_start
+
+    The greeting (on_enter) waits for recognition, but nothing else does.
+    """
+    call_id = str(uuid.uuid4())
+    phases = PhaseTimer(call_id)
+
+    # First thing in the job: open the platform and provider connections
+    # while LiveKit is still connecting — the config fetch and first LLM
+    # turn then reuse them. (Not in prewarm: that runs before the job's
+    # event loop exists, so its connections couldn't serve the call.)
+    warmups = [
+        phases.spawn("http_warm", warm()),
+        phases.spawn("provider_warm", warm_provider_connections(ctx.proc.userdata)),
+    ]
     logger.info(f"New connection: room={ctx.room.name}")
+    # Latency history and breaker state from earlier calls on this host
+    health_task = phases.spawn("action_health", load_action_health())
 
-    await ctx.connect()
+    await phases.run("connect", ctx.connect())
 
-    participant = await ctx.wait_for_participant()
+    # Recording only needs the room, so it starts now instead of after the
+    # greeting — and never holds anything else up.
+    recording_task = phases.spawn(
+        "recording",
+        start_room_recording(ctx.room.name, call_id),
+        deadline=Config.RECORDING_DEADLINE,
+    )
+
+    participant = await phases.run("participant", ctx.wait_for_participant())
     logger.info(f"Participant joined: {participant.identity}")
 
     # Resolve practice config dynamically
-    practice_config = await _resolve_practice_config(participant, room_name=ctx.room.name)
-    logger.info(f"Practice resolved: {practice_config.practice_name} (id={practice_config.practice_id})")
+    practice_config = await phases.run(
+        "practice_config",
+        _resolve_practice_config(participant, room_name=ctx.room.name),
+    )
+    logger.info(
+        f"Practice resolved: {practice_config.practice_name} (id={practice_config.practice_id}) "
+        f"| config cache: {practice_config_cache.stats}"
+    )
+
+    # Large knowledge bases are searched by tool rather than inlined in the
+    # prompt; the index is built once per practice and reused.
+    if kb_is_indexed(practice_config):
+        with phases.track("kb_index"):
+            knowledge.index_for(practice_config.practice_id, practice_config.knowledge_base)
 
     # Update global Config so tool calls use the resolved practice_id
     if practice_config.practice_id:
         Config.PRACTICE_ID = practice_config.practice_id
 
     sip_attrs = participant.attributes or {}
-    logger.info(f"SIP participant attributes: {sip_attrs}")
+    logger.info("SIP participant attributes: %s", sip_attrs)
     logger.info(f"Participant identity: {participant.identity}, kind: {participant.kind}")
 
     # Extract caller number from SIP attributes or participant identity
@@ -145,48 +224,62 @@ async def entrypoint(ctx):
         or practice_config.practice_phone
     )
 
-    call_id = str(uuid.uuid4())
     call_logger = CallLogger(
         call_id=call_id,
         from_number=from_number,
         to_number=to_number,
         practice_id=practice_config.practice_id,
     )
+    call_logger.set_setup_timings(phases.timings)
     logger.info(f"Call {call_id}: from={from_number} to={to_number} practice={practice_config.practice_id}")
 
     # Per-call context for the tool layer (spec 59): the call_session_id rides
     # on every platform action so verification is enforced server-side.
-    from agent.call_context import current_call
     current_call.reset()
     current_call.call_id = call_id
     current_call.practice_id = practice_config.practice_id
     current_call.caller_number = from_number
+    current_call.latency = call_logger.latency
+    current_call.practice_config = practice_config
+    if Config.OUTBOX:
+        # Also picks up anything an earlier job process on this host left queued
+        get_outbox(Config.CACHE_DIR).start(deliver_queued_action)
+    if Config.POST_CALL_SPOOL:
+        # Call records earlier job processes on this host couldn't deliver
+        get_post_call_spool(Config.CACHE_DIR).start(deliver_post_call, deliver_post_call_batch, Config.POST_CALL_BATCH_MAX)
+    # Which payload format / encoding the webhook takes and whether events
+    # can be streamed to it during the call, learned before hangup
+    post_call_probe = asyncio.create_task(probe_post_call_webhook(), name="post-call-probe")
+    call_logger.start_streaming()
+    if Config.TOOL_CACHE:
+        current_call.tool_cache = ToolCache(
+            ttl=Config.TOOL_CACHE_TTL, ttls={"check_availability": Config.AVAILABILITY_PREFETCH_TTL}
+        )
+    current_call.tool_tokens = ToolTokens()
+
+    # Most booking calls ask about today / tomorrow / next Monday — start
+    # those lookups now so check_availability can answer from memory.
+    if Config.AVAILABILITY_PREFETCH:
+        current_call.availability = AvailabilityPrefetch(ttl=Config.AVAILABILITY_PREFETCH_TTL)
+        current_call.availability.start(
+            likely_dates(practice_config), Config.AVAILABILITY_PREFETCH_PROCEDURES, prefetch_availability
+        )
+    schedule_sync = (
+        asyncio.create_task(sync_schedule(practice_config), name="schedule-sync") if Config.SLOT_ENGINE else None
+    )
 
-    # Register the verification session + caller-ID recognition BEFORE the
-    # greeting so the agent can personalize ("Am I speaking with Sarah?").
-    try:
-        import httpx
-        async with httpx.AsyncClient(timeout=6.0, follow_redirects=True) as client:
-            resp = await client.post(
-                f"{Config.OMNIRA_API_URL}/voice-engine/actions",
-                json={
-                    "action": "start_call_session",
-                    "practice_id": practice_config.practice_id,
-                    "params": {"call_id": call_id, "caller_number": from_number, "called_number": to_number},
-                },
-                headers={"Authorization": f"Bearer {Config.OMNIRA_API_KEY}"},
-            )
-            if resp.status_code < 400:
-                data = resp.json()
-                if data.get("recognized"):
-                    current_call.recognized_first_name = data.get("greeting_name", "") or ""
-                    recent = data.get("recent_call") or {}
-                    current_call.recent_call_topic = (recent.get("topic") or "") if isinstance(recent, dict) else ""
-                    logger.info(f"[{call_id}] Caller recognized: {current_call.recognized_first_name}")
-    except Exception as e:
-        logger.warning(f"[{call_id}] start_call_session failed (continuing anonymous): {e}")
-
-    session = create_agent_session(practice_config)
+    # Caller recognition and session construction are independent — the
+    # platform round trip runs while the TTS client is built and warmed.
+    recognition_task = phases.spawn(
+        "recognition",
+        _start_call_session(call_id, practice_config.practice_id, from_number, to_number),
+        deadline=Config.RECOGNITION_DEADLINE,
+    )
+    # VAD/STT/LLM are prewarmed per process, so this only builds the TTS and
+    # must stay on the loop (AgentSession binds to the running loop).
+    with phases.track("agent_session"):
+        session = create_agent_session(practice_config, ctx.proc.userdata)
+    call_logger.latency.label_components(stt=session.stt, llm=session.llm, tts=session.tts)
 
     @session.on("conversation_item_added")
     def on_conversation_item_added(event: ConversationItemAddedEvent):
@@ -199,6 +292,77 @@ async def entrypoint(ctx):
         elif role == "assistant":
             call_logger.log_agent_speech(text)
 
+    @session.on("user_state_changed")
+    def on_user_state_changed(event: UserStateChangedEvent):
+        if event.new_state == "speaking":
+            call_logger.latency.caller_started()
+        elif event.old_state == "speaking":
+            call_logger.latency.caller_stopped()
+
+    @session.on("user_input_transcribed")
+    def on_user_input_transcribed(event: UserInputTranscribedEvent):
+        if event.is_final:
+            call_logger.latency.transcript_final()
+
+    @session.on("agent_state_changed")
+    def on_agent_state_changed(event: AgentStateChangedEvent):
+        if event.new_state == "speaking":
+            call_logger.latency.agent_speaking()
+
+    egress_id: str | None = None
+    post_call_sent = asyncio.Event()
+
+    async def finish_call(reason: str) -> None:
+        """Log the call's end and metrics, then spool + send the post-call record (once)."""
+        if post_call_sent.is_set():
+            return
+        post_call_sent.set()
+        call_logger.log_call_end(reason=reason)
+
+        # Send post-call data FIRST (before waiting for recording — process may exit)
+        # If recording is available, we'll set a preliminary URL optimistically
+        if egress_id:
+            recording_url = get_recording_url(call_id)
+            call_logger.set_recording_url(recording_url)
+            logger.info(f"[{call_id}] Recording URL (optimistic): {recording_url}")
+
+        if isinstance(session.tts, CachedTTS):
+            logger.info(
+                f"[{call_id}] TTS phrase cache: {session.tts.stats['hits']} hit(s) / "
+                f"{session.tts.stats['misses']} miss(es) this call ({session.tts.hit_rate():.0%}) | "
+                f"process: {phrase_cache_stats()}"
+            )
+
+        if call_logger.latency.turns:
+            logger.info(f"[{call_id}] Turn latency p50/p95: {call_logger.latency.summary_line()}")
+        if current_call.availability is not None:
+            call_logger.log_event("availability_prefetch", current_call.availability.report())
+            current_call.availability.invalidate()
+        if schedule_sync is not None and not schedule_sync.done():
+            schedule_sync.cancel()
+        if not post_call_probe.done():
+            post_call_probe.cancel()
+        for task in warmups:
+            if not task.done():
+                task.cancel()
+        if current_call.tool_cache is not None:
+            call_logger.log_event("tool_cache", current_call.tool_cache.report())
+        if current_call.tool_tokens is not None and current_call.tool_tokens.calls:
+            call_logger.log_event("tool_tokens", current_call.tool_tokens.report())
+        if batching_stats()["requests"]:
+            call_logger.log_event("action_batching", batching_stats())
+        call_logger.log_event("action_health", action_health())
+        await save_action_health()
+        if Config.OUTBOX:
+            call_logger.log_event("outbox", get_outbox(Config.CACHE_DIR).report())
+        call_logger.log_event("logging", logging_stats())
+
+        logger.info(f"Call {call_id} ended — sending data to Omnira")
+        await call_logger.send_to_omnira()
+        logger.info(
+            f"Call {call_id} — post-call data handed off | wire: {post_call_stats()} | http pool: {pool_stats()}"
+        )
+
     @session.on("function_tools_executed")
     def on_function_tools_executed(event: FunctionToolsExecutedEvent):
         for fnc_call, fnc_output in event.zipped():
@@ -210,29 +374,41 @@ async def entrypoint(ctx):
                     args = {}
             except Exception:
                 args = {}
-            result_str = str(fnc_output.output or fnc_output.content or "")[:500]
-            call_logger.log_tool_call(tool_name, args, result_str)
-            logger.info(f"[{call_id}] Tool: {tool_name}({json.dumps(args)[:100]}) → {result_str[:100]}")
+            output = str(fnc_output.output or fnc_output.content or "")
+            result_str = output[:500]
+            cache = current_call.tool_cache.outcomes.pop(fnc_call.call_id, "") if current_call.tool_cache else ""
+            tokens = current_call.tool_tokens.add(fnc_call.call_id, tool_name, output) if current_call.tool_tokens else None
+            call_logger.log_tool_call(tool_name, args, result_str, cache=cache, tokens=tokens)
+            logger.info(
+                "[%s] Tool: %s(%s) → %s", call_id, tool_name, preview(args, 100), preview(result_str, 100),
+                extra=HIGH_VOLUME,
+            )
 
             if tool_name == "end_call" and "__END_CALL__" in result_str:
-                logger.info(f"[{call_id}] Agent requested call end — disconnecting in 2s")
-                asyncio.get_event_loop().call_later(2.0, lambda: asyncio.ensure_future(_disconnect_room(ctx, call_id)))
-
-    agent = OmniraReceptionist(call_logger=call_logger, practice_config=practice_config)
+                logger.info(f"[{call_id}] Agent requested call end — sending post-call data and disconnecting in 2s")
+                asyncio.get_event_loop().call_later(
+                    2.0, lambda: asyncio.ensure_future(_send_post_call_and_disconnect(ctx, call_id, finish_call))
+                )
 
-    await session.start(
-        agent=agent,
-        room=ctx.room,
+    agent = OmniraReceptionist(
+        call_logger=call_logger,
+        practice_config=practice_config,
+        recognition=recognition_task,
+        phases=phases,
     )
 
+    # The first tool call's breaker / hedge delay should see the host's history
+    await health_task
+    await phases.run("session_start", session.start(agent=agent, room=ctx.room))
+
     logger.info(f"Agent started in room {ctx.room.name}")
 
-    # Start recording via LiveKit Egress
-    egress_id = await start_room_recording(ctx.room.name, call_id)
+    egress_id = await recording_task
     if egress_id:
         logger.info(f"[{call_id}] Recording egress started: {egress_id}")
     else:
         logger.info(f"[{call_id}] Recording not available (S3 creds not configured)")
+    logger.info(f"[{call_id}] Setup phases: {phases.summary()}")
 
     disconnect_event = asyncio.Event()
 
@@ -250,23 +426,24 @@ async def entrypoint(ctx):
 
     await disconnect_event.wait()
 
-    call_logger.log_call_end(reason="caller_disconnected")
-
-    # Send post-call data FIRST (before waiting for recording — process may exit)
-    # If recording is available, we'll set a preliminary URL optimistically
-    if egress_id:
-        recording_url = get_recording_url(call_id)
-        call_logger.set_recording_url(recording_url)
-        logger.info(f"[{call_id}] Recording URL (optimistic): {recording_url}")
+    await finish_call("caller_disconnected")
 
-    logger.info(f"Call {call_id} ended — sending data to Omnira")
-    await call_logger.send_to_omnira()
-    logger.info(f"Call {call_id} — post-call data sent")
+    if Config.OUTBOX:
+        outbox = get_outbox(Config.CACHE_DIR)
+        await outbox.drain(Config.OUTBOX_DRAIN_TIMEOUT)
+        await outbox.aclose()
+    if Config.POST_CALL_SPOOL:
+        await get_post_call_spool(Config.CACHE_DIR).aclose()
+    # A background config refresh may still be writing the shared cache file
+    await practice_config_cache.flush()
+    # Queued lines reach LiveKit's log forwarder before the job process exits
+    await asyncio.to_thread(drain_logs, 2.0)
 
 
 if __name__ == "__main__":
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
         ),
     )
@@ -0,0 +1,343 @@
+"""Durable outbox for side-effect actions (send_sms, send_confirmation_email, log_message).
+
+The caller doesn't need to hear Twilio's or Resend's answer before the
+conversation moves on, so these actions are written to a local SQLite (WAL)
+queue under CACHE_DIR and the tool returns at once. A background worker
+delivers them to the platform:
+
+  - every row has an idempotency key (call_session_id + action + params),
+    sent as `idempotency_key` in the action body, so a retry after a lost
+    response — or the LLM calling the same tool twice — is delivered once
+  - transport errors and 5xx are retried with exponential backoff up to
+    `max_attempts`; a 4xx-style rejection is final
+  - a row is leased while being delivered, so every job process on the host
+    can run a worker without double-sending
+
+Rows survive the job process being killed after the room disconnects; the
+next job process on the host picks them up when its worker starts.
+
+The same store spools post-call records (get_post_call_spool): the call
+record is written before hangup handling, delivered to the webhook with
+retries and backoff, and, when several are due at once (stragglers after
+an outage or a crash), several calls go in one request.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from agent.tool_cache import params_key
+
+logger = logging.getLogger("omnira-outbox")
+
+OUTBOX_ACTIONS = frozenset({"send_sms", "send_confirmation_email", "log_message"})
+
+Deliver = Callable[[dict], Awaitable[dict]]
+# Several bodies in one request → one result per body, or None to send them one by one
+DeliverBatch = Callable[[list[dict]], Awaitable[list[dict] | None]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    action TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+def idempotency_key(body: dict) -> str:
+    raw = f"{body.get('call_session_id')}|{body['action']}|{params_key(body.get('params', {}))}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+class Outbox:
+    """SQLite-backed queue of actions plus the worker that delivers them."""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        name: str = "outbox",
+        max_attempts: int = 8,
+        base_delay: float = 2.0,
+        max_delay: float = 300.0,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 5.0,
+    ):
+        self.path = path
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = uuid.uuid4().hex[:12]
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._wake = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+        self._deliver: Deliver | None = None
+        self._deliver_batch: DeliverBatch | None = None
+        self.batch_size = 1
+        self.stats = {
+            "enqueued": 0, "duplicates": 0, "delivered": 0, "retried": 0, "dead": 0, "batches": 0, "db_errors": 0,
+        }
+
+    # ── storage (blocking; called via asyncio.to_thread) ─────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def _insert(self, key: str, body: dict) -> bool:
+        now = time.time()
+        with self._lock:
+            cur = self._conn().execute(
+                "INSERT OR IGNORE INTO outbox (key, action, body, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, _label(body, self.name), json.dumps(body), now, now, now),
+            )
+        return cur.rowcount == 1
+
+    def _claim(self, limit: int = 10) -> list[tuple[str, dict, int]]:
+        """Lease due rows for this process (including ones a dead process had leased)."""
+        now = time.time()
+        claimed = []
+        with self._lock:
+            db = self._conn()
+            rows = db.execute(
+                "SELECT key, body, attempts FROM outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? AND lease_until < ? "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            for key, body, attempts in rows:
+                cur = db.execute(
+                    "UPDATE outbox SET lease_owner = ?, lease_until = ? "
+                    "WHERE key = ? AND status = 'pending' AND lease_until < ?",
+                    (self.owner, now + self.lease_seconds, key, now),
+                )
+                if cur.rowcount == 1:
+                    claimed.append((key, json.loads(body), attempts))
+        return claimed
+
+    def _finish(self, key: str, status: str, attempts: int, error: str | None = None, retry_at: float = 0.0) -> None:
+        with self._lock:
+            self._conn().execute(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?, "
+                "lease_owner = NULL, lease_until = 0, updated_at = ? WHERE key = ?",
+                (status, attempts, error, retry_at, time.time(), key),
+            )
+
+    def _next_due(self) -> float | None:
+        """Wall-clock time the next unleased pending row becomes due."""
+        with self._lock:
+            return self._conn().execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending' AND lease_until < ?",
+                (time.time(),),
+            ).fetchone()[0]
+
+    def _pending_count(self) -> int:
+        with self._lock:
+            return self._conn().execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def _prune(self, older_than: float = 86400.0) -> None:
+        with self._lock:
+            self._conn().execute(
+                "DELETE FROM outbox WHERE status = 'delivered' AND updated_at < ?", (time.time() - older_than,)
+            )
+
+    # ── API ──────────────────────────────────────────────────────────────
+
+    async def enqueue(self, body: dict, key: str | None = None) -> str:
+        """Persist a body for delivery; returns its idempotency key."""
+        key = key or idempotency_key(body)
+        body = {**body, "idempotency_key": key}
+        label = _label(body, self.name)
+        if await asyncio.to_thread(self._insert, key, body):
+            self.stats["enqueued"] += 1
+            logger.info(f"Queued {label} ({key[:8]})")
+        else:
+            self.stats["duplicates"] += 1
+            logger.info(f"{label} already queued ({key[:8]}) — not sending twice")
+        self._wake.set()
+        return key
+
+    def start(self, deliver: Deliver, deliver_batch: DeliverBatch | None = None, batch_size: int = 1) -> None:
+        """Run the delivery worker (also drains what earlier processes left behind)."""
+        self._deliver = deliver
+        self._deliver_batch = deliver_batch
+        self.batch_size = max(1, batch_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run(), name="omnira-outbox")
+
+    async def drain(self, timeout: float) -> int:
+        """Deliver what's due before the process exits; returns how many are still pending.
+
+        A database error (locked, disk full) ends the drain early and leaves
+        the rows for the next one — it never propagates to the caller.
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            while time.monotonic() < deadline:
+                if await self._deliver_due():
+                    continue
+                # Nothing due now — wait for a retry that comes due before the deadline
+                next_due = await asyncio.to_thread(self._next_due)
+                if next_due is None:
+                    break
+                wait = next_due - time.time()
+                if wait > deadline - time.monotonic():
+                    break
+                await asyncio.sleep(max(0.0, wait))
+            pending = await asyncio.to_thread(self._pending_count)
+        except sqlite3.Error as e:
+            self._db_error("drain", e)
+            return 0
+        if pending:
+            logger.info(f"{pending} outbox action(s) left for the next job process")
+        return pending
+
+    async def aclose(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def report(self) -> dict:
+        return dict(self.stats)
+
+    # ── worker ───────────────────────────────────────────────────────────
+
+    async def _run(self) -> None:
+        try:
+            await asyncio.to_thread(self._prune)
+        except sqlite3.Error as e:
+            logger.warning(f"Outbox prune failed: {e}")
+        while True:
+            try:
+                await self._deliver_due()
+            except sqlite3.Error as e:
+                self._db_error("delivery pass", e)
+            except Exception as e:
+                logger.error(f"Outbox delivery pass failed: {e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _db_error(self, what: str, error: sqlite3.Error) -> None:
+        self.stats["db_errors"] += 1
+        logger.warning(f"{self.name} {what} failed ({error}) — rows stay queued for the next drain")
+
+    async def _deliver_due(self) -> int:
+        claimed = await asyncio.to_thread(self._claim)
+        if self._deliver_batch is not None and self.batch_size > 1 and len(claimed) > 1:
+            chunks = [claimed[i:i + self.batch_size] for i in range(0, len(claimed), self.batch_size)]
+            await asyncio.gather(*(self._deliver_chunk(chunk) for chunk in chunks))
+        elif claimed:
+            await asyncio.gather(*(self._deliver_one(*row) for row in claimed))
+        return len(claimed)
+
+    async def _deliver_chunk(self, rows: list[tuple[str, dict, int]]) -> None:
+        if len(rows) == 1:
+            await self._deliver_one(*rows[0])
+            return
+        try:
+            results = await self._deliver_batch([body for _, body, _ in rows])
+        except Exception as e:
+            results = [{"success": False, "error": str(e), "unavailable": True}] * len(rows)
+        if results is None:
+            await asyncio.gather(*(self._deliver_one(*row) for row in rows))
+            return
+        self.stats["batches"] += 1
+        await asyncio.gather(*(
+            self._settle(key, body, attempts + 1, result) for (key, body, attempts), result in zip(rows, results)
+        ))
+
+    async def _deliver_one(self, key: str, body: dict, attempts: int) -> None:
+        try:
+            result = await self._deliver(body)
+        except Exception as e:
+            result = {"success": False, "error": str(e), "unavailable": True}
+        await self._settle(key, body, attempts + 1, result)
+
+    async def _settle(self, key: str, body: dict, attempts: int, result: dict) -> None:
+        label = _label(body, self.name)
+        if result.get("success"):
+            self.stats["delivered"] += 1
+            await self._record(key, "delivered", attempts)
+            return
+        error = str(result.get("error", "unknown"))[:500]
+        if result.get("unavailable") and attempts < self.max_attempts:
+            # Platform/transport trouble — back off and try again
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+            self.stats["retried"] += 1
+            logger.warning(f"{label} ({key[:8]}) attempt {attempts} failed: {error} — retrying in {delay:.0f}s")
+            await self._record(key, "pending", attempts, error, time.time() + delay)
+            return
+        self.stats["dead"] += 1
+        logger.error(f"{label} ({key[:8]}) not delivered after {attempts} attempt(s): {error}")
+        await self._record(key, "dead", attempts, error)
+
+    async def _record(self, key: str, *outcome) -> None:
+        # If this can't be written the lease runs out and the row is sent
+        # again; the idempotency key lets the platform drop the duplicate
+        try:
+            await asyncio.to_thread(self._finish, key, *outcome)
+        except sqlite3.Error as e:
+            self._db_error(f"recording {key[:8]}", e)
+
+
+def _label(body: dict, default: str) -> str:
+    return body.get("action") or default
+
+
+_outbox: Outbox | None = None
+
+
+def get_outbox(directory: str) -> Outbox:
+    """Process-wide outbox, in the host-shared cache directory."""
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox(os.path.join(directory, "outbox.db"))
+    return _outbox
+
+
+_post_call_spool: Outbox | None = None
+
+
+def get_post_call_spool(directory: str) -> Outbox:
+    """Process-wide spool of post-call webhook records (retried for about an hour)."""
+    global _post_call_spool
+    if _post_call_spool is None:
+        _post_call_spool = Outbox(
+            os.path.join(directory, "post-call.db"), name="post_call", max_attempts=12, max_delay=600.0
+        )
+    return _post_call_spool
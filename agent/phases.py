@@ -0,0 +1,97 @@
+"""Call-setup phase timing.
+
+The entrypoint runs setup as a small dependency graph (see agent/main.py):
+independent phases are spawned as tasks, optional ones get a hard deadline
+and a default, and every phase's start offset + duration lands in the
+CallLogger payload so we can see where time-to-first-audio goes.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Iterator
+
+logger = logging.getLogger("omnira-phases")
+
+
+class PhaseTimer:
+    """Records {phase: {"start_ms", "ms", "status"}} relative to job start."""
+
+    def __init__(self, call_id: str = ""):
+        self.call_id = call_id
+        self._t0 = time.monotonic()
+        self.timings: dict[str, dict] = {}
+
+    def _ms_since_start(self) -> float:
+        return round((time.monotonic() - self._t0) * 1000, 1)
+
+    async def run(
+        self,
+        name: str,
+        awaitable: Awaitable[Any],
+        deadline: float | None = None,
+        default: Any = None,
+    ) -> Any:
+        """Await one phase and record it.
+
+        With a deadline the phase is optional: overrunning it cancels the work
+        and returns `default` instead of holding up the greeting. Without one,
+        exceptions propagate — the call can't proceed without that phase.
+        """
+        start_ms = self._ms_since_start()
+        status = "ok"
+        try:
+            if deadline is None:
+                return await awaitable
+            return await asyncio.wait_for(awaitable, timeout=deadline)
+        except asyncio.TimeoutError:
+            if deadline is None:
+                status = "error"
+                raise
+            status = "timeout"
+            logger.warning(f"[{self.call_id}] Setup phase '{name}' exceeded {deadline:.1f}s deadline — continuing without it")
+            return default
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self.timings[name] = {
+                "start_ms": start_ms,
+                "ms": round(self._ms_since_start() - start_ms, 1),
+                "status": status,
+            }
+
+    def spawn(
+        self,
+        name: str,
+        awaitable: Awaitable[Any],
+        deadline: float | None = None,
+        default: Any = None,
+    ) -> asyncio.Task:
+        """Start a phase in the background; await the task where it's needed."""
+        return asyncio.create_task(self.run(name, awaitable, deadline, default), name=f"setup:{name}")
+
+    @contextmanager
+    def track(self, name: str) -> Iterator[None]:
+        """Time a synchronous phase: `with phases.track("agent_session"): ...`"""
+        start_ms = self._ms_since_start()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self.timings[name] = {
+                "start_ms": start_ms,
+                "ms": round(self._ms_since_start() - start_ms, 1),
+                "status": status,
+            }
+
+    def mark(self, name: str) -> None:
+        """Record a milestone (zero-duration phase), e.g. 'greeting_requested'."""
+        self.timings[name] = {"start_ms": self._ms_since_start(), "ms": 0.0, "status": "ok"}
+
+    def summary(self) -> str:
+        ordered = sorted(self.timings.items(), key=lambda kv: kv[1]["start_ms"])
+        return " ".join(f"{name}=+{t['start_ms']:.0f}/{t['ms']:.0f}ms" for name, t in ordered)
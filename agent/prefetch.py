@@ -0,0 +1,106 @@
+"""Speculative availability prefetch.
+
+Nearly every booking call runs check_availability, almost always for today,
+tomorrow or next Monday — the same dates the system prompt spells out. As
+soon as the practice is resolved, the entrypoint starts those fetches in the
+background; when the LLM asks, check_availability answers from this per-call
+store (or joins the fetch still in flight) instead of a 1–2 s platform round
+trip.
+
+Entries expire `ttl` seconds after they arrive so a slot someone else booked
+meanwhile isn't offered for long; an expired or failed entry is simply a
+miss and the tool goes to the platform as before. Booking drops everything.
+"""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from agent.config import PracticeConfig
+from agent.prompts import _next_monday, _now_for
+
+logger = logging.getLogger("omnira-prefetch")
+
+Fetcher = Callable[[str, str], Awaitable[dict]]
+
+
+def likely_dates(config: PracticeConfig) -> list[str]:
+    """Today, tomorrow and next Monday (YYYY-MM-DD, practice timezone)."""
+    now = _now_for(config)
+    today = now.strftime("%Y-%m-%d")
+    tomorrow = (now + timedelta(days=1)).strftime("%Y-%m-%d")
+    return list(dict.fromkeys([today, tomorrow, _next_monday(today)]))
+
+
+class AvailabilityPrefetch:
+    """Per-call store of check_availability results keyed by (date, procedure)."""
+
+    def __init__(self, ttl: float = 120.0):
+        self.ttl = ttl
+        self._entries: dict[tuple[str, str], dict] = {}
+        self.stats = {"prefetched": 0, "hits": 0, "joined": 0, "misses": 0, "expired": 0, "failed": 0}
+
+    @staticmethod
+    def _key(date: str, procedure_type: str) -> tuple[str, str]:
+        return date.strip(), (procedure_type or "general").strip().lower()
+
+    def start(self, dates: list[str], procedure_types: list[str], fetch: Fetcher) -> None:
+        for date in dates:
+            for procedure_type in procedure_types:
+                key = self._key(date, procedure_type)
+                if key in self._entries:
+                    continue
+                entry = {"done_at": None}
+                task = asyncio.create_task(fetch(*key), name=f"prefetch:{key[0]}:{key[1]}")
+                task.add_done_callback(lambda _t, e=entry: e.__setitem__("done_at", time.monotonic()))
+                entry["task"] = task
+                self._entries[key] = entry
+                self.stats["prefetched"] += 1
+        logger.info(f"Prefetching availability for {', '.join(dates)} ({', '.join(procedure_types)})")
+
+    async def get(self, date: str, procedure_type: str) -> dict | None:
+        """The prefetched result, or None if the tool should ask the platform."""
+        key = self._key(date, procedure_type)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        task: asyncio.Task = entry["task"]
+        joined = not task.done()
+        if not joined and time.monotonic() - entry["done_at"] > self.ttl:
+            self._entries.pop(key, None)
+            self.stats["expired"] += 1
+            return None
+        try:
+            # Shielded: an interrupted tool call mustn't cancel the shared fetch
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            result = None  # invalidated by a booking mid-wait
+        except Exception as e:
+            logger.debug(f"Availability prefetch for {key} failed: {e}")
+            result = None
+        if not result or not result.get("success"):
+            self._entries.pop(key, None)
+            self.stats["failed"] += 1
+            return None
+
+        self.stats["joined" if joined else "hits"] += 1
+        return result
+
+    def invalidate(self) -> None:
+        """Drop everything (a booking changes availability)."""
+        for entry in self._entries.values():
+            entry["task"].cancel()
+        self._entries.clear()
+
+    def hit_rate(self) -> float:
+        served = self.stats["hits"] + self.stats["joined"]
+        lookups = served + self.stats["misses"] + self.stats["expired"] + self.stats["failed"]
+        return served / lookups if lookups else 0.0
+
+    def report(self) -> dict:
+        return {**self.stats, "hit_rate": round(self.hit_rate(), 3)}
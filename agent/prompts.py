@@ -1,6 +1,38 @@
-"""System prompt builder for the dental receptionist voice agent — v2."""
+"""System prompt builder for the dental receptionist voice agent — v2.
+
+The prompt is ~30k characters and almost all of it only changes when the
+practice config does. It is therefore built in two layers:
+
+  - a static per-practice template, compiled once and cached by a content
+    hash of the PracticeConfig (so any config change recompiles), with
+    sentinel slots where the per-call values go
+  - a small dynamic layer (date, time, greeting, caller context) rendered
+    into those slots on every call
+"""
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
 from datetime import datetime, timedelta
-from agent.config import PracticeConfig
+from agent.config import Config, PracticeConfig
+
+logger = logging.getLogger("omnira-prompts")
+
+# Per-call values that are NOT part of the cached template.
+_DYNAMIC_FIELDS = (
+    "current_date_readable",
+    "day_name",
+    "current_time",
+    "greeting",
+    "tomorrow_readable",
+    "next_mon",
+    "caller_context",
+)
+# NUL never appears in prompt text, so it can delimit slots safely.
+_SLOT = "\x00"
+_MAX_CACHED_PRACTICES = 64
 
 
 def _day_of_week(date_str: str) -> str:
@@ -33,20 +65,57 @@ def _time_of_day_greeting(hour: int) -> str:
     return "Good evening"
 
 
-def build_system_prompt(config: PracticeConfig, caller_info: dict | None = None) -> str:
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """Static template split on slots: even indices are literal text, odd
+    indices are names from _DYNAMIC_FIELDS."""
+    parts: tuple[str, ...]
+    config_hash: str
+    build_ms: float
+
+    @property
+    def static_chars(self) -> int:
+        return sum(len(p) for p in self.parts[0::2])
+
+    def render(self, values: dict[str, str]) -> str:
+        out = list(self.parts)
+        out[1::2] = [values[name] for name in self.parts[1::2]]
+        return "".join(out)
+
+
+_compiled: OrderedDict[tuple, CompiledPrompt] = OrderedDict()
+_stats: dict[str, dict] = {}
+
+
+def _cache_key(config: PracticeConfig) -> tuple:
+    """Everything the static template depends on, as a hashable tuple.
+
+    Python caches str hashes on the object and the config strings come
+    straight out of the config cache, so this stays O(1) in the size of the
+    knowledge base after the first call — a digest over the same text
+    would cost more than compiling the template.
+    """
+    return tuple(
+        json.dumps(value, sort_keys=True, default=str) if isinstance(value, (list, dict)) else value
+        for value in (getattr(config, f.name) for f in fields(config))
+    )
+
+
+def config_hash(config: PracticeConfig) -> str:
+    """Stable content hash of a practice config (for logs and stats)."""
+    return hashlib.blake2b(repr(_cache_key(config)).encode(), digest_size=8).hexdigest()
+
+
+def _now_for(config: PracticeConfig) -> datetime:
     try:
         from zoneinfo import ZoneInfo
-        now = datetime.now(ZoneInfo(config.practice_timezone))
+        return datetime.now(ZoneInfo(config.practice_timezone))
     except Exception:
-        now = datetime.now()
+        return datetime.now()
 
+
+def _dynamic_values(now: datetime, caller_info: dict | None) -> dict[str, str]:
     current_date = now.strftime("%Y-%m-%d")
-    current_date_readable = now.strftime("%A, %B %d, %Y")
-    current_time = now.strftime("%I:%M %p")
-    day_name = now.strftime("%A")
-    greeting = _time_of_day_greeting(now.hour)
-    tomorrow_readable = _tomorrow(current_date)
-    next_mon = _next_monday(current_date)
 
     # Build caller context if available
     caller_context = ""
@@ -58,9 +127,97 @@ def build_system_prompt(config: PracticeConfig, caller_info: dict | None = None)
 - You ALREADY have their number. NEVER ask the caller to read out their phone number. For a text confirmation just ask: "Want me to text that to the number you're calling from?" Only take down a different number if they offer one themselves.
 """
 
+    return {
+        "current_date_readable": now.strftime("%A, %B %d, %Y"),
+        "day_name": now.strftime("%A"),
+        "current_time": now.strftime("%I:%M %p"),
+        "greeting": _time_of_day_greeting(now.hour),
+        "tomorrow_readable": _tomorrow(current_date),
+        "next_mon": _next_monday(current_date),
+        "caller_context": caller_context,
+    }
+
+
+def compile_prompt(config: PracticeConfig, use_cache: bool = True) -> CompiledPrompt:
+    """Return the static template for this practice, compiling on a miss."""
+    key = _cache_key(config)
+    if use_cache:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            _stats[config.practice_id]["hits"] += 1
+            return compiled
+
+    started = time.perf_counter()
+    text = _build_static_template(config)
+    parts = tuple(text.split(_SLOT))
+    build_ms = (time.perf_counter() - started) * 1000
+    digest = config_hash(config)
+    compiled = CompiledPrompt(parts=parts, config_hash=digest, build_ms=build_ms)
+    if any(name not in _DYNAMIC_FIELDS for name in parts[1::2]):
+        raise ValueError("system prompt template has a malformed dynamic slot")
+
+    if use_cache:
+        _compiled[key] = compiled
+        while len(_compiled) > _MAX_CACHED_PRACTICES:
+            _compiled.popitem(last=False)
+        _stats[config.practice_id] = {
+            "config_hash": digest,
+            "build_ms": round(build_ms, 2),
+            "static_chars": compiled.static_chars,
+            "hits": 0,
+        }
+        logger.info(
+            f"Compiled system prompt for practice={config.practice_id or '-'}: "
+            f"{compiled.static_chars} static chars in {build_ms:.1f}ms (hash={digest})"
+        )
+    return compiled
+
+
+def prompt_cache_stats() -> dict[str, dict]:
+    """Per-practice build time, static prompt size and cache hits."""
+    return {pid: dict(stats) for pid, stats in _stats.items()}
+
+
+def build_system_prompt(
+    config: PracticeConfig,
+    caller_info: dict | None = None,
+    *,
+    now: datetime | None = None,
+    use_cache: bool = True,
+) -> str:
+    compiled = compile_prompt(config, use_cache=use_cache)
+    return compiled.render(_dynamic_values(now or _now_for(config), caller_info))
+
+
+def kb_is_indexed(config: PracticeConfig) -> bool:
+    """Large knowledge bases are searched via a tool instead of inlined."""
+    return len(config.knowledge_base) > Config.KB_INLINE_MAX_CHARS
+
+
+def _build_static_template(config: PracticeConfig) -> str:
+    # Per-call values become slots; the f-string below is otherwise the
+    # complete prompt.
+    current_date_readable, day_name, current_time, greeting, tomorrow_readable, next_mon, caller_context = (
+        f"{_SLOT}{name}{_SLOT}" for name in _DYNAMIC_FIELDS
+    )
+
     # Build knowledge base section
     kb_section = ""
-    if config.knowledge_base:
+    kb_tool_line = ""
+    if kb_is_indexed(config):
+        # Too big to resend on every turn — the agent retrieves passages on
+        # demand instead (agent/knowledge.py).
+        kb_section = """
+
+## Practice Knowledge Base
+The practice's website and FAQ content is available through the search_knowledge_base tool.
+For any question about the practice that isn't answered above (services, insurance accepted,
+financing, policies, parking, what to expect), search it first with a short query in plain
+words. If nothing relevant comes back, say you'll find out and have someone follow up.
+"""
+        kb_tool_line = "\n- search_knowledge_base — Search the practice's website/FAQ content. Returns only the most relevant passages."
+    elif config.knowledge_base:
         kb_section = f"""
 
 ## Practice Knowledge Base
@@ -68,7 +225,7 @@ The following information was gathered from the practice's website and configura
 Use this to answer questions about the practice. If a question isn't covered here,
 say you'll find out and have someone follow up.
 
-{config.knowledge_base}
+{config.knowledge_base.replace(_SLOT, "")}
 """
 
     # Build provider roster
@@ -154,7 +311,7 @@ SECTION 3: CAPABILITIES & TOOLS
 ## What You Can Do (use tools)
 
 Scheduling:
-- check_availability — Check open appointment slots. ALWAYS pass dates in YYYY-MM-DD format. Each slot includes a provider name and provider_id.
+- check_availability — Check open appointment slots. Pass a date in YYYY-MM-DD format; for a range ("Tuesday through Friday", "next week") pass the first day as date and the last as end_date — one call covers the whole range, closed days are skipped. Slots come grouped by date and provider: pid is the provider_id to pass to book_appointment, times like "9:00–10:30 AM every 30m" mean every one of those start times is open, total is how many are open and more is how many weren't listed.
 - book_appointment — Book an appointment after confirming details with the caller. ALWAYS pass the provider_id of the exact slot the caller chose so they're booked with the provider you offered. For a NEW patient — or ANY caller who can't or won't verify — set is_new_patient=true: the booking always goes through and the front desk matches up records when they arrive. A booking must never fail because of verification.
 
 Communication:
@@ -164,7 +321,7 @@ Communication:
 
 Information:
 - lookup_patient — Look up a patient's record (by name or phone number). Returns limited, masked info until the caller verifies.
-- log_message — Log a message for staff follow-up when you can't resolve something directly.
+- log_message — Log a message for staff follow-up when you can't resolve something directly.{kb_tool_line}
 
 Identity & account (verification required — see the IDENTITY VERIFICATION section):
 - verify_caller — Verify the caller's identity (name + DOB, plus one strong item for account details).
@@ -414,6 +571,7 @@ SECTION 7: DATE, TIME & SCHEDULING LOGIC
 - When someone says "tomorrow", they mean {tomorrow_readable}.
 - When someone says "next week", they mean the week starting {next_mon}.
 - ALWAYS pass dates to tools in YYYY-MM-DD format.
+- When the caller names several days or a week, check them with ONE check_availability call (date + end_date), not one call per day.
 - NEVER schedule appointments in the past.
 - If the requested day has already passed this week, schedule for the following week.
 
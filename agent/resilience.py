@@ -0,0 +1,242 @@
+"""Latency budgets, hedged reads and circuit breakers for platform actions.
+
+Every action has a latency budget (ACTION_BUDGETS in agent/http_client.py):
+how long the caller can reasonably sit in silence waiting for it.
+
+  reads   are cut off at their budget and answered with a speakable fallback
+          — they're idempotent, so once a read has been outstanding longer
+          than its recent p95 a duplicate (hedge) request is raced against it
+  writes  keep their full ACTION_TIMEOUTS (abandoning a booking half way
+          would invite a double booking); overruns are only counted
+
+Each action also has a circuit breaker. After `failures` consecutive
+transport errors, 5xx responses or budget overruns it opens and the action
+fails fast with its fallback line for `cooldown` seconds. Then one trial
+request is let through (half-open) and its outcome closes or re-opens the
+breaker. snapshot() is logged with the call's metrics.
+
+A job process serves one call, so neither a p95 nor a breaker learned in
+process would outlive it. Latency samples and breaker state are shared by
+every job process on the host through a JSON file next to the practice-config
+cache: load() seeds them at call setup, save() merges this call's samples
+and breaker changes back (at call end, and as soon as a breaker opens so
+concurrent calls fail fast too). Until an action has _MIN_SAMPLES samples on
+the host its hedge fires at half the budget.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import deque
+
+logger = logging.getLogger("omnira-resilience")
+
+# What the agent can say when the platform can't answer. Tools that reshape
+# results use these instead of reading a raw error to the caller.
+FALLBACKS: dict[str, str] = {
+    "lookup_patient": (
+        "I'm having trouble pulling up patient records right now. I can take your name and number "
+        "and have the office follow up."
+    ),
+    "check_availability": (
+        "Unable to check availability right now. Please ask the patient for their preferred time "
+        "and we'll confirm."
+    ),
+    "book_appointment": (
+        "I wasn't able to finalize that booking just now. I'll note the details and the office "
+        "will call to confirm."
+    ),
+    "get_my_appointments": "I can't pull up your appointments at the moment — the office can confirm them for you.",
+    "get_account_snapshot": "I can't reach account details right now — the office can go over your balance with you.",
+    "check_benefits": "I can't check insurance benefits right now — the office can verify your coverage.",
+    "estimate_copay": "I can't estimate that cost right now — the office can give you an estimate.",
+}
+DEFAULT_FALLBACK = (
+    "I'm having trouble reaching our system right now. I can take a message and have someone "
+    "from the office call you back."
+)
+
+_MIN_SAMPLES = 10
+
+
+def unavailable(action: str, error: str) -> dict:
+    """Result for an action the platform couldn't answer (carries the fallback line)."""
+    return {"success": False, "error": error, "unavailable": True, "message": FALLBACKS.get(action, DEFAULT_FALLBACK)}
+
+
+class _ActionState:
+    __slots__ = ("latencies", "unsaved", "failures", "state", "opened_at", "trial_at", "changed_at", "stats")
+
+    def __init__(self, window: int):
+        self.latencies: deque[float] = deque(maxlen=window)
+        # Samples taken in this process since the last save()
+        self.unsaved: list[float] = []
+        self.failures = 0
+        self.state = "closed"
+        # Wall-clock times so they mean the same in every process
+        self.opened_at = 0.0
+        self.changed_at = 0.0
+        # When the half-open trial request went out
+        self.trial_at = 0.0
+        self.stats = {"requests": 0, "failures": 0, "overruns": 0, "hedges": 0, "hedge_wins": 0, "short_circuits": 0}
+
+
+class ActionHealth:
+    """Per-action latency history and circuit breaker."""
+
+    def __init__(self, failures: int = 3, cooldown: float = 20.0, window: int = 50, path: str | None = None):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.window = window
+        self.path = path
+        self._actions: dict[str, _ActionState] = {}
+
+    def _get(self, action: str) -> _ActionState:
+        state = self._actions.get(action)
+        if state is None:
+            state = self._actions[action] = _ActionState(self.window)
+        return state
+
+    # ── breaker ──────────────────────────────────────────────────────────
+
+    def allow(self, action: str) -> bool:
+        """False while the action's breaker is open (fail fast).
+
+        A trial that never reports back (cancelled, e.g. as a hedge loser)
+        stops counting after another cooldown, and the next request is the
+        new trial.
+        """
+        state = self._get(action)
+        if state.state == "closed":
+            return True
+        now = time.time()
+        since = state.opened_at if state.state == "open" else state.trial_at
+        if now - since >= self.cooldown:
+            state.state = "half_open"
+            state.trial_at = now
+            logger.info(f"Circuit for {action} half-open — sending a trial request")
+            return True
+        state.stats["short_circuits"] += 1
+        return False
+
+    def record(self, action: str, ok: bool, ms: float | None = None) -> None:
+        state = self._get(action)
+        state.stats["requests"] += 1
+        state.changed_at = time.time()
+        if ok:
+            if ms is not None:
+                state.latencies.append(ms)
+                state.unsaved.append(round(ms, 1))
+            state.failures = 0
+            if state.state != "closed":
+                logger.info(f"Circuit for {action} closed")
+            state.state = "closed"
+            return
+        state.stats["failures"] += 1
+        state.failures += 1
+        if state.state == "half_open" or (state.state == "closed" and state.failures >= self.failures):
+            state.state = "open"
+            state.opened_at = state.changed_at
+            logger.warning(f"Circuit for {action} OPEN after {state.failures} failure(s) — failing fast for {self.cooldown:.0f}s")
+            self._save_soon()
+
+    # ── budgets & hedging ────────────────────────────────────────────────
+
+    def overrun(self, action: str) -> None:
+        self._get(action).stats["overruns"] += 1
+
+    def hedge_delay(self, action: str, budget: float) -> float:
+        """When to send a duplicate read: its recent p95 on the host, or half
+        the budget until there are _MIN_SAMPLES samples."""
+        samples = sorted(self._get(action).latencies)
+        if len(samples) < _MIN_SAMPLES:
+            return budget / 2
+        p95 = samples[min(len(samples) - 1, round(0.95 * (len(samples) - 1)))] / 1000
+        return min(p95, budget / 2)
+
+    def hedged(self, action: str, won: bool) -> None:
+        stats = self._get(action).stats
+        stats["hedges"] += 1
+        if won:
+            stats["hedge_wins"] += 1
+
+    # ── host-wide persistence ────────────────────────────────────────────
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                on_disk = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable action health file {self.path}: {e}")
+            return {}
+        return on_disk if isinstance(on_disk, dict) else {}
+
+    def load(self) -> None:
+        """Seed latency history and breaker state from the host (blocking — run it in a thread)."""
+        if not self.path:
+            return
+        for action, saved in self._read().items():
+            if not isinstance(saved, dict):
+                continue
+            state = self._get(action)
+            own = list(state.latencies)
+            state.latencies.clear()
+            state.latencies.extend(saved.get("latencies", [])[-self.window:] + own)
+            if saved.get("changed_at", 0.0) > state.changed_at:
+                state.state = saved.get("state", "closed")
+                state.failures = saved.get("failures", 0)
+                state.opened_at = saved.get("opened_at", 0.0)
+                state.changed_at = saved["changed_at"]
+
+    def save(self) -> None:
+        """Merge this process's samples and breaker changes into the host file,
+        replacing it atomically (blocking — run it in a thread)."""
+        if not self.path:
+            return
+        on_disk = self._read()
+        for action, state in list(self._actions.items()):
+            saved = on_disk.get(action) if isinstance(on_disk.get(action), dict) else {}
+            unsaved, state.unsaved = state.unsaved, []
+            entry = {"latencies": (saved.get("latencies", []) + unsaved)[-self.window:]}
+            if saved.get("changed_at", 0.0) > state.changed_at:
+                entry.update({k: saved[k] for k in ("state", "failures", "opened_at", "changed_at") if k in saved})
+            else:
+                entry.update(
+                    # Another process sends its own trial request after the cooldown
+                    state="open" if state.state == "half_open" else state.state,
+                    failures=state.failures,
+                    opened_at=state.opened_at,
+                    changed_at=state.changed_at,
+                )
+            on_disk[action] = entry
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".action-health-")
+            with os.fdopen(fd, "w") as f:
+                json.dump(on_disk, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not persist action health to {self.path}: {e}")
+
+    def _save_soon(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.run_in_executor(None, self.save)
+
+    def snapshot(self) -> dict:
+        result = {}
+        for action, state in self._actions.items():
+            samples = sorted(state.latencies)
+            result[action] = {
+                "state": state.state,
+                "p95_ms": round(samples[min(len(samples) - 1, round(0.95 * (len(samples) - 1)))], 1) if samples else None,
+                **state.stats,
+            }
+        return result
@@ -0,0 +1,424 @@
+"""In-process slot engine for check_availability.
+
+At call start the entrypoint syncs a schedule snapshot from the platform
+(the get_schedule_snapshot action): operating hours, providers, procedure
+durations, and booked intervals / blocks for the next few weeks. Each
+provider-day becomes two fixed-granularity bitmaps (NumPy, one cell per
+`granularity` minutes): `working` (inside hours, outside lunch) and `busy`
+(booked or blocked). A query over any date range and procedure duration is
+then a handful of vectorized cumsum/accumulate passes over every
+provider-day at once: tens of microseconds instead of a platform round trip
+per date.
+
+Candidates are ranked with the scoring function of 11-AGENT-SCHEDULING.md §5
+(preferred provider/time, production balance, gap fill vs gap creation,
+buffer satisfaction, urgency, complex procedures in the morning) and
+adjacent starts for the same provider are thinned out, as in its STEP 5.
+Patient continuity needs visit history the snapshot doesn't carry, so that
+term is not scored here.
+
+The platform stays authoritative: book_appointment still goes to the
+platform, and a successful booking is mirrored into the bitmaps so the next
+query doesn't offer the slot again.
+"""
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+logger = logging.getLogger("omnira-slots")
+
+_DAY_NAMES = ["sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
+
+# Used when the snapshot doesn't list a procedure type (minutes)
+DEFAULT_DURATIONS = {"general": 60, "cleaning": 60, "emergency": 30, "consultation": 30}
+DEFAULT_DURATION = 60
+
+# 11-AGENT-SCHEDULING.md §5 — per-practice multipliers on each scoring term
+DEFAULT_WEIGHTS = {
+    "preferred_provider": 1.0,
+    "preferred_time": 1.0,
+    "production_balance": 1.0,
+    "gap_fill": 1.0,
+    "gap_creation": 1.0,
+    "buffer": 1.0,
+    "urgency": 1.0,
+    "complexity_timing": 1.0,
+}
+# The spec starts every slot at 1.0 and only adds, so everything would clamp
+# to 1.0; starting from the midpoint keeps the terms distinguishable.
+_BASE_SCORE = 0.5
+
+_TIME_RE = re.compile(r"^\s*(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?\s*$", re.IGNORECASE)
+
+
+def _minutes(value) -> int | None:
+    """'08:30', '8:30 AM', '17:00:00' or minutes-since-midnight → minutes since midnight."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip()
+    if text.count(":") == 2:
+        text = text.rsplit(":", 1)[0]
+    match = _TIME_RE.match(text)
+    if not match:
+        return None
+    hours, mins, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        hours = hours % 12 + (12 if meridiem.lower().startswith("p") else 0)
+    return hours * 60 + mins
+
+
+def _weekday(value) -> int | None:
+    """Day name/abbreviation or 0-6 (0 = Sunday, as in the platform schema) → date.weekday()."""
+    if isinstance(value, int):
+        return (value - 1) % 7
+    name = str(value).strip().lower()
+    if len(name) < 3:
+        return None
+    for i, day in enumerate(_DAY_NAMES):
+        if day.startswith(name[:3]):
+            return (i - 1) % 7
+    return None
+
+
+def _spoken_time(minutes: int) -> str:
+    hours, mins = divmod(minutes, 60)
+    return f"{hours % 12 or 12}:{mins:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+def _hours_by_weekday(entries: list) -> dict[int, list[tuple[int, int]]]:
+    """Weekly template → {weekday: [(start, end), ...]} working windows (lunch removed)."""
+    result: dict[int, list[tuple[int, int]]] = {}
+    for entry in entries or []:
+        if not isinstance(entry, dict) or entry.get("closed") or entry.get("is_working") is False:
+            continue
+        weekday = _weekday(entry.get("day", entry.get("day_of_week", "")))
+        start = _minutes(entry.get("open", entry.get("start", entry.get("start_time"))))
+        end = _minutes(entry.get("close", entry.get("end", entry.get("end_time"))))
+        if weekday is None or start is None or end is None or end <= start:
+            continue
+        windows = [(start, end)]
+        lunch_start, lunch_end = _minutes(entry.get("lunch_start")), _minutes(entry.get("lunch_end"))
+        if lunch_start is not None and lunch_end is not None and start < lunch_start < lunch_end <= end:
+            windows = [(start, lunch_start), (lunch_end, end)]
+        result.setdefault(weekday, []).extend(windows)
+    return result
+
+
+@dataclass
+class Procedure:
+    name: str
+    cells: int  # setup + duration + cleanup, in cells
+    provider_ids: frozenset[str] = frozenset()
+    urgent: bool = False
+    complex: bool = False
+    production: float = 0.0
+
+
+@dataclass
+class SlotEngine:
+    """Occupancy bitmaps for every provider-day in the snapshot window."""
+
+    start: date
+    providers: list[dict]
+    working: np.ndarray  # bool (providers, days, cells)
+    busy: np.ndarray  # bool (providers, days, cells)
+    production: np.ndarray  # float (providers, days) — scheduled production
+    target: np.ndarray | None  # float (providers, days) — production target
+    procedures: dict[str, Procedure]
+    granularity: int = 5
+    increment: int = 15
+    buffer_cells: int = 1
+    weights: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_WEIGHTS))
+    timezone: str = ""
+    synced_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        data: dict,
+        *,
+        start: date,
+        days: int,
+        granularity: int = 5,
+        increment: int = 15,
+        timezone: str = "",
+    ) -> "SlotEngine":
+        cells = 24 * 60 // granularity
+        providers = [p for p in data.get("providers", []) if isinstance(p, dict) and p.get("id")]
+        if not providers:
+            raise ValueError("schedule snapshot has no providers")
+        index = {str(p["id"]): i for i, p in enumerate(providers)}
+        practice_hours = _hours_by_weekday(data.get("operating_hours", []))
+        working = np.zeros((len(providers), days, cells), dtype=bool)
+        busy = np.zeros_like(working)
+        production = np.zeros((len(providers), days))
+
+        def cell(minutes: int) -> int:
+            return max(0, min(cells, minutes // granularity))
+
+        for p, provider in enumerate(providers):
+            hours = _hours_by_weekday(provider.get("hours")) if provider.get("hours") else practice_hours
+            for d in range(days):
+                for lo, hi in hours.get((start + timedelta(days=d)).weekday(), []):
+                    working[p, d, cell(lo + granularity - 1):cell(hi)] = True
+
+        def mark(entry: dict, weight: float = 0.0) -> None:
+            try:
+                d = (date.fromisoformat(str(entry.get("date"))[:10]) - start).days
+            except ValueError:
+                return
+            if not 0 <= d < days:
+                return
+            rows = [index[str(entry["provider_id"])]] if str(entry.get("provider_id")) in index else range(len(providers))
+            lo, hi = _minutes(entry.get("start")), _minutes(entry.get("end"))
+            for p in rows:
+                if lo is None or hi is None:
+                    working[p, d, :] = False  # whole-day absence
+                else:
+                    busy[p, d, cell(lo):cell(hi + granularity - 1)] = True
+                    production[p, d] += weight
+
+        for appt in data.get("booked", []):
+            if isinstance(appt, dict):
+                mark(appt, float(appt.get("production", 0) or 0))
+        for block in data.get("blocks", []):
+            if isinstance(block, dict):
+                mark(block)
+
+        target = None
+        targets = data.get("production_targets")
+        if isinstance(targets, dict) and targets:
+            target = np.zeros((len(providers), days))
+            for pid, value in targets.items():
+                if pid in index:
+                    target[index[pid], :] = float(value or 0)
+
+        procedures = {}
+        for item in data.get("procedures", []):
+            if not isinstance(item, dict):
+                continue
+            name = str(item.get("type") or item.get("name") or "").strip().lower()
+            if not name:
+                continue
+            total = sum(int(item.get(k) or 0) for k in ("setup_minutes", "duration_minutes", "cleanup_minutes"))
+            procedures[name] = Procedure(
+                name=name,
+                cells=math.ceil((total or DEFAULT_DURATION) / granularity),
+                provider_ids=frozenset(str(x) for x in item.get("provider_ids", [])),
+                urgent=bool(item.get("urgent", name == "emergency")),
+                complex=str(item.get("complexity", "")).lower() == "high",
+                production=float(item.get("production_value", 0) or 0),
+            )
+
+        weights = dict(DEFAULT_WEIGHTS)
+        weights.update({k: float(v) for k, v in (data.get("scoring_weights") or {}).items() if k in weights})
+        buffer_minutes = int(data.get("provider_transition_buffer", 5) or 0)
+        return cls(
+            start=start,
+            providers=providers,
+            working=working,
+            busy=busy,
+            production=production,
+            target=target,
+            procedures=procedures,
+            granularity=granularity,
+            increment=max(granularity, increment - increment % granularity),
+            buffer_cells=math.ceil(buffer_minutes / granularity),
+            weights=weights,
+            timezone=timezone,
+        )
+
+    # ── queries ──────────────────────────────────────────────────────────
+
+    @property
+    def days(self) -> int:
+        return self.working.shape[1]
+
+    def covers(self, first: date, last: date) -> bool:
+        return self.start <= first and (last - self.start).days < self.days
+
+    def age(self) -> float:
+        return time.monotonic() - self.synced_at
+
+    def now(self) -> datetime:
+        """Wall-clock time at the practice (naive), for dropping past starts today."""
+        try:
+            return datetime.now(ZoneInfo(self.timezone)).replace(tzinfo=None)
+        except Exception:
+            return datetime.now()
+
+    def procedure(self, procedure_type: str) -> Procedure:
+        name = (procedure_type or "general").strip().lower()
+        found = self.procedures.get(name)
+        if found is None:
+            minutes = DEFAULT_DURATIONS.get(name, DEFAULT_DURATION)
+            found = Procedure(name=name, cells=math.ceil(minutes / self.granularity), urgent=name == "emergency")
+        return found
+
+    def query(
+        self,
+        first: date,
+        last: date,
+        procedure_type: str = "general",
+        *,
+        now: datetime | None = None,
+        preferred_provider: str = "",
+        preferred_time: str = "",
+        max_results: int = 5,
+        spacing_minutes: int = 30,
+    ) -> dict:
+        """Ranked open slots between first and last (inclusive) for a procedure.
+
+        Returns {"slots": [...], "total_available": n}; each slot has date,
+        time, provider, provider_id and score.
+        """
+        proc = self.procedure(procedure_type)
+        d0, d1 = (first - self.start).days, (last - self.start).days + 1
+        n_prov, n_days = len(self.providers), d1 - d0
+        k, b = proc.cells, self.buffer_cells
+        # Only the part of the day anyone works (plus buffer room), start aligned to the increment
+        inc = self.increment // self.granularity
+        open_cells = np.flatnonzero(self.working[:, d0:d1].any(axis=(0, 1)))
+        if not len(open_cells):
+            return {"slots": [], "total_available": 0}
+        c0 = max(0, (int(open_cells[0]) - b) // inc * inc)
+        c1 = min(self.working.shape[2], int(open_cells[-1]) + 1 + b)
+        cells = c1 - c0
+
+        free = (self.working[:, d0:d1, c0:c1] & ~self.busy[:, d0:d1, c0:c1]).reshape(n_prov * n_days, cells)
+        busy = self.busy[:, d0:d1, c0:c1].reshape(n_prov * n_days, cells)
+        starts = np.arange(0, cells - k + 1, inc)
+        if not len(starts):
+            return {"slots": [], "total_available": 0}
+        ends = starts + k
+
+        # Whole window free: prefix sums turn every window check into one subtraction
+        free_cs = np.zeros((free.shape[0], cells + 1), dtype=np.int16)
+        np.cumsum(free, axis=1, out=free_cs[:, 1:])
+        fits = (free_cs[:, ends] - free_cs[:, starts]) == k
+
+        if proc.provider_ids:
+            qualified = np.array([str(p["id"]) in proc.provider_ids for p in self.providers])
+            fits &= np.repeat(qualified, n_days)[:, None]
+        day_index = np.tile(np.arange(d0, d1), n_prov)
+        if now is not None:
+            today = (now.date() - self.start).days
+            now_cell = math.ceil((now.hour * 60 + now.minute) / self.granularity) - c0
+            fits &= ~((day_index == today)[:, None] & (starts[None, :] < now_cell))
+            fits &= (day_index >= today)[:, None]
+        total = int(fits.sum())
+        if not total:
+            return {"slots": [], "total_available": 0}
+
+        w = self.weights
+        score = np.full(fits.shape, _BASE_SCORE)
+
+        # Schedule density: free run left before the slot / right after it
+        idx = np.arange(cells)
+        last_taken = np.maximum.accumulate(np.where(free, -1, idx), axis=1)
+        next_taken = np.minimum.accumulate(np.where(free, cells, idx)[:, ::-1], axis=1)[:, ::-1]
+        before = np.where(starts > 0, (starts - 1) - last_taken[:, np.maximum(starts - 1, 0)], 0)
+        after = np.where(ends < cells, next_taken[:, np.minimum(ends, cells - 1)] - ends, 0)
+        min_cells = min([p.cells for p in self.procedures.values()] or [k])
+        fills = (before <= b) | (after <= b)
+        creates = ((before > b) & (before < min_cells + b)) | ((after > b) & (after < min_cells + b))
+        score += np.where(fills & ~creates, w["gap_fill"] * 0.15, np.where(creates, -w["gap_creation"] * 0.10, 0.0))
+
+        # Buffer satisfaction: no booking within b cells either side
+        busy_cs = np.zeros((busy.shape[0], cells + 1), dtype=np.int16)
+        np.cumsum(busy, axis=1, out=busy_cs[:, 1:])
+        lo, hi = np.maximum(starts - b, 0), np.minimum(ends + b, cells)
+        buffered = (busy_cs[:, starts] - busy_cs[:, lo] == 0) & (busy_cs[:, hi] - busy_cs[:, ends] == 0)
+        score += np.where(buffered, w["buffer"] * 0.10, 0.0)
+
+        # Production balance per provider-day
+        if self.target is not None:
+            produced = self.production[:, d0:d1].reshape(-1)
+            target = self.target[:, d0:d1].reshape(-1)
+            balance = np.where(
+                (target > 0) & (produced < 0.8 * target),
+                w["production_balance"] * 0.15,
+                np.where((target > 0) & (produced > 1.2 * target), -w["production_balance"] * 0.10, 0.0),
+            )
+            score += balance[:, None]
+
+        start_minutes = (starts + c0) * self.granularity
+        if proc.urgent and now is not None:
+            soon = (day_index - (now.date() - self.start).days) <= 3
+            score += np.where(soon, w["urgency"] * 0.10, 0.0)[:, None]
+        if proc.complex:
+            score += np.where(start_minutes < 12 * 60, w["complexity_timing"] * 0.10, 0.0)[None, :]
+        if preferred_provider:
+            wanted = preferred_provider.strip().lower()
+            match = np.array([
+                wanted == str(p["id"]).lower() or wanted in str(p.get("name", "")).lower() for p in self.providers
+            ])
+            score += np.where(np.repeat(match, n_days), w["preferred_provider"] * 0.25, 0.0)[:, None]
+        time_match = _time_preference(preferred_time, start_minutes)
+        if time_match is not None:
+            score += np.where(time_match, w["preferred_time"] * 0.25, 0.0)[None, :]
+        np.clip(score, 0.0, 1.0, out=score)
+
+        # Rank: score desc, then soonest day, then earliest time
+        rows, cols = np.nonzero(fits)
+        order = np.lexsort((cols, day_index[rows], -score[rows, cols]))
+        spacing = spacing_minutes // self.granularity
+        taken: dict[int, list[int]] = {}
+        slots = []
+        for i in order:
+            row, col = int(rows[i]), int(cols[i])
+            start_cell = int(starts[col]) + c0
+            # STEP 5: skip starts adjacent to an already-offered slot for this provider-day
+            if any(abs(start_cell - other) < spacing for other in taken.get(row, [])):
+                continue
+            taken.setdefault(row, []).append(start_cell)
+            provider = self.providers[row // n_days]
+            slots.append({
+                "date": (self.start + timedelta(days=int(day_index[row]))).isoformat(),
+                "time": _spoken_time(start_cell * self.granularity),
+                "provider": provider.get("name", ""),
+                "provider_id": str(provider["id"]),
+                "score": round(float(score[row, col]), 2),
+            })
+            if len(slots) >= max_results:
+                break
+        return {"slots": slots, "total_available": total}
+
+    def book(self, provider_id: str, day: str, at: str, procedure_type: str) -> bool:
+        """Mirror a confirmed booking into the bitmaps."""
+        try:
+            d = (date.fromisoformat(day[:10]) - self.start).days
+        except ValueError:
+            return False
+        minutes = _minutes(at)
+        rows = [i for i, p in enumerate(self.providers) if str(p["id"]) == str(provider_id)]
+        if minutes is None or not rows or not 0 <= d < self.days:
+            return False
+        lo = minutes // self.granularity
+        self.busy[rows[0], d, lo:lo + self.procedure(procedure_type).cells] = True
+        return True
+
+
+def _time_preference(preferred: str, start_minutes: np.ndarray) -> np.ndarray | None:
+    """Bool mask of starts matching 'morning' / 'afternoon' / 'evening' or a clock time (±1h)."""
+    text = (preferred or "").strip().lower()
+    if not text:
+        return None
+    if "morning" in text:
+        return start_minutes < 12 * 60
+    if "afternoon" in text:
+        return (start_minutes >= 12 * 60) & (start_minutes < 17 * 60)
+    if "evening" in text:
+        return start_minutes >= 17 * 60
+    minutes = _minutes(text)
+    if minutes is None:
+        return None
+    return np.abs(start_minutes - minutes) <= 60
@@ -0,0 +1,152 @@
+"""Per-call read cache for platform actions.
+
+The LLM often repeats read tools within one call (lookup_patient twice,
+check_availability on a date it already checked, get_my_appointments after
+get_account_snapshot...), and each repeat used to be a full platform round
+trip. Successful reads are cached here for the rest of the call, keyed by
+action and normalized params. Writes drop the reads they make stale:
+
+  book_appointment            → availability, appointments, account, lookups
+  verify_caller /
+  confirm_verification_code   → everything gated on the verification tier,
+                                and lookups (masked until the caller verifies)
+
+Actions not listed in READS are never cached. Whether each tool call was a
+hit, a miss or a write is recorded by function-call id so the tool_call
+events in CallLogger show it.
+
+Reads that miss go through SingleFlight: when the LLM fires identical reads
+in parallel (or re-issues one after an interruption) while the first is
+still in flight, they all await that one HTTP request. Writes never do —
+two book_appointment or send_sms calls are two actions, however alike.
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("omnira-tool-cache")
+
+READS = frozenset({
+    "lookup_patient",
+    "check_availability",
+    "get_my_appointments",
+    "get_account_snapshot",
+    "check_benefits",
+    "estimate_copay",
+})
+
+_TIER_GATED = frozenset({"get_my_appointments", "get_account_snapshot", "check_benefits", "estimate_copay"})
+
+INVALIDATES: dict[str, frozenset[str]] = {
+    "book_appointment": frozenset({"check_availability", "get_my_appointments", "get_account_snapshot", "lookup_patient"}),
+    # lookup_patient answers with masked data until the caller verifies
+    "verify_caller": _TIER_GATED | {"lookup_patient"},
+    "confirm_verification_code": _TIER_GATED | {"lookup_patient"},
+}
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return _WS_RE.sub(" ", value).strip().casefold()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v not in ("", None)}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def params_key(params: dict) -> str:
+    """Canonical form of an action's params: trimmed, case-folded, empties dropped."""
+    return json.dumps(_normalize(params), sort_keys=True, separators=(",", ":"))
+
+
+class ToolCache:
+    """Read-through cache of successful read results for one call."""
+
+    def __init__(self, ttl: float = 300.0, ttls: dict[str, float] | None = None):
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self._entries: dict[tuple[str, str], tuple[float, dict]] = {}
+        self.outcomes: dict[str, str] = {}
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "invalidated": 0, "bypassed": 0, "joined": 0}
+
+    @staticmethod
+    def cacheable(action: str, params: dict) -> bool:
+        # A refresh asks for a live answer (check_benefits(refresh=True))
+        return action in READS and not params.get("refresh")
+
+    def get(self, action: str, params: dict) -> dict | None:
+        if not self.cacheable(action, params):
+            if action in READS:
+                self.stats["bypassed"] += 1
+            return None
+        key = (action, params_key(params))
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.ttls.get(action, self.ttl):
+            del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return result
+
+    def update(self, action: str, params: dict, result: dict) -> None:
+        """Record a platform response: store a successful read, apply a write's invalidations."""
+        if action in READS:
+            if action == "check_benefits" and params.get("refresh"):
+                # A live re-check supersedes whatever was cached
+                self._drop({"check_benefits", "estimate_copay"})
+            if self.cacheable(action, params) and result.get("success") is not False and not result.get("error"):
+                self._entries[(action, params_key(params))] = (time.monotonic(), result)
+                self.stats["stored"] += 1
+            return
+        stale = INVALIDATES.get(action)
+        if stale:
+            self._drop(stale)
+
+    def _drop(self, actions: frozenset[str] | set[str]) -> None:
+        keys = [key for key in self._entries if key[0] in actions]
+        for key in keys:
+            del self._entries[key]
+        if keys:
+            self.stats["invalidated"] += len(keys)
+            logger.info(f"Invalidated {len(keys)} cached read(s): {', '.join(sorted({k[0] for k in keys}))}")
+
+    def note(self, call_id: str, outcome: str) -> None:
+        """Remember hit/miss/write for a tool call (picked up by the tool_call event)."""
+        if call_id:
+            self.outcomes[call_id] = outcome
+
+    def report(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0}
+
+
+class SingleFlight:
+    """One in-flight request per key; identical concurrent reads share it."""
+
+    def __init__(self):
+        self._flights: dict[tuple, asyncio.Task] = {}
+        self.stats = {"requests": 0, "joined": 0}
+
+    async def do(self, key: tuple, fetch: Callable[[], Awaitable[dict]]) -> tuple[dict, bool]:
+        """(result, joined) — joined is True if another caller's request was reused."""
+        task = self._flights.get(key)
+        joined = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._flights.pop(key) if self._flights.get(key) is t else None)
+            self.stats["requests"] += 1
+        else:
+            self.stats["joined"] += 1
+        # Shielded: one interrupted tool call mustn't cancel the others' request
+        return await asyncio.shield(task), joined
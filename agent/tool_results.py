@@ -0,0 +1,198 @@
+"""Compact, speakable serialization of tool results.
+
+Whatever a tool returns is appended to the LLM context and re-sent on every
+later turn, so a raw platform response (ids, timestamps, nulls, a full slot
+list) makes each turn of a long call a little slower than the last. Results
+are projected here before they reach the LLM:
+
+  - internal fields are dropped: ids (except the ones a tool takes as
+    input — provider_id for book_appointment, appointment_id for
+    send_email), record timestamps, request/trace metadata,
+    ranking scores, nulls and empties; unknown fields are kept, so no
+    number the agent may have to say is lost
+  - a few frequent long keys are shortened (see _SHORT_KEYS; the prompt's
+    TOOLS section carries the legend)
+  - slot lists are grouped by date and provider, runs of evenly spaced
+    times collapse to one range ("9:00–11:00 AM every 30m"), and only the
+    first `max_groups` groups are kept, with a count of what was left out
+  - JSON is written without whitespace
+
+ToolTokens counts what every tool call adds to the context (estimated
+tokens), next to what the uncompacted result would have added; main.py
+logs it per tool call and as a "tool_tokens" event at call end.
+"""
+import json
+import re
+
+_DROP_KEYS = frozenset({
+    "id", "success", "request_id", "trace_id", "debug", "raw", "metadata",
+    "call_session_id", "practice_id", "score", "created_at", "updated_at", "idempotency_key",
+})
+# Ids the LLM passes back into a tool
+_KEEP_IDS = frozenset({"provider_id", "appointment_id"})
+
+_SHORT_KEYS = {
+    "available_slots": "slots",
+    "total_available": "total",
+    "provider_id": "pid",
+    "procedure_type": "proc",
+    "unchecked_dates": "unchecked",
+}
+
+_TIME_RE = re.compile(r"^\s*(\d{1,2})(?::(\d{2}))?\s*([ap])?\.?m?\.?\s*$", re.IGNORECASE)
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count (words, 3-digit chunks, punctuation) — close enough for trends."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _keep(key: str, value) -> bool:
+    if value is None or value == "" or value == [] or value == {}:
+        return False
+    if key in _KEEP_IDS:
+        return True
+    return key not in _DROP_KEYS and not key.endswith("_id")
+
+
+def project(value):
+    """Drop internal fields and shorten known keys, recursively."""
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            if key == "success" and item is False:
+                out["ok"] = False
+            elif _keep(key, item):
+                out[_SHORT_KEYS.get(key, key)] = project(item)
+        return out
+    if isinstance(value, list):
+        return [project(item) for item in value]
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
+
+
+# ── slots ────────────────────────────────────────────────────────────────
+
+
+def _minutes(text: str) -> int | None:
+    match = _TIME_RE.match(str(text))
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), (match.group(3) or "").lower()
+    if meridiem == "p" and hour < 12:
+        hour += 12
+    elif meridiem == "a" and hour == 12:
+        hour = 0
+    return hour * 60 + minute if hour < 24 and minute < 60 else None
+
+
+def _clock(minutes: int, meridiem: bool = True) -> str:
+    hour, minute = divmod(minutes, 60)
+    text = f"{hour % 12 or 12}:{minute:02d}"
+    return f"{text} {'AM' if hour < 12 else 'PM'}" if meridiem else text
+
+
+def collapse_times(times: list[str]) -> str:
+    """["9:00 AM", "9:30 AM", "10:00 AM", "2:00 PM"] → "9:00–10:00 AM every 30m, 2:00 PM"."""
+    minutes = sorted({m for m in (_minutes(t) for t in times) if m is not None})
+    if len(minutes) < len(set(times)):
+        return ", ".join(dict.fromkeys(str(t) for t in times))  # unparseable times — list them as given
+    parts, i = [], 0
+    while i < len(minutes):
+        j = i + 1
+        if j < len(minutes):
+            step = minutes[j] - minutes[i]
+            while j + 1 < len(minutes) and minutes[j + 1] - minutes[j] == step:
+                j += 1
+        if j - i >= 2 and step <= 60:
+            start, end = minutes[i], minutes[j]
+            same_half = (start < 720) == (end < 720)
+            parts.append(f"{_clock(start, not same_half)}–{_clock(end)} every {step}m")
+            i = j + 1
+        else:
+            parts.append(_clock(minutes[i]))
+            i += 1
+    return ", ".join(parts)
+
+
+def group_slots(slots: list, *, max_groups: int = 6, default_date: str = "") -> tuple[list, int]:
+    """Slots → [{date, provider, pid, times}] in first-seen order; returns (groups, slots left out)."""
+    groups: dict[tuple, dict] = {}
+    for slot in slots:
+        if not isinstance(slot, dict):
+            continue
+        key = (slot.get("date") or default_date, slot.get("provider", ""), slot.get("provider_id", ""))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {"date": key[0], "provider": key[1], "pid": key[2], "times": []}
+        group["times"].append(slot.get("time", ""))
+    kept = list(groups.values())[:max_groups]
+    left_out = sum(len(g["times"]) for g in list(groups.values())[max_groups:])
+    return [
+        {k: v for k, v in {**g, "times": collapse_times(g["times"])}.items() if v}
+        for g in kept
+    ], left_out
+
+
+def compact_availability(reply: dict, *, max_groups: int = 6) -> dict:
+    """check_availability's reply with its slot list grouped and capped."""
+    slots = reply.get("available_slots") or []
+    groups, left_out = group_slots(slots, max_groups=max_groups, default_date=reply.get("date", ""))
+    single_day = "date" in reply
+    if single_day:
+        for group in groups:
+            group.pop("date", None)
+    out = project({k: v for k, v in reply.items() if k != "available_slots"})
+    out["slots"] = groups
+    if left_out:
+        out["more"] = left_out
+    return out
+
+
+# ── accounting ───────────────────────────────────────────────────────────
+
+
+class ToolTokens:
+    """Estimated tokens each tool call adds to the LLM context, for one call."""
+
+    def __init__(self):
+        self._raw: dict[str, int] = {}  # function-call id → tokens of the uncompacted result
+        self.calls = 0
+        self.tokens = 0
+        self.raw_tokens = 0
+        self.by_tool: dict[str, dict] = {}
+
+    def note_raw(self, call_id: str, raw) -> None:
+        if call_id:
+            self._raw[call_id] = estimate_tokens(raw if isinstance(raw, str) else json.dumps(raw))
+
+    def add(self, call_id: str, tool: str, output: str) -> dict:
+        """Record a tool result as sent to the LLM; returns this call's entry for the tool_call log."""
+        tokens = estimate_tokens(output)
+        raw = self._raw.pop(call_id, tokens)
+        self.calls += 1
+        self.tokens += tokens
+        self.raw_tokens += raw
+        stats = self.by_tool.setdefault(tool, {"calls": 0, "tokens": 0, "raw_tokens": 0})
+        stats["calls"] += 1
+        stats["tokens"] += tokens
+        stats["raw_tokens"] += raw
+        entry = {"tokens": tokens, "context_tokens": self.tokens}
+        if raw != tokens:
+            entry["raw_tokens"] = raw
+        return entry
+
+    def report(self) -> dict:
+        return {
+            "calls": self.calls,
+            "tokens": self.tokens,
+            "raw_tokens": self.raw_tokens,
+            "saved": self.raw_tokens - self.tokens,
+            "by_tool": self.by_tool,
+        }
@@ -1,53 +1,372 @@
 """Tool definitions for the voice agent — calls Omnira Platform API for real actions."""
+import asyncio
 import json
 import logging
-
-import httpx
+import os
+import sqlite3
+import time
 
 from livekit.agents import function_tool, RunContext
 
-from agent.config import Config
+from agent.config import Config, PracticeConfig
+from agent.dates import resolve_dates
 from agent.call_context import current_call
+from agent.batching import ActionBatcher
+from agent.log_pipeline import HIGH_VOLUME
+from agent.http_client import (
+    batch_limit,
+    budget_for,
+    disable_batching,
+    get_client,
+    record_error,
+    timeout_for,
+    timeout_for_batch,
+)
+from agent.outbox import OUTBOX_ACTIONS, get_outbox
+from agent.prompts import _now_for
+from agent.resilience import ActionHealth, unavailable
+from agent.slots import SlotEngine
+from agent.tool_cache import READS, SingleFlight, params_key
+from agent.tool_results import compact_availability, dumps, project
+from agent import knowledge
 
 logger = logging.getLogger("omnira-tools")
 
+_inflight = SingleFlight()
+_health = ActionHealth(
+    failures=Config.CIRCUIT_FAILURES,
+    cooldown=Config.CIRCUIT_COOLDOWN,
+    path=os.path.join(Config.CACHE_DIR, "action-health.json"),
+)
+
+
+def _call_id(context: RunContext | None) -> str:
+    """The LLM's id for this function call, used to tag its tool_call event."""
+    fnc = getattr(context, "function_call", None)
+    return getattr(fnc, "call_id", "") or ""
 
-async def _call_omnira_action(action: str, params: dict) -> dict:
+
+async def _call_omnira_action(action: str, params: dict, *, track: bool = True, call_id: str = "") -> dict:
     """Call the Omnira platform API to execute an action.
 
     Every request carries the per-call context (spec 59): practice_id from
     THIS call (not a mutable global) and the call_session_id the server uses
     to enforce the verification gate. The LLM never holds security state.
+    `track=False` keeps background work out of the per-turn tool spans.
+
+    Reads go through the call's ToolCache (agent/tool_cache.py) and writes
+    invalidate it; the outcome is noted under `call_id` for the tool_call event.
+    Identical reads already in flight share one request; writes never do.
+
+    Reads are held to their latency budget (hedged past their p95) and every
+    action fails fast while its circuit breaker is open — either way the
+    result carries a speakable fallback (agent/resilience.py).
     """
-    url = f"{Config.OMNIRA_API_URL}/voice-engine/actions"
-    body = {
+    cache = current_call.tool_cache
+    if cache is not None:
+        cached = cache.get(action, params)
+        if cached is not None:
+            cache.note(call_id, "hit")
+            logger.info("Tool cache hit: %s", action, extra=HIGH_VOLUME)
+            return cached
+
+    if not _health.allow(action):
+        if cache is not None:
+            cache.note(call_id, "circuit_open")
+        return unavailable(action, f"{action} is temporarily unavailable (circuit open)")
+
+    body = _action_body(action, params)
+    started = time.monotonic()
+    try:
+        if action in READS:
+            key = (action, body["practice_id"], body["call_session_id"], params_key(params))
+            data, joined = await _inflight.do(key, lambda: _read(body))
+            if joined:
+                logger.info("Joined in-flight %s request", action, extra=HIGH_VOLUME)
+        else:
+            data, joined = await _post_action(body), False
+            if time.monotonic() - started > budget_for(action):
+                _health.overrun(action)
+    finally:
+        if track and current_call.latency is not None:
+            current_call.latency.tool(action, started)
+
+    if cache is not None:
+        # Joiners store too — the leader's tool call may have been interrupted
+        cache.update(action, params, data)
+        if action not in READS:
+            cache.note(call_id, "write")
+        elif joined:
+            cache.stats["joined"] += 1
+            cache.note(call_id, "joined")
+        else:
+            cache.note(call_id, "miss" if cache.cacheable(action, params) else "bypass")
+    return data
+
+
+def _action_body(action: str, params: dict) -> dict:
+    return {
         "action": action,
         "practice_id": current_call.practice_id or Config.PRACTICE_ID,
         "call_session_id": current_call.call_id or None,
         "params": params,
     }
 
+
+async def _queue_action(action: str, params: dict, *, call_id: str = "") -> dict:
+    """Hand a side-effect action to the durable outbox (agent/outbox.py) and return at once.
+
+    Falls back to sending it inline if the outbox is off or can't be written.
+    """
+    if Config.OUTBOX and action in OUTBOX_ACTIONS:
+        try:
+            key = await get_outbox(Config.CACHE_DIR).enqueue(_action_body(action, params))
+        except sqlite3.Error as e:
+            logger.warning(f"Outbox unavailable ({e}) — sending {action} inline")
+        else:
+            if current_call.tool_cache is not None:
+                current_call.tool_cache.note(call_id, "queued")
+            return {"success": True, "queued": True, "idempotency_key": key}
+    return await _call_omnira_action(action, params, call_id=call_id)
+
+
+async def deliver_queued_action(body: dict) -> dict:
+    """Outbox worker delivery — straight to the platform, no batching window."""
+    return await _send_action(body)
+
+
+async def _read(body: dict) -> dict:
+    """A read within its latency budget, hedged once it's slower than usual."""
+    action = body["action"]
+    budget = budget_for(action)
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            resp = await client.post(
-                url,
-                json=body,
-                headers={
-                    "Authorization": f"Bearer {Config.OMNIRA_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-            )
-            if resp.headers.get("content-type", "").startswith("application/json"):
-                data = resp.json()
-            else:
-                logger.error(f"Omnira API non-JSON response ({action}): status={resp.status_code} body={resp.text[:200]}")
-                return {"success": False, "error": f"Non-JSON response (status {resp.status_code})"}
-            if resp.status_code >= 400:
-                logger.error(f"Omnira API error ({action}): {resp.status_code} — {data}")
-            return data
+        return await asyncio.wait_for(_hedged(body, budget), timeout=budget)
+    except asyncio.TimeoutError:
+        _health.overrun(action)
+        _health.record(action, ok=False)
+        logger.error(f"Omnira API {action} exceeded its {budget:.1f}s budget")
+        return unavailable(action, f"No answer within {budget:.1f}s")
+
+
+def _failed(result: dict) -> bool:
+    return bool(result.get("unavailable"))
+
+
+async def _hedged(body: dict, budget: float) -> dict:
+    action = body["action"]
+    primary = asyncio.ensure_future(_post_action(body))
+    hedge = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=_health.hedge_delay(action, budget))
+        if done or not Config.HEDGED_READS:
+            return await primary
+        logger.info(f"Hedging slow {action} request")
+        # Straight to the platform — the duplicate mustn't wait on a batch window
+        hedge = asyncio.ensure_future(_send_action(body))
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if not _failed(result):
+                    _health.hedged(action, won=task is hedge)
+                    return result
+        # Both failed
+        _health.hedged(action, won=False)
+        return result
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+async def _post_action(body: dict) -> dict:
+    """Send one action — a read is merged with concurrent reads when the platform batches.
+
+    Writes always go on their own: if a batch fails, what ran of it is
+    unknown, and re-sending a book_appointment could book twice.
+    """
+    limit = min(batch_limit(), Config.ACTION_BATCH_MAX)
+    if Config.ACTION_BATCHING and limit > 1 and body["action"] in READS:
+        return await _batcher.submit(body, limit)
+    return await _send_action(body)
+
+
+async def _send_action(body: dict) -> dict:
+    action = body["action"]
+    url = f"{Config.OMNIRA_API_URL}/voice-engine/actions"
+    started = time.monotonic()
+    try:
+        resp = await get_client().post(url, json=body, timeout=timeout_for(action))
+        if resp.headers.get("content-type", "").startswith("application/json"):
+            data = resp.json()
+        else:
+            logger.error(f"Omnira API non-JSON response ({action}): status={resp.status_code} body={resp.text[:200]}")
+            _health.record(action, ok=False)
+            return unavailable(action, f"Non-JSON response (status {resp.status_code})")
+        if resp.status_code >= 400:
+            logger.error(f"Omnira API error ({action}): {resp.status_code} — {data}")
+        if resp.status_code >= 500:
+            _health.record(action, ok=False)
+            return {**data, **unavailable(action, f"Platform error (status {resp.status_code})")}
+        _health.record(action, ok=True, ms=(time.monotonic() - started) * 1000)
+        return data
     except Exception as e:
+        record_error()
         logger.error(f"Omnira API call failed ({action}): {e}")
-        return {"success": False, "error": str(e)}
+        _health.record(action, ok=False)
+        return unavailable(action, str(e))
+
+
+# Statuses meaning the batch endpoint doesn't exist, so none of the actions
+# ran and they can safely be re-sent one by one. Anything else (400, 422...)
+# is reported as a failure of every action in the batch.
+_BATCH_UNSUPPORTED = {404, 405, 501}
+
+
+async def _send_batch(bodies: list[dict]) -> list[dict] | None:
+    actions = [b["action"] for b in bodies]
+    url = f"{Config.OMNIRA_API_URL}/voice-engine/actions"
+    started = time.monotonic()
+    try:
+        resp = await get_client().post(url, json={"actions": bodies}, timeout=timeout_for_batch(actions))
+    except Exception as e:
+        record_error()
+        logger.error(f"Omnira API batch failed ({', '.join(actions)}): {e}")
+        for action in actions:
+            _health.record(action, ok=False)
+        return [unavailable(action, str(e)) for action in actions]
+    if resp.status_code in _BATCH_UNSUPPORTED:
+        logger.warning(f"Omnira API rejected a batched request ({resp.status_code}) — sending actions individually")
+        disable_batching()
+        return None
+    results = None
+    if resp.headers.get("content-type", "").startswith("application/json"):
+        results = resp.json().get("results")
+    if not isinstance(results, list) or len(results) != len(bodies):
+        # The actions may have run — don't re-send writes, report the failure
+        logger.error(f"Omnira API batch response unusable ({', '.join(actions)}): status={resp.status_code}")
+        for action in actions:
+            _health.record(action, ok=False)
+        return [unavailable(action, f"Bad batch response (status {resp.status_code})") for action in actions]
+    ms = (time.monotonic() - started) * 1000
+    for action in actions:
+        _health.record(action, ok=True, ms=ms)
+    return [r if isinstance(r, dict) else unavailable(a, "Bad batch result") for a, r in zip(actions, results)]
+
+
+_batcher = ActionBatcher(_send_action, _send_batch, window=Config.ACTION_BATCH_WINDOW_MS / 1000)
+
+
+def batching_stats() -> dict:
+    return dict(_batcher.stats)
+
+
+def action_health() -> dict:
+    """Per-action breaker state, p95, budget overruns and hedges."""
+    return _health.snapshot()
+
+
+async def load_action_health() -> None:
+    """Seed p95s and breakers from earlier calls on this host."""
+    await asyncio.to_thread(_health.load)
+
+
+async def save_action_health() -> None:
+    """Share this call's latencies and breaker state with later calls."""
+    await asyncio.to_thread(_health.save)
+
+
+async def prefetch_availability(date: str, procedure_type: str) -> dict:
+    """Background check_availability for AvailabilityPrefetch."""
+    return await _call_omnira_action(
+        "check_availability", {"date": date, "procedure_type": procedure_type}, track=False
+    )
+
+
+async def sync_schedule(config: PracticeConfig) -> None:
+    """Load the practice's schedule snapshot into current_call.slots (agent/slots.py).
+
+    Without one (platform doesn't serve it, or it's malformed) check_availability
+    simply stays a platform call.
+    """
+    today = _now_for(config).date()
+    result = await _call_omnira_action(
+        "get_schedule_snapshot", {"start_date": today.isoformat(), "days": Config.SLOT_ENGINE_DAYS}, track=False
+    )
+    if result.get("success") is False or "providers" not in result:
+        logger.info(f"Schedule snapshot unavailable ({result.get('error', 'no providers')}) — availability stays remote")
+        return
+    try:
+        engine = SlotEngine.from_snapshot(
+            result,
+            start=today,
+            days=Config.SLOT_ENGINE_DAYS,
+            granularity=Config.SLOT_GRANULARITY_MINUTES,
+            increment=Config.SLOT_INCREMENT_MINUTES,
+            timezone=config.practice_timezone,
+        )
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        logger.warning(f"Schedule snapshot unusable: {e}")
+        return
+    current_call.slots = engine
+    logger.info(f"Slot engine ready: {len(engine.providers)} providers x {engine.days} days")
+
+
+_resync: asyncio.Task | None = None
+
+
+def _resync_schedule() -> None:
+    """Drop the snapshot and fetch a fresh one in the background."""
+    global _resync
+    current_call.slots = None
+    if current_call.practice_config is not None and (_resync is None or _resync.done()):
+        _resync = asyncio.create_task(sync_schedule(current_call.practice_config), name="schedule-resync")
+
+
+# Slots kept per day when one check_availability call covers a range
+_RANGE_SLOTS_PER_DAY = 3
+
+
+def _local_availability(first, last, procedure_type: str, max_results: int = 5) -> dict | None:
+    """check_availability for first..last answered by the slot engine, or None to ask the platform."""
+    engine = current_call.slots
+    if engine is None or not engine.covers(first, last):
+        return None
+    if engine.age() > Config.SLOT_SNAPSHOT_TTL:
+        # Stale — refresh in the background and ask the platform this time
+        _resync_schedule()
+        return None
+    found = engine.query(first, last, procedure_type, now=engine.now(), max_results=max_results)
+    return {
+        "success": True,
+        "available_slots": found["slots"],
+        "date": first.isoformat(),
+        "total_available": found["total_available"],
+    }
+
+
+async def _day_availability(day: str, procedure_type: str, call_id: str) -> dict:
+    """One day's slots: prefetched, else the platform (via the cache, single-flight and batching)."""
+    if current_call.availability is not None:
+        result = await current_call.availability.get(day, procedure_type)
+        if result is not None:
+            if current_call.tool_cache is not None:
+                current_call.tool_cache.note(call_id, "prefetch")
+            return result
+    return await _call_omnira_action("check_availability", {
+        "date": day,
+        "procedure_type": procedure_type,
+    }, call_id=call_id)
+
+
+def _reply(result: dict, call_id: str, compact=project) -> str:
+    """A tool result as it goes into the LLM context (agent/tool_results.py)."""
+    if not Config.COMPACT_TOOL_RESULTS:
+        return json.dumps(result)
+    if current_call.tool_tokens is not None:
+        current_call.tool_tokens.note_raw(call_id, result)
+    return dumps(compact(result))
 
 
 @function_tool(description="Look up an existing patient by name or phone number.")
@@ -62,8 +381,11 @@ async def lookup_patient(
         name: Patient name to search for
         phone: Patient phone number to search for
     """
-    logger.info(f"Looking up patient: name={name}, phone={phone}")
-    result = await _call_omnira_action("lookup_patient", {"name": name, "phone": phone})
+    logger.info("Looking up patient: name=%s, phone=%s", name, phone, extra=HIGH_VOLUME)
+    result = await _call_omnira_action("lookup_patient", {"name": name, "phone": phone}, call_id=_call_id(context))
+    if result.get("unavailable"):
+        # Not "no patient found" — the platform didn't answer
+        return json.dumps({"found": None, "message": result["message"]})
 
     if result.get("found"):
         patients = result.get("patients", [])
@@ -81,37 +403,91 @@ async def lookup_patient(
     return json.dumps({"found": False, "message": "No patient found with that information."})
 
 
-@function_tool(description="Check available appointment slots. Call this when a patient asks about availability.")
+@function_tool(description=(
+    "Check available appointment slots. Call this when a patient asks about availability. "
+    "For several days or a week, pass the first day as date and the last as end_date — one call covers the range."
+))
 async def check_availability(
     context: RunContext,
     date: str,
     procedure_type: str = "general",
+    end_date: str = "",
 ) -> str:
-    """Check available appointment slots for a given date.
+    """Check available appointment slots for a date or a range of dates.
 
     Args:
-        date: The date to check (YYYY-MM-DD format or natural language like 'next Tuesday')
+        date: The date to check, or the first day of a range (YYYY-MM-DD format or natural language like 'next Tuesday')
         procedure_type: Type of appointment (general, cleaning, emergency, consultation)
+        end_date: Last day of the range to check (optional, same formats as date)
     """
-    logger.info(f"Checking availability for {date}, procedure: {procedure_type}")
-
-    result = await _call_omnira_action("check_availability", {
-        "date": date,
-        "procedure_type": procedure_type,
-    })
-
-    if result.get("success"):
+    logger.info(
+        "Checking availability for %s%s, procedure: %s", date, f" to {end_date}" if end_date else "", procedure_type,
+        extra=HIGH_VOLUME,
+    )
+    call_id = _call_id(context)
+
+    # Spoken dates become open business days here, before any network call
+    config = current_call.practice_config
+    resolved = resolve_dates(date, config, end=end_date) if config is not None else None
+    if resolved is None:
+        logger.info(f"Could not resolve '{date}' locally — passing it to the platform as-is")
+        days = [date]
+    else:
+        days = [d.isoformat() for d in resolved.dates]
+    per_day = None if len(days) == 1 else _RANGE_SLOTS_PER_DAY
+
+    result = None
+    if resolved is not None:
+        result = _local_availability(
+            resolved.dates[0], resolved.dates[-1], procedure_type,
+            max_results=5 if per_day is None else min(12, per_day * len(days)),
+        )
+        if result is not None and current_call.tool_cache is not None:
+            current_call.tool_cache.note(call_id, "slot_engine")
+    if result is None:
+        # One lookup per open day, concurrently — with batching on they share one request
+        results = await asyncio.gather(*(_day_availability(day, procedure_type, call_id) for day in days))
+        result = _merge_availability(days, results, per_day)
+
+    if not result.get("success"):
         return json.dumps({
-            "available_slots": result.get("available_slots", []),
-            "date": result.get("date", date),
-            "total_available": result.get("total_available", 0),
+            "available_slots": [],
+            "date": days[0],
+            "message": "Unable to check availability right now. Please ask the patient for their preferred time and we'll confirm.",
         })
 
-    return json.dumps({
-        "available_slots": [],
-        "date": date,
-        "message": "Unable to check availability right now. Please ask the patient for their preferred time and we'll confirm.",
-    })
+    reply = {"available_slots": result.get("available_slots", [])}
+    if len(days) == 1:
+        reply["date"] = result.get("date", days[0])
+    else:
+        reply["dates"] = days
+    reply["total_available"] = result.get("total_available", 0)
+    if result.get("unchecked_dates"):
+        reply["unchecked_dates"] = result["unchecked_dates"]
+    if resolved is not None and resolved.closed:
+        closed = ", ".join(f"{d:%A %B} {d.day}" for d in resolved.closed)
+        reply["closed"] = closed
+        if resolved.moved:
+            first = resolved.dates[0]
+            reply["note"] = f"The office is closed {closed}. These are the openings for {first:%A %B} {first.day} instead."
+    return _reply(reply, call_id, lambda r: compact_availability(r, max_groups=Config.TOOL_RESULT_SLOT_GROUPS))
+
+
+def _merge_availability(days: list[str], results: list[dict], per_day: int | None) -> dict:
+    """Per-day platform results → one result; per_day caps each day's slots in a range reply."""
+    if len(results) == 1:
+        return results[0]
+    slots, total, unchecked = [], 0, []
+    for day, result in zip(days, results):
+        if not result.get("success"):
+            unchecked.append(day)
+            continue
+        day_slots = result.get("available_slots", [])
+        slots.extend({"date": day, **slot} if isinstance(slot, dict) else slot for slot in day_slots[:per_day])
+        total += result.get("total_available", len(day_slots))
+    if len(unchecked) == len(days):
+        return results[0]
+    return {"success": True, "available_slots": slots, "total_available": total, "unchecked_dates": unchecked}
 
 
 @function_tool(description=(
@@ -141,7 +517,10 @@ async def book_appointment(
         is_new_patient: Whether this is a new patient (default True)
         provider_id: The provider_id from the chosen availability slot (strongly recommended)
     """
-    logger.info(f"Booking: {patient_name} on {date} at {time} for {procedure_type} (provider={provider_id or 'auto'})")
+    logger.info(
+        "Booking: %s on %s at %s for %s (provider=%s)", patient_name, date, time, procedure_type, provider_id or "auto",
+        extra=HIGH_VOLUME,
+    )
 
     result = await _call_omnira_action("book_appointment", {
         "patient_name": patient_name,
@@ -152,7 +531,17 @@ async def book_appointment(
         "email": patient_email,
         "is_new_patient": is_new_patient,
         "provider_id": provider_id,
-    })
+    }, call_id=_call_id(context))
+    # Booked or not (a conflict means someone else took it), prefetched
+    # availability no longer reflects the schedule
+    if current_call.availability is not None:
+        current_call.availability.invalidate()
+    if current_call.slots is not None:
+        if result.get("success"):
+            current_call.slots.book(provider_id or str(result.get("provider_id", "")), date, time, procedure_type)
+        elif not result.get("unavailable"):
+            # The platform refused a slot the snapshot thought was open
+            _resync_schedule()
 
     if result.get("success"):
         return json.dumps({
@@ -162,6 +551,8 @@ async def book_appointment(
             "message": result.get("message", f"Appointment booked for {patient_name} on {date} at {time}."),
         })
 
+    if result.get("unavailable"):
+        return json.dumps({"status": "error", "message": result["message"]})
     return json.dumps({
         "status": "error",
         "message": f"I wasn't able to book that appointment right now. Error: {result.get('error', 'unknown')}",
@@ -180,13 +571,15 @@ async def send_sms(
         to_phone: Recipient phone number (E.164 format, e.g., +15551234567)
         message: The SMS message text
     """
-    logger.info(f"Sending SMS to {to_phone}: {message[:50]}...")
+    logger.info("Sending SMS to %s: %.50s...", to_phone, message, extra=HIGH_VOLUME)
 
-    result = await _call_omnira_action("send_sms", {
+    result = await _queue_action("send_sms", {
         "phone": to_phone,
         "message": message,
-    })
+    }, call_id=_call_id(context))
 
+    if result.get("queued"):
+        return f"Confirmation text to {to_phone} is on its way."
     if result.get("success"):
         return f"Confirmation text sent successfully to {to_phone}."
     return "I wasn't able to send the text right now, but I've noted the appointment details."
@@ -194,7 +587,8 @@ async def send_sms(
 
 @function_tool(description=(
     "Send a confirmation email to the patient. Use after booking an appointment. "
-    "ALWAYS pass the appointment_id returned by book_appointment so the email shows the right appointment."
+    "ALWAYS pass the appointment_id returned by book_appointment (or listed by get_my_appointments "
+    "for an existing appointment) so the email shows the right appointment."
 ))
 async def send_email(
     context: RunContext,
@@ -209,17 +603,19 @@ async def send_email(
         to_email: Recipient email address
         subject: Email subject line
         body: Email body text (plain text)
-        appointment_id: The appointment_id from book_appointment (strongly recommended)
+        appointment_id: The appointment_id from book_appointment or get_my_appointments (strongly recommended)
     """
-    logger.info(f"Sending email to {to_email}: {subject}")
+    logger.info("Sending email to %s: %s", to_email, subject, extra=HIGH_VOLUME)
 
-    result = await _call_omnira_action("send_confirmation_email", {
+    result = await _queue_action("send_confirmation_email", {
         "email": to_email,
         "subject": subject,
         "body": body,
         "appointment_id": appointment_id,
-    })
+    }, call_id=_call_id(context))
 
+    if result.get("queued"):
+        return f"Confirmation email to {to_email} is on its way."
     if result.get("success"):
         return f"Confirmation email sent successfully to {to_email}."
     return "I wasn't able to send the email right now, but your appointment is confirmed."
@@ -243,21 +639,49 @@ async def log_message(
         callback_number: Phone number to call back (if provided)
         callback_name: Name of person to call back (if provided)
     """
-    logger.info(f"Logging message: category={category}, urgency={urgency}, message={message[:100]}")
+    logger.info(
+        "Logging message: category=%s, urgency=%s, message=%.100s", category, urgency, message, extra=HIGH_VOLUME
+    )
 
-    result = await _call_omnira_action("log_message", {
+    result = await _queue_action("log_message", {
         "message": message,
         "category": category,
         "urgency": urgency,
         "callback_number": callback_number,
         "callback_name": callback_name,
-    })
+    }, call_id=_call_id(context))
 
     if result.get("success"):
         return "Got it, I've logged that for the team. Someone will follow up."
     return "I've made a note of that. Someone from our team will follow up with you."
 
 
+@function_tool(description=(
+    "Search the practice's knowledge base (website/FAQ content: services, insurance accepted, "
+    "financing, policies, parking, what to expect). Use a short plain-words query."
+))
+async def search_knowledge_base(context: RunContext, query: str) -> str:
+    """Return the few most relevant knowledge-base passages.
+
+    Args:
+        query: What the caller is asking about, in a few plain words
+    """
+    index = knowledge.get_index(current_call.practice_id)
+    if index is None:
+        return json.dumps({"results": [], "message": "No knowledge base available for this practice."})
+
+    results = index.search(query, k=3)
+    passages = [chunk for _, chunk in results]
+    returned_tokens = sum(knowledge.estimate_tokens(p) for p in passages)
+    logger.info(
+        f"KB search '{query[:60]}' → {len(passages)} passage(s), ~{returned_tokens} tokens "
+        f"(vs ~{index.stats.get('inline_tokens', 0)} inlined per turn)"
+    )
+    if not passages:
+        return json.dumps({"results": [], "message": "Nothing in the knowledge base matches that."})
+    return json.dumps({"results": passages})
+
+
 @function_tool(description="End the phone call gracefully. Call this AFTER you've said goodbye and the conversation is complete.")
 async def end_call(
     context: RunContext,
@@ -322,9 +746,10 @@ async def verify_caller(
     ):
         if value:
             params[key] = value
-    result = await _call_omnira_action("verify_caller", params)
-    logger.info(f"verify_caller → tier={result.get('tier')} locked={result.get('locked')}")
-    return json.dumps(result)
+    call_id = _call_id(context)
+    result = await _call_omnira_action("verify_caller", params, call_id=call_id)
+    logger.info("verify_caller → tier=%s locked=%s", result.get("tier"), result.get("locked"), extra=HIGH_VOLUME)
+    return _reply(result, call_id)
 
 
 @function_tool(description=(
@@ -333,8 +758,9 @@ async def verify_caller(
     "the email on file — never to an address the caller dictates."
 ))
 async def send_verification_code(context: RunContext) -> str:
-    result = await _call_omnira_action("send_verification_code", {"channel": "email"})
-    return json.dumps(result)
+    call_id = _call_id(context)
+    result = await _call_omnira_action("send_verification_code", {"channel": "email"}, call_id=call_id)
+    return _reply(result, call_id)
 
 
 @function_tool(description="Confirm the 6-digit verification code the caller reads back.")
@@ -344,16 +770,18 @@ async def confirm_verification_code(context: RunContext, code: str) -> str:
     Args:
         code: The 6-digit code the caller read back
     """
-    result = await _call_omnira_action("confirm_verification_code", {"code": code})
-    return json.dumps(result)
+    call_id = _call_id(context)
+    result = await _call_omnira_action("confirm_verification_code", {"code": code}, call_id=call_id)
+    return _reply(result, call_id)
 
 
 @function_tool(description=(
     "Get the verified caller's upcoming appointments. Requires tier 1 verification."
 ))
 async def get_my_appointments(context: RunContext) -> str:
-    result = await _call_omnira_action("get_my_appointments", {})
-    return json.dumps(result)
+    call_id = _call_id(context)
+    result = await _call_omnira_action("get_my_appointments", {}, call_id=call_id)
+    return _reply(result, call_id)
 
 
 @function_tool(description=(
@@ -361,8 +789,9 @@ async def get_my_appointments(context: RunContext) -> str:
     "insurance plan on file. Requires tier 2 verification."
 ))
 async def get_account_snapshot(context: RunContext) -> str:
-    result = await _call_omnira_action("get_account_snapshot", {})
-    return json.dumps(result)
+    call_id = _call_id(context)
+    result = await _call_omnira_action("get_account_snapshot", {}, call_id=call_id)
+    return _reply(result, call_id)
 
 
 @function_tool(description=(
@@ -376,8 +805,9 @@ async def check_benefits(context: RunContext, refresh: bool = False) -> str:
     Args:
         refresh: Request a live check with the insurer (slower; use sparingly)
     """
-    result = await _call_omnira_action("check_benefits", {"refresh": refresh})
-    return json.dumps(result)
+    call_id = _call_id(context)
+    result = await _call_omnira_action("check_benefits", {"refresh": refresh}, call_id=call_id)
+    return _reply(result, call_id)
 
 
 @function_tool(description=(
@@ -391,5 +821,6 @@ async def estimate_copay(context: RunContext, procedure: str) -> str:
     Args:
         procedure: The procedure in plain words or a CDT code
     """
-    result = await _call_omnira_action("estimate_copay", {"procedure": procedure})
-    return json.dumps(result)
+    call_id = _call_id(context)
+    result = await _call_omnira_action("estimate_copay", {"procedure": procedure}, call_id=call_id)
+    return _reply(result, call_id)
@@ -1,11 +1,15 @@
 """Omnira Voice Agent — the main agent definition."""
+import asyncio
+import importlib
 import logging
+import os
+import time
 
 from livekit.agents import Agent, AgentSession
 from livekit.plugins import deepgram, silero, anthropic, openai
 
 from agent.config import Config, PracticeConfig
-from agent.prompts import build_system_prompt
+from agent.prompts import build_system_prompt, kb_is_indexed
 from agent.tools import (
     check_availability,
     book_appointment,
@@ -21,9 +25,12 @@ from agent.tools import (
     get_account_snapshot,
     check_benefits,
     estimate_copay,
+    search_knowledge_base,
 )
 from agent.call_context import current_call
 from agent.logger import CallLogger
+from agent.phases import PhaseTimer
+from tts.phrase_cache import CachedTTS, get_phrase_cache
 
 logger = logging.getLogger("omnira-agent")
 
@@ -55,7 +62,13 @@ DEFAULT_VOICE = ("elevenlabs", "liz")
 class OmniraReceptionist(Agent):
     """The Omnira dental receptionist voice agent."""
 
-    def __init__(self, call_logger: CallLogger, practice_config: PracticeConfig):
+    def __init__(
+        self,
+        call_logger: CallLogger,
+        practice_config: PracticeConfig,
+        recognition: asyncio.Task | None = None,
+        phases: PhaseTimer | None = None,
+    ):
         caller_info = (
             {"phone_number": current_call.caller_number}
             if current_call.caller_number
@@ -66,9 +79,18 @@ class OmniraReceptionist(Agent):
         )
         self.call_logger = call_logger
         self.practice_config = practice_config
+        # start_call_session runs alongside session start; only the greeting
+        # needs its result (the task carries its own deadline).
+        self._recognition = recognition
+        self._phases = phases
         logger.info(f"Agent created: practice={practice_config.practice_name} agent={practice_config.agent_name}")
 
     async def on_enter(self):
+        if self._recognition is not None:
+            await self._recognition
+        if self._phases is not None:
+            self._phases.mark("greeting_requested")
+
         if current_call.recognized_first_name:
             continuity = (
                 f" They called recently about: {current_call.recent_call_topic}. If natural, offer to pick that back up."
@@ -89,9 +111,40 @@ class OmniraReceptionist(Agent):
                 f"{self.practice_config.practice_name}, this is {self.practice_config.agent_name}, how can I help you today?"
             )
 
+    # The default pipeline nodes, wrapped to time each stage for the
+    # per-turn latency breakdown (agent/latency.py).
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        latency = self.call_logger.latency
+        started = latency.llm_request()
+        first = True
+        async for chunk in Agent.default.llm_node(self, chat_ctx, tools, model_settings):
+            if first:
+                latency.llm_first_token(started)
+                first = False
+            yield chunk
+
+    async def tts_node(self, text, model_settings):
+        latency = self.call_logger.latency
+        text_started: float | None = None
+
+        async def _timed_text():
+            nonlocal text_started
+            async for chunk in text:
+                if text_started is None:
+                    text_started = time.monotonic()
+                yield chunk
 
-def create_agent_session(practice_config: PracticeConfig) -> AgentSession:
-    """Create a configured AgentSession with TTS based on practice preference."""
+        first = True
+        async for frame in Agent.default.tts_node(self, _timed_text(), model_settings):
+            if first:
+                latency.tts_first_frame(text_started)
+                first = False
+            yield frame
+
+
+def _create_tts(practice_config: PracticeConfig):
+    """TTS for this practice's voice preference, behind the phrase cache."""
     tts_provider = practice_config.tts_provider or "deepgram"
     voice_id = practice_config.tts_voice_id or ""
 
@@ -105,7 +158,27 @@ def create_agent_session(practice_config: PracticeConfig) -> AgentSession:
             voice_id=resolved_voice_id,
             model="eleven_flash_v2_5",
         )
+        provider, voice = "elevenlabs", resolved_voice_id
         logger.info(f"Using ElevenLabs TTS: voice={resolved_voice_id}")
+    elif tts_provider == "kokoro" and Config.KOKORO_BASE_URLS:
+        from tts.kokoro_tts import KokoroTTS
+        voice = voice_id or Config.KOKORO_VOICE
+        tts = KokoroTTS(
+            base_urls=Config.KOKORO_BASE_URLS,
+            api_key=Config.KOKORO_API_KEY,
+            voice=voice,
+            response_format=Config.KOKORO_RESPONSE_FORMAT,
+            stream=Config.KOKORO_STREAM,
+            max_concurrency=Config.KOKORO_MAX_CONCURRENCY,
+            max_queue=Config.KOKORO_MAX_QUEUE,
+            queue_timeout=Config.KOKORO_QUEUE_TIMEOUT,
+            slot_dir=os.path.join(Config.CACHE_DIR, "kokoro-slots"),
+        )
+        provider = "kokoro"
+        logger.info(
+            f"Using Kokoro TTS: voice={voice} format={Config.KOKORO_RESPONSE_FORMAT} "
+            f"stream={Config.KOKORO_STREAM} backends={len(Config.KOKORO_BASE_URLS)}"
+        )
     else:
         model = "aura-2-thalia-en"
         if voice_id and voice_id in [v["model"] for v in VOICE_OPTIONS["deepgram"].values()]:
@@ -114,11 +187,20 @@ def create_agent_session(practice_config: PracticeConfig) -> AgentSession:
             api_key=Config.DEEPGRAM_API_KEY,
             model=model,
         )
+        provider, voice = "deepgram", model
         logger.info(f"Using Deepgram TTS: model={model}")
 
-    # ── LLM with fallback: Mercury 2 (primary) → Claude Sonnet (fallback) ──
-    # LiveKit's FallbackAdapter automatically switches if the primary fails
-    # (timeout, overload, rate limit, etc.). The user never hears the swap.
+    if Config.TTS_PHRASE_CACHE:
+        tts = CachedTTS(tts, cache=get_phrase_cache(), voice=voice, provider=provider)
+    return tts
+
+
+def _create_llm():
+    """LLM with fallback: Mercury 2 (primary) → Claude Sonnet (fallback).
+
+    LiveKit's FallbackAdapter automatically switches if the primary fails
+    (timeout, overload, rate limit, etc.). The user never hears the swap.
+    """
     from livekit.agents.llm import FallbackAdapter
 
     sonnet_llm = anthropic.LLM(
@@ -144,32 +226,101 @@ def create_agent_session(practice_config: PracticeConfig) -> AgentSession:
             model="claude-haiku-4-5",
         )
         logger.info("Using Claude Haiku LLM (Anthropic) — legacy default")
+    return llm
+
+
+def _create_stt():
+    return deepgram.STT(
+        api_key=Config.DEEPGRAM_API_KEY,
+        model="nova-2",
+        language="en",
+    )
+
+
+def prewarm_components(userdata: dict) -> None:
+    """Load everything that doesn't depend on the practice, once per job process.
+
+    Runs from the worker's prewarm_fnc while the process sits idle, so the
+    Silero model load, plugin imports and provider client construction are
+    already done when a call is assigned. No event loop exists yet — network
+    warm-up happens in warm_provider_connections() at the top of the job.
+    """
+    started = time.monotonic()
+    # TTS plugins are imported lazily by provider; pay for the import here.
+    for module in ("livekit.plugins.elevenlabs", "tts.kokoro_tts"):
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning(f"Prewarm: could not import {module}: {e}")
+
+    userdata["vad"] = silero.VAD.load()
+    userdata["stt"] = _create_stt()
+    userdata["llm"] = _create_llm()
+    logger.info(f"Job process prewarmed in {(time.monotonic() - started) * 1000:.0f}ms")
+
+
+async def warm_provider_connections(userdata: dict) -> None:
+    """Open provider connections while the room connects / the caller joins.
+
+    The LLM plugins ship their own token-free prewarm (a models.list call on
+    the SDK client the session will reuse). Deepgram STT has none, so a HEAD
+    through the job's shared aiohttp session resolves DNS and parks a TLS
+    connection for the streaming socket.
+    """
+    llm = userdata.get("llm")
+    if llm is not None:
+        llm.prewarm()
+
+    if not Config.DEEPGRAM_API_KEY:
+        return
+    try:
+        from livekit.agents import utils
+
+        async with utils.http_context.http_session().head("https://api.deepgram.com/v1/listen") as resp:
+            logger.debug(f"Deepgram warm-up: {resp.status}")
+    except Exception as e:
+        logger.warning(f"Deepgram connection warm-up failed: {e}")
+
+
+def create_agent_session(practice_config: PracticeConfig, userdata: dict | None = None) -> AgentSession:
+    """Create a configured AgentSession with TTS based on practice preference.
+
+    VAD, STT and LLM come from the job process's prewarmed userdata when
+    available (see prewarm_components); only the practice-specific TTS is
+    built per call, and its connection is opened immediately.
+    """
+    userdata = userdata if userdata is not None else {}
+
+    tts = _create_tts(practice_config)
+    tts.prewarm()
+
+    tools = [
+        lookup_patient,
+        check_availability,
+        book_appointment,
+        send_sms,
+        send_email,
+        log_message,
+        end_call,
+        verify_caller,
+        send_verification_code,
+        confirm_verification_code,
+        get_my_appointments,
+        get_account_snapshot,
+        check_benefits,
+        estimate_copay,
+    ]
+    # Same condition as the prompt's knowledge-base section: a small
+    # knowledge base is inlined there and has no index to search
+    if kb_is_indexed(practice_config):
+        tools.append(search_knowledge_base)
 
     session = AgentSession(
-        vad=silero.VAD.load(),
-        stt=deepgram.STT(
-            api_key=Config.DEEPGRAM_API_KEY,
-            model="nova-2",
-            language="en",
-        ),
-        llm=llm,
+        vad=userdata.get("vad") or silero.VAD.load(),
+        stt=userdata.get("stt") or _create_stt(),
+        llm=userdata.get("llm") or _create_llm(),
         tts=tts,
-        tools=[
-            lookup_patient,
-            check_availability,
-            book_appointment,
-            send_sms,
-            send_email,
-            log_message,
-            end_call,
-            verify_caller,
-            send_verification_code,
-            confirm_verification_code,
-            get_my_appointments,
-            get_account_snapshot,
-            check_benefits,
-            estimate_copay,
-        ],
+        tools=tools,
     )
 
     return session
@@ -0,0 +1,120 @@
+"""Microbenchmark: per-event cost of CallLogger.log_event.
+
+Run: python -m scripts.bench_events [--events 20000] [--repeat 5]
+
+log_event runs synchronously inside LiveKit's conversation_item_added and
+function_tools_executed callbacks. Compared here with the previous
+implementation (ISO timestamp string, a dict spread and json.dumps for the
+INFO line on every event), for the same mix of utterances and tool calls:
+
+  logged   "call-logger" at INFO, lines written to /dev/null (production)
+  quiet    "call-logger" above INFO, so the line is never built
+
+plus what the deferred work costs once at call end (get_full_payload) and
+the memory the recorded events hold. CALL_EVENTS_MAX is lifted for the
+comparison so both keep every event; the bounded figure is shown last.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from agent.config import Config
+from agent.logger import CallLogger
+
+logger = logging.getLogger("call-logger")
+
+UTTERANCE = "I was hoping to get in sometime next week, ideally a morning, for a cleaning"
+TOOL_RESULT = json.dumps({"ok": True, "date": "2026-10-20", "slots": ["9:00–10:30 AM every 30m"] * 12})[:500]
+
+
+class LegacyCallLogger(CallLogger):
+    """log_event as it was before CallEvent records."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.legacy_events: list[dict] = []
+        self.legacy_tool_results: list[dict] = []
+
+    def log_event(self, event_type: str, data: dict):
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "type": event_type,
+            **data,
+        }
+        self.legacy_events.append(entry)
+        if event_type == "tool_call":
+            self.legacy_tool_results.append(dict(data))
+        logger.info(f"[{self.call_id}] {event_type}: {json.dumps(data)[:200]}")
+
+
+def _record(call_logger: CallLogger, n: int) -> None:
+    for i in range(n):
+        if i % 4 == 3:
+            call_logger.log_tool_call("check_availability", {"date": "next tuesday", "procedure_type": "cleaning"}, TOOL_RESULT)
+        elif i % 2:
+            call_logger.log_agent_speech(UTTERANCE)
+        else:
+            call_logger.log_caller_speech(UTTERANCE)
+
+
+def _per_event_us(cls, n: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        call_logger = cls("bench-call")
+        started = time.perf_counter()
+        _record(call_logger, n)
+        best = min(best, time.perf_counter() - started)
+    return best / n * 1e6
+
+
+def _memory_kb(cls, n: int) -> float:
+    tracemalloc.start()
+    call_logger = cls("bench-call")
+    _record(call_logger, n)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del call_logger
+    return size / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bound = Config.CALL_EVENTS_MAX
+    Config.CALL_EVENTS_MAX = max(bound, args.events)
+    logger.propagate = False
+    sink = open(os.devnull, "w")
+    logger.addHandler(logging.StreamHandler(sink))
+    print(f"{args.events} events (3 utterances : 1 tool call), best of {args.repeat}\n")
+    print(f"{'':<10}{'before':>12}{'after':>12}{'speedup':>10}  (µs per event)")
+    for label, level in (("logged", logging.INFO), ("quiet", logging.WARNING)):
+        logger.setLevel(level)
+        before = _per_event_us(LegacyCallLogger, args.events, args.repeat)
+        after = _per_event_us(CallLogger, args.events, args.repeat)
+        print(f"{label:<10}{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x")
+
+    logger.setLevel(logging.WARNING)
+    call_logger = CallLogger("bench-call")
+    _record(call_logger, args.events)
+    started = time.perf_counter()
+    call_logger.get_full_payload()
+    deferred = (time.perf_counter() - started) / args.events * 1e6
+    print(f"\nDeferred to get_full_payload: {deferred:.2f} µs per event, once at call end")
+    print(
+        f"Memory held: {_memory_kb(LegacyCallLogger, args.events):.0f} KB before, "
+        f"{_memory_kb(CallLogger, args.events):.0f} KB after"
+    )
+    Config.CALL_EVENTS_MAX = bound
+    print(f"  bounded at CALL_EVENTS_MAX={bound}: {_memory_kb(CallLogger, args.events):.0f} KB")
+    sink.close()
+
+
+if __name__ == "__main__":
+    main()
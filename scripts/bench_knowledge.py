@@ -0,0 +1,96 @@
+"""Benchmark the knowledge-base index: build time, query latency, tokens saved.
+
+Run: python -m scripts.bench_knowledge [path/to/knowledge_base.txt]
+
+Without a path a synthetic ~40 KB website scrape is used. "Tokens saved per
+turn" compares the prompt with the knowledge base inlined against the
+prompt that points at search_knowledge_base instead — that difference is
+re-sent on every LLM turn.
+"""
+import statistics
+import sys
+import time
+
+from agent import knowledge
+from agent.config import Config, PracticeConfig
+from agent.prompts import build_system_prompt
+
+QUERIES = [
+    "do you take delta dental insurance",
+    "is there parking",
+    "payment plans financing",
+    "how much does teeth whitening cost",
+    "what should I bring to my first visit",
+    "do you see kids",
+    "emergency toothache weekend",
+    "invisalign consultation",
+]
+
+TOPICS = {
+    "Insurance": "We accept most PPO plans including Delta Dental, Cigna, Aetna, MetLife and Guardian. "
+                 "We are out of network with HMO plans but happy to file claims on your behalf.",
+    "Parking": "Free parking is available in the garage behind the building. Enter from Oak Street.",
+    "Financing": "We offer CareCredit and in-house payment plans with no interest for twelve months.",
+    "Whitening": "In-office whitening takes about ninety minutes. Take-home trays are also available.",
+    "First Visit": "Please bring your ID, insurance card and a list of current medications.",
+    "Pediatric": "We see children from age three and up. Parents are welcome in the treatment room.",
+    "Emergencies": "For a weekend toothache call our main line and follow the prompts for the on-call dentist.",
+    "Invisalign": "Invisalign consultations are free and include a 3D scan of your teeth.",
+}
+
+
+def synthetic_kb(target_chars: int = 40_000) -> str:
+    sections = []
+    i = 0
+    while sum(len(s) for s in sections) < target_chars:
+        for title, body in TOPICS.items():
+            filler = " ".join(
+                f"Our team at location {i} works hard to make every visit comfortable and on time."
+                for _ in range(4)
+            )
+            sections.append(f"## {title} ({i})\n\n{body}\n\n{filler}")
+        i += 1
+    return "\n\n".join(sections)
+
+
+def main() -> int:
+    kb = open(sys.argv[1]).read() if len(sys.argv) > 1 else synthetic_kb()
+
+    build_times = []
+    for _ in range(5):
+        knowledge._indexes.clear()
+        started = time.perf_counter()
+        index = knowledge.index_for("bench", kb)
+        build_times.append((time.perf_counter() - started) * 1000)
+
+    latencies = []
+    returned_tokens = []
+    for _ in range(50):
+        for q in QUERIES:
+            started = time.perf_counter()
+            results = index.search(q, k=3)
+            latencies.append((time.perf_counter() - started) * 1000)
+            returned_tokens.append(sum(knowledge.estimate_tokens(chunk) for _, chunk in results))
+
+    config = PracticeConfig(practice_id="bench", knowledge_base=kb)
+    indexed_tokens = knowledge.estimate_tokens(build_system_prompt(config, use_cache=False))
+    threshold = Config.KB_INLINE_MAX_CHARS
+    Config.KB_INLINE_MAX_CHARS = len(kb) + 1
+    inline_tokens = knowledge.estimate_tokens(build_system_prompt(config, use_cache=False))
+    Config.KB_INLINE_MAX_CHARS = threshold
+
+    latencies.sort()
+    print(f"Knowledge base: {len(kb)} chars, {len(index.chunks)} chunks")
+    print(f"Index build:    median {statistics.median(build_times):.1f}ms")
+    print(
+        f"Query latency:  p50 {latencies[len(latencies) // 2]:.3f}ms  "
+        f"p95 {latencies[int(len(latencies) * 0.95)]:.3f}ms"
+    )
+    print(f"Prompt tokens:  inlined ~{inline_tokens}  indexed ~{indexed_tokens}")
+    print(f"Saved per turn: ~{inline_tokens - indexed_tokens} input tokens")
+    print(f"Search result:  ~{statistics.mean(returned_tokens):.0f} tokens added (only on turns that search)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Kokoro TTS time-to-first-audio: buffered MP3 vs streamed PCM.
+
+Run against a real kokoro-web container:
+    python -m scripts.bench_kokoro --url http://localhost:3001
+
+Or against a local simulator that produces audio at a fixed real-time
+factor (useful on machines without Kokoro):
+    python -m scripts.bench_kokoro --simulate
+
+For each sentence length it reports time to the first synthesized frame
+(what the caller waits for) for the old path (stream=False, mp3) and the
+streaming path (stream=True, pcm).
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+
+from tts.kokoro_tts import KokoroTTS
+
+SENTENCES = [
+    "Sure thing!",
+    "Let me take a quick peek at our schedule for you.",
+    "Okay so I've got a couple options for you — there's a nine AM with Doctor Smith on Tuesday, "
+    "or a two thirty in the afternoon on Thursday with Doctor Johnson.",
+    "Perfect, so that's a cleaning and checkup on Thursday, February twenty-sixth at two thirty in the "
+    "afternoon with Doctor Johnson, and I'll text a confirmation to the number you're calling from. "
+    "Is there anything else I can help you with today?",
+]
+
+SAMPLE_RATE = 24000
+
+
+async def _simulator(port: int, chars_per_second: float, workers: int | None = None):
+    """Fake kokoro-web: streams 24 kHz PCM (or returns one MP3) at a fixed
+    synthesis speed, so streaming can start before the sentence is done.
+    With `workers`, only that many sentences synthesize at once (CPU-bound
+    container); the rest wait their turn."""
+    from aiohttp import web
+
+    cpu = asyncio.Semaphore(workers) if workers else None
+
+    async def speech(request: web.Request) -> web.StreamResponse:
+        if cpu is None:
+            return await _speak(request)
+        async with cpu:
+            return await _speak(request)
+
+    async def _speak(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        text = body["input"]
+        audio_seconds = max(0.5, len(text) / 15)  # ~15 spoken chars/second
+        total = int(audio_seconds * SAMPLE_RATE) * 2
+        synth_seconds = len(text) / chars_per_second
+        if body.get("response_format") == "pcm":
+            resp = web.StreamResponse(headers={"Content-Type": "audio/pcm"})
+            await resp.prepare(request)
+            pieces = 10
+            for _ in range(pieces):
+                await asyncio.sleep(synth_seconds / pieces)
+                await resp.write(b"\x00" * (total // pieces))
+            await resp.write_eof()
+            return resp
+        await asyncio.sleep(synth_seconds)
+        return web.Response(body=_silent_mp3(audio_seconds), content_type="audio/mpeg")
+
+    app = web.Application()
+    app.router.add_post("/api/v1/audio/speech", speech)
+    app.router.add_get("/", lambda r: web.Response(text="ok"))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+_MP3_CACHE: dict[int, bytes] = {}
+
+
+def _silent_mp3(seconds: float) -> bytes:
+    """Encode `seconds` of silence as MP3 (PyAV ships with livekit-agents)."""
+    key = int(seconds * 10)
+    if key not in _MP3_CACHE:
+        import av
+        import numpy as np
+
+        buf = io.BytesIO()
+        with av.open(buf, "w", format="mp3") as container:
+            stream = container.add_stream("mp3", rate=SAMPLE_RATE, layout="mono")
+            frame_samples = 1152
+            for _ in range(int(seconds * SAMPLE_RATE / frame_samples) + 1):
+                frame = av.AudioFrame.from_ndarray(
+                    np.zeros((1, frame_samples), dtype=np.int16), format="s16", layout="mono"
+                )
+                frame.sample_rate = SAMPLE_RATE
+                for packet in stream.encode(frame):
+                    container.mux(packet)
+            for packet in stream.encode(None):
+                container.mux(packet)
+        _MP3_CACHE[key] = buf.getvalue()
+    return _MP3_CACHE[key]
+
+
+async def _time_to_first_frame(tts: KokoroTTS, text: str) -> float:
+    started = time.perf_counter()
+    first = None
+    async with tts.synthesize(text) as stream:
+        async for _ in stream:
+            if first is None:
+                first = time.perf_counter() - started
+    return (first or 0.0) * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=os.getenv("KOKORO_BASE_URL", "http://localhost:3001"))
+    parser.add_argument("--api-key", default=os.getenv("KOKORO_API_KEY", "kokoro-local-key"))
+    parser.add_argument("--simulate", action="store_true", help="use a local simulator instead of Kokoro")
+    parser.add_argument("--chars-per-second", type=float, default=120.0, help="simulator synthesis speed")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runner = None
+    url = args.url
+    if args.simulate:
+        runner = await _simulator(8931, args.chars_per_second)
+        url = "http://127.0.0.1:8931"
+
+    buffered = KokoroTTS(base_url=url, api_key=args.api_key, response_format="mp3", stream=False)
+    streamed = KokoroTTS(base_url=url, api_key=args.api_key, response_format="pcm", stream=True)
+    try:
+        print(f"{'chars':>6} {'buffered mp3':>14} {'streamed pcm':>14}")
+        for text in SENTENCES:
+            old = [await _time_to_first_frame(buffered, text) for _ in range(args.runs)]
+            new = [await _time_to_first_frame(streamed, text) for _ in range(args.runs)]
+            print(f"{len(text):>6} {statistics.median(old):>12.0f}ms {statistics.median(new):>12.0f}ms")
+    finally:
+        await buffered.aclose()
+        await streamed.aclose()
+        if runner is not None:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
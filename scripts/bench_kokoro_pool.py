@@ -0,0 +1,108 @@
+"""Kokoro backend pool under overlapping calls.
+
+Run: python -m scripts.bench_kokoro_pool [--calls 8] [--chars-per-second 120]
+
+Starts simulated kokoro-web replicas that can each synthesize one sentence
+at a time (a CPU container), one of them 6x slower than the rest, then runs
+`--calls` concurrent calls that each speak a few sentences:
+
+  single   — every call on one replica (the old KOKORO_BASE_URL setup)
+  pool     — the same calls spread over all replicas by KokoroPool
+
+Reports time to first audio per sentence (p50 / p95) and the pool's view
+of each backend, including whether the slow replica got ejected.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+
+from scripts.bench_kokoro import SENTENCES, _simulator
+from tts.kokoro_tts import KokoroTTS
+
+BASE_PORT = 8941
+
+
+async def _first_audio_ms(tts: KokoroTTS, text: str) -> float:
+    started = time.perf_counter()
+    first = None
+    async with tts.synthesize(text) as stream:
+        async for _ in stream:
+            if first is None:
+                first = time.perf_counter() - started
+    return (first or 0.0) * 1000
+
+
+async def _call(tts: KokoroTTS, rng: random.Random, sentences: int, results: list[float]) -> None:
+    for _ in range(sentences):
+        results.append(await _first_audio_ms(tts, rng.choice(SENTENCES[:3])))
+        await asyncio.sleep(rng.uniform(0.2, 0.6))  # caller talking
+
+
+async def _scenario(name: str, urls: list[str], args, max_concurrency: int) -> None:
+    rng = random.Random(3)
+    results: list[float] = []
+    with tempfile.TemporaryDirectory() as slot_dir:
+        voices = [
+            KokoroTTS(
+                base_urls=urls,
+                api_key="k",
+                max_concurrency=max_concurrency,
+                queue_timeout=30.0,
+                max_queue=64,
+                slot_dir=slot_dir,
+            )
+            for _ in range(args.calls)
+        ]
+        started = time.perf_counter()
+        await asyncio.gather(*(_call(tts, rng, args.sentences, results) for tts in voices))
+        elapsed = time.perf_counter() - started
+        pool = voices[0]._pool
+        snapshot = pool.snapshot()
+        for tts in voices:
+            await tts.aclose()
+
+    results.sort()
+    print(
+        f"{name:<7} p50 {statistics.median(results):>6.0f}ms  "
+        f"p95 {results[int(len(results) * 0.95)]:>6.0f}ms  "
+        f"({len(results)} sentences in {elapsed:.1f}s)"
+    )
+    if len(urls) > 1:
+        for backend in snapshot["backends"]:
+            print(
+                f"        {backend['url']}: {backend['requests']} requests, ewma {backend['ewma_ms']}ms, "
+                f"ejections {backend['ejections']}"
+            )
+        print(f"        queued {snapshot['queued']} requests, rejected {snapshot['rejected']}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=8)
+    parser.add_argument("--sentences", type=int, default=6, help="sentences spoken per call")
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--chars-per-second", type=float, default=120.0, help="simulator synthesis speed")
+    args = parser.parse_args()
+
+    runners = []
+    urls = []
+    for i in range(args.replicas):
+        # The last replica is 6x slower (noisy neighbour / throttled CPU)
+        speed = args.chars_per_second / 6 if i == args.replicas - 1 and args.replicas > 1 else args.chars_per_second
+        runners.append(await _simulator(BASE_PORT + i, speed, workers=1))
+        urls.append(f"http://127.0.0.1:{BASE_PORT + i}")
+
+    try:
+        print(f"{args.calls} concurrent calls, {args.sentences} sentences each, 1 sentence at a time per replica\n")
+        await _scenario("single", urls[:1], args, max_concurrency=args.calls)
+        await _scenario("pool", urls, args, max_concurrency=1)
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
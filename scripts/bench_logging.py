@@ -0,0 +1,154 @@
+"""Measure how long logging blocks the event loop, before and after agent/log_pipeline.py.
+
+Run: python -m scripts.bench_logging [--seconds 3] [--rate 200] [--slow-sink-ms 2]
+
+A simulated call logs what a real one does — CallLogger events for every
+utterance and tool call, the per-tool INFO line, per-turn latency lines and
+the SIP attribute dict — at --rate lines per second, while a monitor task
+measures how late its 5 ms sleeps wake up (event-loop lag, which is what
+delays audio frames). Each scenario runs with the JSON-lines handler:
+
+  sync     directly on the root logger (the old logging.basicConfig setup)
+  queued   behind configure_logging()'s queue and listener thread
+
+writing to /dev/null ("fast sink") and to a stream that takes
+--slow-sink-ms per write ("slow sink": a container log pipe under
+backpressure). Reported: time spent inside logging calls on the loop, loop
+lag percentiles, and lines written. High-volume thinning is off unless
+--rate-limit is given, so both setups write the same lines.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+from agent.config import Config
+from agent.log_pipeline import HIGH_VOLUME, JsonFormatter, configure_logging, drain_logs, logging_stats, stop_logging
+from agent.logger import CallLogger
+
+SIP_ATTRIBUTES = {
+    "sip.callingNumber": "+15555550123",
+    "sip.calledNumber": "+15555550100",
+    "sip.callID": "a84b4c76e66710@pc33.example.com",
+    "sip.trunkID": "ST_mock0001",
+    "sip.callStatus": "active",
+    "sip.ruleID": "SDR_mock0001",
+    "practice_id": "practice-mock",
+}
+TOOL_RESULT = '{"ok":true,"date":"2026-10-20","slots":["9:00–10:30 AM every 30m","1:00–4:30 PM every 30m"],"total":12}'
+
+
+class Sink:
+    """Write target counting lines, optionally slow like a blocked pipe."""
+
+    def __init__(self, delay_ms: float):
+        self.delay = delay_ms / 1000
+        self.lines = 0
+        self._null = open(os.devnull, "w")
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        self.lines += text.count("\n")
+        return self._null.write(text)
+
+    def flush(self) -> None:
+        self._null.flush()
+
+
+async def _monitor(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append((time.perf_counter() - started - 0.005) * 1000)
+
+
+async def _call(seconds: float, rate: float, on_loop: list[float]) -> None:
+    app_logger = logging.getLogger("omnira")
+    call_logger = CallLogger("bench-call", "+15555550123", "+15555550100", "practice-mock")
+    started = time.perf_counter()
+    app_logger.info("SIP participant attributes: %s", SIP_ATTRIBUTES)
+    n = 0
+    while time.perf_counter() - started < seconds:
+        t = time.perf_counter()
+        kind = n % 4
+        if kind == 0:
+            call_logger.log_caller_speech("I was hoping to get in sometime next week, ideally a morning")
+        elif kind == 1:
+            args = {"date": "next tuesday", "procedure_type": "cleaning"}
+            call_logger.log_tool_call("check_availability", args, TOOL_RESULT)
+            app_logger.info("[%s] Tool: %s(%s) → %s", "bench-call", "check_availability", args, TOOL_RESULT[:100],
+                            extra=HIGH_VOLUME)
+        elif kind == 2:
+            call_logger.log_agent_speech("Sure — I have 9 AM or 1:30 PM on Tuesday. Which works better?")
+        else:
+            logging.getLogger("omnira-latency").info("[%s] Turn %s latency: %s", "bench-call", n // 4,
+                                                     "stt 180ms · llm 420ms · tts 160ms", extra=HIGH_VOLUME)
+        on_loop.append((time.perf_counter() - t) * 1e6)
+        n += 1
+        await asyncio.sleep(1 / rate)
+
+
+async def _scenario(queued: bool, sink_ms: float, seconds: float, rate: float) -> dict:
+    root = logging.getLogger()
+    sink = Sink(sink_ms)
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(JsonFormatter())
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    if queued:
+        configure_logging()
+
+    lags: list[float] = []
+    on_loop: list[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor(lags, stop))
+    await _call(seconds, rate, on_loop)
+    stop.set()
+    await monitor
+
+    if queued:
+        await asyncio.to_thread(drain_logs, 30.0)
+        stop_logging()
+    root.removeHandler(handler)
+    lags.sort()
+    return {
+        "calls": len(on_loop),
+        "on_loop_us": statistics.mean(on_loop),
+        "on_loop_ms": sum(on_loop) / 1000,
+        "lag_p50": lags[len(lags) // 2],
+        "lag_p99": lags[int(len(lags) * 0.99)],
+        "lag_max": lags[-1],
+        "written": sink.lines,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--rate", type=float, default=200.0, help="log calls per second")
+    parser.add_argument("--slow-sink-ms", type=float, default=2.0, help="per-write delay of the slow sink")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="LOG_RATE_LIMIT for the queued runs (0 = off)")
+    args = parser.parse_args()
+    # Off by default so both setups write every line
+    Config.LOG_RATE_LIMIT = args.rate_limit
+
+    for handler in list(logging.getLogger().handlers):
+        logging.getLogger().removeHandler(handler)
+    print(f"{args.rate:.0f} log calls/s for {args.seconds:.0f}s per scenario\n")
+    print(f"{'':<20}{'µs/call':>9}{'on loop':>10}{'lag p50':>9}{'lag p99':>9}{'lag max':>9}{'written':>9}")
+    for sink_label, sink_ms in (("fast sink", 0.0), (f"slow sink {args.slow_sink_ms:g}ms", args.slow_sink_ms)):
+        for queued in (False, True):
+            r = await _scenario(queued, sink_ms, args.seconds, args.rate)
+            label = f"{'queued' if queued else 'sync'}, {sink_label}"
+            print(
+                f"{label:<20}{r['on_loop_us']:>9.1f}{r['on_loop_ms']:>8.0f}ms{r['lag_p50']:>7.2f}ms"
+                f"{r['lag_p99']:>7.2f}ms{r['lag_max']:>7.1f}ms{r['written']:>9}"
+            )
+    print(f"\nPipeline: {logging_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+"""Benchmark the TTS phrase cache: hit rate and time-to-first-audio.
+
+Run: python -m scripts.bench_phrase_cache [--calls 20] [--latency-ms 250]
+
+Run: python -m scripts.bench_phrase_cache --streaming   (websocket-style provider)
+
+Replays simulated calls through CachedTTS in front of a fake provider with a
+fixed time-to-first-byte. Each call mixes the scripted lines from the system
+prompt (fillers, transitions, goodbyes) with one-off sentences (names, dates).
+As in production every call gets a fresh PhraseCache — a new job process
+with an empty memory LRU — on the same directory, so hits come from the
+shared disk store. With --streaming the provider only streams and each call's
+reply goes through CachedTTS.stream().
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+
+from livekit.agents import utils
+from livekit.agents.tts import TTS, TTSCapabilities, ChunkedStream, SynthesizeStream, AudioEmitter
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+
+from tts.phrase_cache import CachedTTS, PhraseCache
+
+SAMPLE_RATE = 24000
+
+SCRIPTED = [
+    "Let me take a quick peek at our schedule for you...",
+    "Perfect, let me get that locked in for you...",
+    "One sec, let me pull that up...",
+    "Great question!",
+    "Is there anything else I can help you with today?",
+    "We're looking forward to seeing you! Have a great rest of your day.",
+    "Thanks for calling, take care!",
+]
+NAMES = ["Sarah", "Michael", "Priya", "James", "Elena", "Tom", "Aisha", "Daniel"]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+
+class _FakeStream(ChunkedStream):
+    async def _run(self, output_emitter: AudioEmitter) -> None:
+        tts: FakeTTS = self._tts  # type: ignore[assignment]
+        output_emitter.initialize(
+            request_id=utils.shortuuid(), sample_rate=SAMPLE_RATE, num_channels=1, mime_type="audio/pcm"
+        )
+        await asyncio.sleep(tts.latency)
+        samples = int(max(0.5, len(self._input_text) / 15) * SAMPLE_RATE)
+        output_emitter.push(b"\x01\x00" * samples)
+        output_emitter.flush()
+        tts.requests += 1
+
+
+class _FakeSynthesizeStream(SynthesizeStream):
+    async def _run(self, output_emitter: AudioEmitter) -> None:
+        tts: FakeTTS = self._tts  # type: ignore[assignment]
+        output_emitter.initialize(
+            request_id=utils.shortuuid(), sample_rate=SAMPLE_RATE, num_channels=1, mime_type="audio/pcm", stream=True
+        )
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+        text = ""
+        async for data in self._input_ch:
+            if isinstance(data, str):
+                text += data
+        self._mark_started()
+        await asyncio.sleep(tts.latency)
+        samples = int(max(0.5, len(text) / 15) * SAMPLE_RATE)
+        output_emitter.push(b"\x01\x00" * samples)
+        output_emitter.flush()
+        tts.requests += 1
+
+
+class FakeTTS(TTS):
+    def __init__(self, latency: float, streaming: bool = False):
+        super().__init__(capabilities=TTSCapabilities(streaming=streaming), sample_rate=SAMPLE_RATE, num_channels=1)
+        self.latency = latency
+        self.requests = 0
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS):
+        return _FakeStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS):
+        return _FakeSynthesizeStream(tts=self, conn_options=conn_options)
+
+
+def call_script(rng: random.Random) -> list[str]:
+    name = rng.choice(NAMES)
+    return [
+        f"Hi {name}, thanks so much for calling!",
+        rng.choice(SCRIPTED[:3]),
+        f"I've got a {rng.randint(8, 16)}:00 on {rng.choice(DAYS)} — does that work?",
+        rng.choice(SCRIPTED[:3]),
+        SCRIPTED[3],
+        SCRIPTED[4],
+        rng.choice(SCRIPTED[5:]),
+    ]
+
+
+async def _time_to_first_frame(tts: TTS, text: str, streaming: bool) -> float:
+    started = time.perf_counter()
+    first = None
+    if streaming:
+        stream = tts.stream()
+        stream.push_text(text)
+        stream.end_input()
+    else:
+        stream = tts.synthesize(text)
+    async with stream:
+        async for _ in stream:
+            if first is None:
+                first = time.perf_counter() - started
+    return (first or 0.0) * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=250.0, help="fake provider time-to-first-byte")
+    parser.add_argument("--streaming", action="store_true", help="fake a streaming (websocket) provider")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as directory:
+        provider = FakeTTS(args.latency_ms / 1000, streaming=args.streaming)
+        hit_ms: list[float] = []
+        miss_ms: list[float] = []
+        hits = lookups = disk_writes = 0
+
+        for call in range(args.calls):
+            # One job process per call: empty memory, shared directory
+            cache = PhraseCache(directory)
+            tts = CachedTTS(provider, cache=cache, voice="bench", provider="fake")
+            for sentence in call_script(rng):
+                hits_before = tts.stats["hits"]
+                ms = await _time_to_first_frame(tts, sentence, args.streaming)
+                (hit_ms if tts.stats["hits"] > hits_before else miss_ms).append(ms)
+            await asyncio.gather(*tts._stores)  # the background disk writes
+            hits += tts.stats["hits"]
+            lookups += tts.stats["hits"] + tts.stats["misses"]
+            disk_writes += cache.stats["disk_writes"]
+            if call in (0, 1, 2, args.calls - 1):
+                print(f"call {call + 1:>3}: {tts.stats['hits']} hits / {tts.stats['misses']} misses ({tts.hit_rate():.0%})")
+
+        print(f"\nAll calls: {hits}/{lookups} hits ({hits / lookups:.0%}), {disk_writes} phrases written to disk")
+        print(f"Provider requests: {provider.requests} for {args.calls * 7} sentences")
+        print(
+            f"Time to first frame: hit p50 {statistics.median(hit_ms):.1f}ms | "
+            f"miss p50 {statistics.median(miss_ms):.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
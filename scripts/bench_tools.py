@@ -0,0 +1,178 @@
+"""Benchmark the tool layer against the local platform stand-in.
+
+Run: python -m scripts.bench_tools [--calls 40] [--concurrency 10] [--latency 80:300] [--error-rate 0.02]
+     python -m scripts.bench_tools --url http://127.0.0.1:8787/api   # an already running scripts.mock_platform
+
+Each simulated call walks a booking conversation through the real tool
+functions (agent/tools.py), PracticeConfig's config fetch and
+CallLogger.send_to_omnira: config → lookup → availability for a day and a
+range → verify → benefits + copay in parallel → book → SMS → post-call
+webhook. --concurrency calls run at once; reported are per-step round-trip
+percentiles, tool calls per second, and what the resilience and batching
+layers did.
+
+All simulated calls share this process (one HTTP pool, one current_call),
+whereas production runs one call per job process: the numbers show platform
+load and tool-layer overhead, not per-process pool behavior. The per-call
+read cache, prefetch and slot engine are off so every step reaches the
+platform. Queued sends and post-call records are spooled in a temporary
+CACHE_DIR that is drained and removed before exiting.
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+os.environ.setdefault("OMNIRA_API_KEY", "bench")
+
+from agent.config import Config, PracticeConfig  # noqa: E402
+from agent.call_context import current_call  # noqa: E402
+from agent.http_client import pool_stats, warm  # noqa: E402
+from agent.logger import CallLogger, post_call_stats, probe_post_call_webhook  # noqa: E402
+from agent import tools  # noqa: E402
+from agent.outbox import get_outbox, get_post_call_spool  # noqa: E402
+from scripts.mock_platform import add_platform_args, platform_from_args  # noqa: E402
+
+NAMES = ["Sarah Jones", "Michael Brown", "Priya Patel", "James Lee", "Elena Garcia", "Tom Nguyen"]
+PROCEDURES = ["general", "cleaning", "consultation"]
+
+
+def _context():
+    return SimpleNamespace(function_call=SimpleNamespace(call_id=f"bench-{uuid.uuid4().hex[:10]}"))
+
+
+def _tool(tool):
+    """The plain coroutine behind a @function_tool."""
+    return getattr(tool, "_func", tool)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+async def _timed(timings: dict, name: str, coro) -> None:
+    started = time.perf_counter()
+    await coro
+    timings[name].append((time.perf_counter() - started) * 1000)
+
+
+async def simulated_call(n: int, rng: random.Random, timings: dict, think: float) -> None:
+    name = rng.choice(NAMES)
+    first, last = name.split()
+    procedure = rng.choice(PROCEDURES)
+    day = date.today() + timedelta(days=rng.randint(1, 10))
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+
+    turns = [
+        [("practice_config", PracticeConfig._fetch_remote({"practice_id": "practice-mock"}))],
+        [("lookup_patient", _tool(tools.lookup_patient)(_context(), name=name))],
+        [("check_availability", _tool(tools.check_availability)(_context(), day.isoformat(), procedure))],
+        [("check_availability_range", _tool(tools.check_availability)(
+            _context(), day.isoformat(), procedure, end_date=(day + timedelta(days=4)).isoformat()
+        ))],
+        [("verify_caller", _tool(tools.verify_caller)(_context(), first, last, "1988-04-12", last4_ssn="1234"))],
+        # The LLM often asks for both in one turn
+        [
+            ("check_benefits", _tool(tools.check_benefits)(_context())),
+            ("estimate_copay", _tool(tools.estimate_copay)(_context(), "crown")),
+        ],
+        [("book_appointment", _tool(tools.book_appointment)(
+            _context(), name, day.isoformat(), f"{rng.randint(8, 16)}:00", procedure,
+            patient_phone="+15555550123", provider_id=f"prov-{rng.randint(1, 3)}",
+        ))],
+        [("send_sms", _tool(tools.send_sms)(_context(), "+15555550123", f"Hi {first}, see you {day:%A} (ref {n}) — Bright Smile Dental"))],
+    ]
+    for turn in turns:
+        await asyncio.gather(*(_timed(timings, step, coro) for step, coro in turn))
+        if think:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * think)
+
+    call_logger = CallLogger(f"bench-{n}", "+15555550123", "+15555550100", "practice-mock")
+    for i in range(12):
+        call_logger.log_caller_speech(f"caller line {i} " * 4)
+        call_logger.log_agent_speech(f"agent line {i} " * 6)
+    await _timed(timings, "post_call", call_logger.send_to_omnira())
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=10, help="simulated calls in flight at once")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean caller pause between turns")
+    parser.add_argument("--url", default="", help="use a running platform stand-in instead of starting one")
+    add_platform_args(parser)
+    args = parser.parse_args()
+
+    platform = None
+    if args.url:
+        Config.OMNIRA_API_URL = args.url
+    else:
+        platform = platform_from_args(args)
+        Config.OMNIRA_API_URL = await platform.start()
+    cache_dir = tempfile.mkdtemp(prefix="omnira-bench-")
+    Config.CACHE_DIR = cache_dir
+    current_call.practice_id = "practice-mock"
+    current_call.call_id = "bench"
+    outbox = get_outbox(cache_dir) if Config.OUTBOX else None
+    if outbox is not None:
+        outbox.start(tools.deliver_queued_action)
+    await warm()
+    await probe_post_call_webhook()
+
+    rng = random.Random(args.seed)
+    timings: dict[str, list[float]] = defaultdict(list)
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def one(n: int) -> None:
+        async with gate:
+            await simulated_call(n, random.Random(rng.random()), timings, args.think_ms / 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(args.calls)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.calls} calls, {args.concurrency} concurrent, {elapsed:.1f}s wall\n")
+    print(f"{'step':<26}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for step, values in timings.items():
+        print(
+            f"{step:<26}{len(values):>6}{statistics.median(values):>9.1f}{_percentile(values, 0.95):>9.1f}"
+            f"{_percentile(values, 0.99):>9.1f}{max(values):>9.1f}"
+        )
+    steps = sum(len(v) for v in timings.values())
+    print(f"\nThroughput: {steps / elapsed:.1f} steps/s, {args.calls / elapsed:.2f} calls/s")
+
+    if outbox is not None:
+        pending = await outbox.drain(10.0)
+        await outbox.aclose()
+        print(f"Outbox: {outbox.report()} ({pending} left pending)")
+    if Config.POST_CALL_SPOOL:
+        spool = get_post_call_spool(cache_dir)
+        pending = await spool.drain(10.0)
+        await spool.aclose()
+        print(f"Post-call spool: {spool.report()} ({pending} left pending)")
+    print(f"Post-call wire: {post_call_stats()}")
+    print(f"Batching: {tools.batching_stats()}")
+    for action, health in tools.action_health().items():
+        print(f"  {action:<26} {health}")
+    print(f"HTTP pool: {pool_stats()}")
+    if platform is not None:
+        print(f"Platform: {platform.stats['requests']} requests, {platform.stats['batches']} batches, "
+              f"{platform.stats['errors']} errors, {platform.stats['stalls']} stalls, "
+              f"{platform.stats['duplicates']} duplicate sends, {len(platform.webhooks)} webhooks "
+              f"({platform.stats['compact_records']} compact, {platform.stats['webhook_bytes'] / 1024:.1f} KB received)")
+        await platform.stop()
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,552 @@
+"""Local stand-in for the Omnira platform API, for load tests and benchmarks.
+
+Run: python -m scripts.mock_platform [--port 8787] [--latency 80:300] [--error-rate 0.02]
+Then point the agent (or scripts.bench_tools) at it:
+    OMNIRA_API_URL=http://127.0.0.1:8787/api
+
+Serves what the voice engine calls, with canned but plausible bodies:
+
+  POST /api/voice-engine/actions         every action in agent/tools.py plus
+                                         start_call_session and
+                                         get_schedule_snapshot; batched
+                                         {"actions": [...]} bodies too
+  HEAD /api/voice-engine/actions         connection warm-up
+  GET  /api/voice-engine/practice-config
+  HEAD /api/webhooks/voice-engine        payload format negotiation
+  POST /api/webhooks/voice-engine/deltas event deltas streamed during a call
+  POST /api/webhooks/voice-engine        post-call payloads, single or
+                                         batched {"calls": [...]}, plain or
+                                         compact omnira-call/2, optionally
+                                         gzip/zstd encoded
+  GET  /api/_mock/stats                  request counts, duplicates, webhooks
+
+Latency is lognormal, given as "p50:p95" milliseconds (or one fixed number),
+with per-action overrides (--action-latency check_benefits=900:3000).
+--error-rate answers 503, --stall-rate holds a request for --stall-seconds
+(past every budget), and --slots-per-day / --extra-fields size the bodies.
+Batching is advertised with X-Omnira-Actions-Batch and
+X-Omnira-Webhook-Batch unless --batch-limit 0; the compact post-call format
+and Accept-Encoding with X-Omnira-Payload-Formats, and event deltas with
+X-Omnira-Webhook-Deltas, unless --plain-webhook.
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from aiohttp import web
+
+try:
+    from aiohttp.compression_utils import HAS_ZSTD
+except ImportError:
+    HAS_ZSTD = False
+
+BATCH_HEADER = "X-Omnira-Actions-Batch"
+WEBHOOK_BATCH_HEADER = "X-Omnira-Webhook-Batch"
+FORMATS_HEADER = "X-Omnira-Payload-Formats"
+FORMAT_HEADER = "X-Omnira-Payload-Format"
+DELTAS_HEADER = "X-Omnira-Webhook-Deltas"
+COMPACT_FORMAT = "omnira-call/2"
+
+PROVIDERS = [
+    {"id": "prov-1", "name": "Dr. Sarah Chen"},
+    {"id": "prov-2", "name": "Dr. Marcus Webb"},
+    {"id": "prov-3", "name": "Jamie Ortiz, RDH"},
+]
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday"]
+OPERATING_HOURS = [
+    {"day": day, "open": "08:00", "close": "17:00", "lunch_start": "12:00", "lunch_end": "13:00"} for day in WEEKDAYS
+]
+PROCEDURES = [
+    {"type": "general", "duration_minutes": 30},
+    {"type": "cleaning", "duration_minutes": 60, "provider_ids": ["prov-3"]},
+    {"type": "consultation", "duration_minutes": 30},
+    {"type": "emergency", "duration_minutes": 30, "urgent": True},
+]
+# Half-hour starts from 8:00 to 16:30, minus lunch
+DAY_TIMES = [m for m in range(8 * 60, 17 * 60, 30) if not 12 * 60 <= m < 13 * 60]
+
+
+def _clock(minutes: int) -> str:
+    hour, minute = divmod(minutes, 60)
+    return f"{hour % 12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+@dataclass
+class Latency:
+    """Lognormal latency from its median and 95th percentile (milliseconds)."""
+
+    p50_ms: float
+    p95_ms: float
+
+    @classmethod
+    def parse(cls, text: str) -> "Latency":
+        p50, _, p95 = text.partition(":")
+        return cls(float(p50), float(p95 or p50))
+
+    def sample(self, rng: random.Random) -> float:
+        """One latency in seconds."""
+        if self.p95_ms <= self.p50_ms or self.p50_ms <= 0:
+            return max(0.0, self.p50_ms) / 1000
+        sigma = (math.log(self.p95_ms) - math.log(self.p50_ms)) / 1.645
+        return rng.lognormvariate(math.log(self.p50_ms), sigma) / 1000
+
+
+class MockPlatform:
+    def __init__(
+        self,
+        *,
+        latency: Latency = Latency(60, 250),
+        action_latency: dict[str, Latency] | None = None,
+        error_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_seconds: float = 20.0,
+        slots_per_day: int = 10,
+        extra_fields: int = 0,
+        batch_limit: int = 8,
+        compact_webhook: bool = True,
+        seed: int = 7,
+    ):
+        self.latency = latency
+        self.action_latency = action_latency or {}
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.slots_per_day = slots_per_day
+        self.extra_fields = extra_fields
+        self.batch_limit = batch_limit
+        self.compact_webhook = compact_webhook
+        self.rng = random.Random(seed)
+        self.booked: set[tuple[str, str, str]] = set()
+        self.idempotency_keys: set[str] = set()
+        self.webhooks: list[dict] = []
+        # call_id -> events streamed so far, by position
+        self.streamed: dict[str, list[dict]] = {}
+        self.stats = {"requests": 0, "batches": 0, "errors": 0, "stalls": 0, "duplicates": 0,
+                      "webhook_bytes": 0, "compact_records": 0,
+                      "deltas": 0, "duplicate_deltas": 0, "actions": Counter()}
+        self._runner: web.AppRunner | None = None
+
+    # ── server ───────────────────────────────────────────────────────────
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=32 * 1024 * 1024)
+        app.router.add_post("/api/voice-engine/actions", self._actions)
+        app.router.add_head("/api/voice-engine/actions", self._head)
+        app.router.add_get("/api/voice-engine/practice-config", self._practice_config)
+        app.router.add_head("/api/webhooks/voice-engine", self._webhook_head)
+        app.router.add_post("/api/webhooks/voice-engine", self._webhook)
+        app.router.add_post("/api/webhooks/voice-engine/deltas", self._delta)
+        app.router.add_get("/api/_mock/stats", self._stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve in the running loop; returns the base URL for OMNIRA_API_URL."""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound = site._server.sockets[0].getsockname()[1]  # the real port when port=0
+        return f"http://{host}:{bound}/api"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _headers(self) -> dict:
+        return {BATCH_HEADER: str(self.batch_limit)} if self.batch_limit > 0 else {}
+
+    async def _delay(self, *actions: str) -> int | None:
+        """Sleep like the platform would; returns an error status to answer with, if any.
+
+        Errors and stalls are per HTTP request, and a batch takes as long as
+        its slowest action.
+        """
+        if self.stall_rate and self.rng.random() < self.stall_rate:
+            self.stats["stalls"] += 1
+            await asyncio.sleep(self.stall_seconds)
+        await asyncio.sleep(max(self.action_latency.get(a, self.latency).sample(self.rng) for a in actions))
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return 503
+        return None
+
+    async def _head(self, request: web.Request) -> web.Response:
+        return web.Response(headers=self._headers())
+
+    async def _actions(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.stats["requests"] += 1
+        if "actions" in body:
+            self.stats["batches"] += 1
+            actions = body["actions"]
+            if self.batch_limit <= 0:
+                return web.json_response({"error": "batching not supported"}, status=501)
+            if not 0 < len(actions) <= self.batch_limit:
+                return web.json_response({"error": "batch not accepted"}, status=400)
+            error = await self._delay(*(a.get("action", "") for a in actions))
+            if error:
+                return web.json_response({"error": "upstream unavailable"}, status=error, headers=self._headers())
+            return web.json_response({"results": [self._answer(a)[1] for a in actions]}, headers=self._headers())
+        error = await self._delay(body.get("action", ""))
+        if error:
+            return web.json_response({"error": "upstream unavailable"}, status=error, headers=self._headers())
+        status, data = self._answer(body)
+        return web.json_response(data, status=status, headers=self._headers())
+
+    async def _practice_config(self, request: web.Request) -> web.Response:
+        self.stats["requests"] += 1
+        if await self._delay("practice_config"):
+            return web.json_response({"error": "upstream unavailable"}, status=503)
+        practice_id = request.query.get("practice_id") or "practice-mock"
+        return web.json_response(self._padded({
+            "practice_id": practice_id,
+            "practice_name": "Bright Smile Dental",
+            "practice_phone": "+15555550100",
+            "practice_timezone": "America/New_York",
+            "practice_hours": "Mon-Fri 8am-5pm",
+            "practice_address": "100 Main St, Springfield",
+            "agent_name": "Ava",
+            "operating_hours": OPERATING_HOURS,
+            "providers": PROVIDERS,
+            "services": [p["type"] for p in PROCEDURES],
+            "knowledge_base": "We accept most PPO plans. Parking is free behind the building.",
+        }))
+
+    def _webhook_headers(self) -> dict:
+        headers = {WEBHOOK_BATCH_HEADER: str(self.batch_limit)} if self.batch_limit > 0 else {}
+        if self.compact_webhook:
+            headers[FORMATS_HEADER] = f"omnira-call/1, {COMPACT_FORMAT}"
+            headers["Accept-Encoding"] = "zstd, gzip" if HAS_ZSTD else "gzip"
+            headers[DELTAS_HEADER] = "1"
+        return headers
+
+    async def _webhook_head(self, request: web.Request) -> web.Response:
+        return web.Response(headers=self._webhook_headers())
+
+    async def _webhook(self, request: web.Request) -> web.Response:
+        compact = COMPACT_FORMAT in request.headers.get(FORMAT_HEADER, "")
+        encoded = "Content-Encoding" in request.headers
+        if (compact or encoded) and not self.compact_webhook:
+            return web.json_response({"error": "unsupported payload"}, status=415)
+        self.stats["webhook_bytes"] += request.content_length or 0
+        body = await request.json()  # aiohttp undoes the Content-Encoding
+        self.stats["requests"] += 1
+        headers = self._webhook_headers()
+        calls = body.get("calls")
+        if calls is not None:
+            self.stats["batches"] += 1
+            if not 0 < len(calls) <= max(self.batch_limit, 0):
+                return web.json_response({"error": "batch not accepted"}, status=400)
+        if await self._delay("post_call"):
+            return web.json_response({"error": "upstream unavailable"}, status=503, headers=headers)
+        results = [self._record_call(call) for call in (calls if calls is not None else [body])]
+        if calls is not None:
+            return web.json_response({"results": results}, headers=headers)
+        return web.json_response(results[0], headers=headers)
+
+    async def _delta(self, request: web.Request) -> web.Response:
+        if not self.compact_webhook:
+            return web.json_response({"error": "not found"}, status=404)
+        self.stats["webhook_bytes"] += request.content_length or 0
+        body = await request.json()
+        self.stats["requests"] += 1
+        if await self._delay("transcript_delta"):
+            return web.json_response({"error": "upstream unavailable"}, status=503)
+        events = self._expand_events(body["started_at"], body.get("events", []))
+        streamed = self.streamed.setdefault(body["call_id"], [])
+        offset = body["offset"]
+        if offset + len(events) <= len(streamed):
+            self.stats["duplicate_deltas"] += 1
+        else:
+            self.stats["deltas"] += 1
+        streamed[offset:offset + len(events)] = events
+        return web.json_response({"success": True, "seq": body["seq"]}, headers=self._webhook_headers())
+
+    @staticmethod
+    def _expand_events(started_at: str, events: list[list]) -> list[dict]:
+        """omnira-call/2 events back to {"timestamp", "type", ...} dicts."""
+        base = datetime.fromisoformat(started_at)
+        expanded = []
+        for offset, kind, *data in events:
+            at = base + timedelta(milliseconds=offset or 0)
+            expanded.append({"timestamp": at.isoformat(), "type": kind, **(data[0] if data else {})})
+        return expanded
+
+    def _expand(self, call: dict) -> dict:
+        """Rebuild the full record (timestamps, transcript, tool_calls) from
+        omnira-call/2 and any events streamed during the call."""
+        call = dict(call)
+        if call.pop("format", None) == COMPACT_FORMAT:
+            self.stats["compact_records"] += 1
+            call["events"] = self._expand_events(call["started_at"], call.get("events", []))
+        offset = call.pop("events_offset", 0)
+        if offset:
+            call["events"] = self.streamed.pop(call["call_id"], [])[:offset] + call.get("events", [])
+        transcript, tool_calls = [], []
+        for event in call["events"]:
+            if event["type"] == "caller_speech":
+                transcript.append(f"Caller: {event.get('text', '')}")
+            elif event["type"] == "agent_speech":
+                transcript.append(f"Agent: {event.get('text', '')}")
+            elif event["type"] == "tool_call":
+                transcript.append(f"[Tool: {event.get('tool', '')}]")
+                tool_calls.append({k: v for k, v in event.items() if k not in ("timestamp", "type")})
+        call.update(transcript="\n".join(transcript), tool_calls=tool_calls)
+        return call
+
+    def _record_call(self, call: dict) -> dict:
+        key = call.get("idempotency_key")
+        if key:
+            if key in self.idempotency_keys:
+                self.stats["duplicates"] += 1
+                return {"success": True, "duplicate": True}
+            self.idempotency_keys.add(key)
+        if call.get("format") == COMPACT_FORMAT or call.get("events_offset"):
+            call = self._expand(call)
+        self.webhooks.append(call)
+        return {"success": True}
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response({**self.stats, "actions": dict(self.stats["actions"]), "webhooks": len(self.webhooks)})
+
+    # ── action bodies ────────────────────────────────────────────────────
+
+    def _padded(self, data: dict) -> dict:
+        """Add the kind of fields a real response carries that the agent doesn't need."""
+        for i in range(self.extra_fields):
+            data[f"meta_{i}"] = uuid.uuid4().hex
+        return data
+
+    def _answer(self, body: dict) -> tuple[int, dict]:
+        action = body.get("action", "")
+        params = body.get("params") or {}
+        self.stats["actions"][action] += 1
+        handler = getattr(self, f"_do_{action}", None)
+        if handler is None:
+            return 400, {"success": False, "error": f"Unknown action: {action}"}
+        key = body.get("idempotency_key")
+        if key:
+            if key in self.idempotency_keys:
+                self.stats["duplicates"] += 1
+                return 200, {"success": True, "duplicate": True}
+            self.idempotency_keys.add(key)
+        return 200, self._padded(handler(params))
+
+    def _slots(self, day: str) -> list[dict]:
+        rng = random.Random(f"{day}")
+        slots = []
+        for provider in PROVIDERS:
+            times = sorted(rng.sample(DAY_TIMES, min(self.slots_per_day, len(DAY_TIMES))))
+            for minutes in times:
+                if (provider["id"], day, _clock(minutes)) not in self.booked:
+                    slots.append({
+                        "date": day,
+                        "time": _clock(minutes),
+                        "provider": provider["name"],
+                        "provider_id": provider["id"],
+                        "operatory_id": f"op-{rng.randint(1, 4)}",
+                        "duration_minutes": 30,
+                    })
+        return slots
+
+    def _do_start_call_session(self, params: dict) -> dict:
+        recognized = self.rng.random() < 0.5
+        return {
+            "success": True,
+            "call_session_id": f"cs-{uuid.uuid4().hex[:12]}",
+            "recognized": recognized,
+            "greeting_name": "Sarah" if recognized else "",
+            "recent_call": {"topic": "cleaning"} if recognized else None,
+        }
+
+    def _do_lookup_patient(self, params: dict) -> dict:
+        name = (params.get("name") or "Sarah Jones").split()
+        return {
+            "success": True,
+            "found": True,
+            "patients": [{
+                "id": f"pat-{uuid.uuid4().hex[:8]}",
+                "first_name": name[0],
+                "last_name_initial": (name[-1][:1] if len(name) > 1 else "J"),
+                "phone_hint": "4821",
+                "status": "active",
+            }],
+        }
+
+    def _do_check_availability(self, params: dict) -> dict:
+        day = str(params.get("date", ""))
+        try:
+            weekday = date.fromisoformat(day).weekday()
+        except ValueError:
+            return {"success": True, "available_slots": [], "date": day, "total_available": 0}
+        slots = self._slots(day) if weekday < 5 else []
+        return {"success": True, "available_slots": slots, "date": day, "total_available": len(slots)}
+
+    def _do_get_schedule_snapshot(self, params: dict) -> dict:
+        start = date.fromisoformat(params.get("start_date") or date.today().isoformat())
+        booked = []
+        for d in range(int(params.get("days", 14))):
+            day = (start + timedelta(days=d)).isoformat()
+            free = {(s["provider_id"], s["time"]) for s in self._slots(day)}
+            for provider in PROVIDERS:
+                for minutes in DAY_TIMES:
+                    if (provider["id"], _clock(minutes)) not in free:
+                        end = minutes + 30
+                        booked.append({
+                            "provider_id": provider["id"],
+                            "date": day,
+                            "start": f"{minutes // 60:02d}:{minutes % 60:02d}",
+                            "end": f"{end // 60:02d}:{end % 60:02d}",
+                        })
+        return {
+            "success": True,
+            "providers": PROVIDERS,
+            "operating_hours": OPERATING_HOURS,
+            "procedures": PROCEDURES,
+            "booked": booked,
+        }
+
+    def _do_book_appointment(self, params: dict) -> dict:
+        provider_id = params.get("provider_id") or PROVIDERS[0]["id"]
+        slot = (provider_id, str(params.get("date")), str(params.get("time")))
+        if slot in self.booked:
+            return {"success": False, "error": "That time was just taken."}
+        self.booked.add(slot)
+        return {
+            "success": True,
+            "appointment_id": f"apt-{uuid.uuid4().hex[:8]}",
+            "patient_id": f"pat-{uuid.uuid4().hex[:8]}",
+            "provider_id": provider_id,
+            "message": f"Appointment booked for {params.get('patient_name')} on {slot[1]} at {slot[2]}.",
+        }
+
+    def _do_send_sms(self, params: dict) -> dict:
+        return {"success": True, "sid": f"SM{uuid.uuid4().hex}"}
+
+    def _do_send_confirmation_email(self, params: dict) -> dict:
+        return {"success": True, "email_id": uuid.uuid4().hex}
+
+    def _do_log_message(self, params: dict) -> dict:
+        return {"success": True, "message_id": uuid.uuid4().hex}
+
+    def _do_verify_caller(self, params: dict) -> dict:
+        strong = any(params.get(k) for k in ("last4_ssn", "zip", "email", "chart_number"))
+        return {"success": True, "verified": True, "tier": 2 if strong else 1, "locked": False, "attempts_remaining": 3}
+
+    def _do_send_verification_code(self, params: dict) -> dict:
+        return {"success": True, "sent": True, "email_hint": "s•••@gmail.com"}
+
+    def _do_confirm_verification_code(self, params: dict) -> dict:
+        ok = str(params.get("code", "")) == "123456"
+        return {"success": True, "verified": ok, "tier": 2 if ok else 1}
+
+    def _do_get_my_appointments(self, params: dict) -> dict:
+        day = (date.today() + timedelta(days=9)).isoformat()
+        return {
+            "success": True,
+            "appointments": [{
+                "appointment_id": f"apt-{uuid.uuid4().hex[:8]}",
+                "date": day,
+                "time": "10:00 AM",
+                "provider": PROVIDERS[0]["name"],
+                "procedure": "cleaning",
+                "created_at": "2026-01-05T15:00:00Z",
+            }],
+        }
+
+    def _do_get_account_snapshot(self, params: dict) -> dict:
+        return {
+            "success": True,
+            "balance": 125.4,
+            "last_visit": (date.today() - timedelta(days=180)).isoformat(),
+            "next_appointment": None,
+            "insurance_plan": "Delta Dental PPO",
+            "updated_at": "2026-01-05T15:00:00Z",
+        }
+
+    def _do_check_benefits(self, params: dict) -> dict:
+        return {
+            "success": True,
+            "source": "live" if params.get("refresh") else "cached",
+            "as_of": date.today().isoformat(),
+            "plan_status": "active",
+            "annual_maximum_remaining": 1150.0,
+            "deductible_remaining": 0.0,
+            "coverage": {"preventive": 100, "basic": 80, "major": 50},
+        }
+
+    def _do_estimate_copay(self, params: dict) -> dict:
+        procedure = str(params.get("procedure", ""))
+        if not procedure:
+            return {"success": True, "needs_clarification": True}
+        return {"success": True, "procedure": procedure, "estimate_low": 180.0, "estimate_high": 260.0, "is_estimate": True}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    add_platform_args(parser)
+    return parser.parse_args(argv)
+
+
+def add_platform_args(parser: argparse.ArgumentParser) -> None:
+    """The knobs shared with scripts.bench_tools."""
+    parser.add_argument("--latency", default="60:250", help="p50:p95 milliseconds (or one fixed value)")
+    parser.add_argument("--action-latency", action="append", default=[], metavar="ACTION=P50:P95")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered 503")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction held for --stall-seconds")
+    parser.add_argument("--stall-seconds", type=float, default=20.0)
+    parser.add_argument("--slots-per-day", type=int, default=10, help="open slots per provider per day")
+    parser.add_argument("--extra-fields", type=int, default=0, help="unused fields added to every body")
+    parser.add_argument("--batch-limit", type=int, default=8, help="advertised batch size (0 = no batching)")
+    parser.add_argument("--plain-webhook", action="store_true", help="refuse compact / compressed post-call bodies")
+    parser.add_argument("--seed", type=int, default=7)
+
+
+def platform_from_args(args: argparse.Namespace) -> MockPlatform:
+    overrides = {}
+    for item in args.action_latency:
+        action, _, spec = item.partition("=")
+        overrides[action] = Latency.parse(spec)
+    return MockPlatform(
+        latency=Latency.parse(args.latency),
+        action_latency=overrides,
+        error_rate=args.error_rate,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        slots_per_day=args.slots_per_day,
+        extra_fields=args.extra_fields,
+        batch_limit=args.batch_limit,
+        compact_webhook=not args.plain_webhook,
+        seed=args.seed,
+    )
+
+
+async def main() -> None:
+    args = parse_args()
+    platform = platform_from_args(args)
+    url = await platform.start(args.host, args.port)
+    print(f"Mock Omnira platform at {url} — set OMNIRA_API_URL={url}")
+    started = time.monotonic()
+    try:
+        while True:
+            await asyncio.sleep(30)
+            actions = dict(platform.stats["actions"])
+            print(f"[{time.monotonic() - started:.0f}s] {platform.stats['requests']} requests, {actions}")
+    finally:
+        await platform.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,70 @@
+"""Smoke test: date resolution must not invent closed days.
+
+check_availability drops the days the practice is closed and moves a
+request that lands only on closed days to the next open one. When the
+practice_hours text can't be read in full nothing may be dropped — telling
+a caller "we're closed Saturday" for an office open Saturdays loses the
+booking.
+
+Run: python -m scripts.test_dates   (also run in the Docker build)
+"""
+import sys
+from datetime import date, datetime
+
+from agent.config import PracticeConfig
+from agent.dates import open_weekdays, resolve_dates
+
+WEEK = set(range(7))
+
+HOURS = [
+    ("Mon-Fri 8am-5pm", {0, 1, 2, 3, 4}),
+    ("Weekdays 8-5, Saturdays 9-1", {0, 1, 2, 3, 4, 5}),
+    ("8am-5pm daily", WEEK),
+    ("Open 7 days a week", WEEK),
+    ("Monday through Friday 8:00-17:00, Sun closed", {0, 1, 2, 3, 4}),
+    ("Mon-Sat 8-6, closed Sunday", {0, 1, 2, 3, 4, 5}),
+    ("M-F 8-5", None),
+    ("By appointment only", None),
+]
+
+MONDAY = datetime(2026, 10, 19, 9, 0)
+
+
+def _check_tomorrow() -> None:
+    """Friday 2026-10-23 → Saturday stays Saturday when the hours say Saturdays."""
+    friday = MONDAY.replace(day=23)
+    for text in ("Weekdays 8-5, Saturdays 9-1", "Open 7 days a week", "alternate Saturdays 9-1"):
+        resolved = resolve_dates("tomorrow", PracticeConfig(practice_hours=text), now=friday)
+        assert resolved is not None, text
+        assert resolved.dates == [date(2026, 10, 24)] and not resolved.closed and not resolved.moved, (text, resolved)
+    resolved = resolve_dates("tomorrow", PracticeConfig(practice_hours="Weekdays 8-5, Saturdays 9-1"), now=MONDAY)
+    assert resolved is not None and resolved.dates == [date(2026, 10, 20)] and not resolved.moved, resolved
+    resolved = resolve_dates("tomorrow", PracticeConfig(practice_hours="Mon-Fri 8am-5pm"), now=friday)
+    assert resolved is not None and resolved.moved and resolved.dates == [date(2026, 10, 26)], resolved
+
+
+def main() -> int:
+    failures = 0
+    for text, expected in HOURS:
+        got = open_weekdays(PracticeConfig(practice_hours=text))
+        if got == expected:
+            print(f"OK   {text!r} -> {sorted(got) if got is not None else None}")
+        else:
+            failures += 1
+            print(f"FAIL {text!r}: expected {expected}, got {got}")
+    try:
+        _check_tomorrow()
+        print("OK   'tomorrow' lands on an open day")
+    except AssertionError as e:
+        failures += 1
+        print(f"FAIL tomorrow: {e}")
+
+    if failures:
+        print(f"\n{failures} date check(s) FAILED — do not deploy.")
+        return 1
+    print("\nAll date checks passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
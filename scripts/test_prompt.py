@@ -4,12 +4,17 @@ A single unescaped {placeholder} inside the f-string in agent/prompts.py
 crashes EVERY incoming call (NameError at agent init → job crashed → the
 phone rings forever). This caught exactly that bug on 2026-07-05.
 
+It also checks that the cached (precompiled per-practice template) build is
+byte-identical to an uncached build, and that a config change recompiles.
+
 Run: python -m scripts.test_prompt   (also run in the Docker build)
 """
 import sys
+from dataclasses import replace
+from datetime import datetime
 
 from agent.config import PracticeConfig
-from agent.prompts import build_system_prompt
+from agent.prompts import build_system_prompt, prompt_cache_stats
 
 
 def main() -> int:
@@ -27,6 +32,12 @@ def main() -> int:
             providers=[{"name": "Dr. Smith", "title": "Dentist", "specialties": "General"}],
             services=["Cleaning", "Checkup"],
         ),
+        # Over KB_INLINE_MAX_CHARS: searched via tool, not inlined
+        "large_kb": PracticeConfig(
+            practice_id="test-practice-kb",
+            practice_name="Big Site Dental",
+            knowledge_base="We accept Delta Dental and most PPO plans. " * 400,
+        ),
     }
     caller_infos = {
         "anonymous": None,
@@ -41,6 +52,7 @@ def main() -> int:
     }
 
     failures = 0
+    now = datetime(2026, 7, 6, 14, 30)
     for cfg_name, cfg in configs.items():
         for ci_name, ci in caller_infos.items():
             try:
@@ -48,11 +60,33 @@ def main() -> int:
                 assert len(prompt) > 1000, "prompt suspiciously short"
                 if ci and ci.get("phone_number"):
                     assert ci["phone_number"] in prompt, "caller ID missing from prompt"
+                if cfg_name == "large_kb":
+                    assert "search_knowledge_base" in prompt, "large KB should point at the search tool"
+                    assert cfg.knowledge_base[:200] not in prompt, "large KB was inlined"
+                cached = build_system_prompt(cfg, caller_info=ci, now=now)
+                uncached = build_system_prompt(cfg, caller_info=ci, now=now, use_cache=False)
+                assert cached == uncached, "cached prompt differs from uncached build"
                 print(f"OK   config={cfg_name} caller={ci_name} len={len(prompt)}")
             except Exception as e:
                 failures += 1
                 print(f"FAIL config={cfg_name} caller={ci_name}: {type(e).__name__}: {e}")
 
+    # A config change must never be served a stale template
+    try:
+        renamed = replace(configs["populated"], practice_name="Renamed Dental")
+        prompt = build_system_prompt(renamed, now=now)
+        assert "Renamed Dental" in prompt and "Test Dental" not in prompt, "stale template after config change"
+        print("OK   config change recompiles template")
+    except Exception as e:
+        failures += 1
+        print(f"FAIL config change: {type(e).__name__}: {e}")
+
+    for practice_id, stats in prompt_cache_stats().items():
+        print(
+            f"     practice={practice_id or '-'} build={stats['build_ms']:.2f}ms "
+            f"static_chars={stats['static_chars']} hits={stats['hits']}"
+        )
+
     if failures:
         print(f"\n{failures} prompt build(s) FAILED — do not deploy.")
         return 1
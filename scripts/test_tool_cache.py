@@ -0,0 +1,83 @@
+"""Smoke test: the per-call tool cache must not serve reads a write made stale.
+
+The platform masks lookup_patient until the caller verifies, so a lookup
+cached before verify_caller / confirm_verification_code has to go back to
+the platform afterwards — serving the cached copy would keep the masked
+record for the rest of the call.
+
+Runs the real tool layer (agent/tools.py) against an in-process fake of the
+platform's /voice-engine/actions; no network.
+
+Run: python -m scripts.test_tool_cache   (also run in the Docker build)
+"""
+import asyncio
+import sys
+
+from agent import tools
+from agent.call_context import current_call
+from agent.tool_cache import ToolCache
+
+
+class FakePlatform:
+    """Answers actions like the platform's verification gate: masked until verified."""
+
+    def __init__(self):
+        self.requests: list[str] = []
+        self.verified = False
+
+    async def post_action(self, body: dict) -> dict:
+        action = body["action"]
+        self.requests.append(action)
+        if action in ("verify_caller", "confirm_verification_code"):
+            self.verified = True
+            return {"success": True, "verified": True}
+        if action == "lookup_patient":
+            if self.verified:
+                return {"success": True, "found": True, "first_name": "Sarah", "dob": "1990-04-12"}
+            return {"success": True, "found": True, "first_name": "S***", "dob": "****-**-**"}
+        return {"success": True}
+
+
+async def _check(verification: str) -> None:
+    platform = FakePlatform()
+    tools._post_action = platform.post_action
+    current_call.reset()
+    current_call.call_id = "test-call"
+    current_call.practice_id = "test-practice"
+    current_call.tool_cache = ToolCache()
+    params = {"phone_number": "+15555550123"}
+
+    masked = await tools._call_omnira_action("lookup_patient", params)
+    again = await tools._call_omnira_action("lookup_patient", params)
+    assert again == masked and platform.requests.count("lookup_patient") == 1, "repeat lookup wasn't cached"
+
+    await tools._call_omnira_action(verification, {"code": "123456"})
+    unmasked = await tools._call_omnira_action("lookup_patient", params)
+    assert platform.requests.count("lookup_patient") == 2, f"lookup after {verification} served from cache"
+    assert unmasked["first_name"] == "Sarah", f"masked record after {verification}"
+
+
+def main() -> int:
+    failures = 0
+    post_action = tools._post_action
+    try:
+        for verification in ("verify_caller", "confirm_verification_code"):
+            try:
+                asyncio.run(_check(verification))
+                print(f"OK   lookup_patient re-fetched after {verification}")
+            except Exception as e:
+                failures += 1
+                print(f"FAIL {verification}: {type(e).__name__}: {e}")
+    finally:
+        tools._post_action = post_action
+        current_call.reset()
+
+    if failures:
+        print(f"\n{failures} tool cache check(s) FAILED — do not deploy.")
+        return 1
+    print("\nAll tool cache checks passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""Load-balanced pool of kokoro-web backends.
+
+A single CPU kokoro-web container saturates once a few calls overlap, so
+KokoroTTS can be given several replicas. Each synthesis request:
+
+  - goes to the healthy backend with the fewest requests in flight
+    (ties broken by lower recent time-to-first-audio, then at random)
+  - holds one of that backend's `max_concurrency` slots for its duration;
+    when every slot is taken it waits in a bounded queue for up to
+    `queue_timeout` seconds before giving up
+
+Slots are flock()ed files under `slot_dir`, so the cap and the in-flight
+counts cover every job process on the host, not just this call. Health
+probes run in the background while a KokoroTTS is alive. A backend whose
+time-to-first-audio drifts well above its peers' is ejected for a cooldown,
+and so is one that fails several requests in a row. The last available
+backend is never ejected.
+"""
+import asyncio
+import fcntl
+import hashlib
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
+
+logger = logging.getLogger("kokoro-pool")
+
+
+class PoolSaturated(Exception):
+    """No backend slot freed up in time, or the wait queue is full."""
+
+
+class KokoroBackend:
+    """One kokoro-web replica and its slot files."""
+
+    def __init__(self, url: str, slot_dir: str, max_concurrency: int):
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.healthy = True
+        self.ejected_until = 0.0
+        self.ewma_ms: float | None = None
+        self.samples = 0
+        self.consecutive_failures = 0
+        self.in_flight = 0
+        self.stats = {"requests": 0, "failures": 0, "ejections": 0}
+        self._held: set[int] = set()
+        self._fds: list[int] | None = self._open_slots(slot_dir)
+
+    def _open_slots(self, slot_dir: str) -> list[int] | None:
+        name = hashlib.blake2b(self.url.encode(), digest_size=6).hexdigest()
+        try:
+            os.makedirs(slot_dir, exist_ok=True)
+            return [
+                os.open(os.path.join(slot_dir, f"{name}-{i}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+                for i in range(self.max_concurrency)
+            ]
+        except OSError as e:
+            logger.warning(f"Kokoro slot files unavailable ({e}) — concurrency cap for {self.url} is per process")
+            return None
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.ejected_until <= time.monotonic()
+
+    def free_slots(self) -> int:
+        if self._fds is None:
+            return self.max_concurrency - self.in_flight
+        free = 0
+        for i, fd in enumerate(self._fds):
+            if i in self._held:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            free += 1
+        return free
+
+    def try_acquire(self) -> int | None:
+        if self._fds is None:
+            return -1 if self.in_flight < self.max_concurrency else None
+        for i, fd in enumerate(self._fds):
+            if i in self._held:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            self._held.add(i)
+            return i
+        return None
+
+    def release(self, slot: int) -> None:
+        if self._fds is None or slot < 0:
+            return
+        fcntl.flock(self._fds[slot], fcntl.LOCK_UN)
+        self._held.discard(slot)
+
+    def snapshot(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "ejected": self.ejected_until > time.monotonic(),
+            "ewma_ms": round(self.ewma_ms, 1) if self.ewma_ms is not None else None,
+            "in_flight": self.in_flight,
+            **self.stats,
+        }
+
+
+class KokoroPool:
+    """Least-outstanding-requests balancing with admission control."""
+
+    def __init__(
+        self,
+        urls: list[str],
+        *,
+        slot_dir: str | None = None,
+        max_concurrency: int = 2,
+        max_queue: int = 8,
+        queue_timeout: float = 2.0,
+        probe_interval: float = 5.0,
+        eject_factor: float = 2.5,
+        eject_min_ms: float = 300.0,
+        eject_seconds: float = 30.0,
+        max_failures: int = 3,
+    ):
+        if not urls:
+            raise ValueError("KokoroPool needs at least one backend URL")
+        slot_dir = slot_dir or os.path.join(tempfile.gettempdir(), "kokoro-slots")
+        self.backends = [KokoroBackend(url.rstrip("/"), slot_dir, max_concurrency) for url in urls]
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.probe_interval = probe_interval
+        self.eject_factor = eject_factor
+        self.eject_min_ms = eject_min_ms
+        self.eject_seconds = eject_seconds
+        self.max_failures = max_failures
+        self._waiters = 0
+        self._released = asyncio.Event()
+        self._users = 0
+        self._probe_task: asyncio.Task | None = None
+        self.stats = {"queued": 0, "queue_ms_total": 0.0, "rejected": 0, "timeouts": 0}
+
+    # ── selection ────────────────────────────────────────────────────────
+
+    def _candidates(self) -> list[KokoroBackend]:
+        available = [b for b in self.backends if b.available]
+        if available:
+            return available
+        # Everything is down or ejected — still try the healthy ones, then anything
+        return [b for b in self.backends if b.healthy] or self.backends
+
+    def _pick(self) -> tuple[KokoroBackend, int] | None:
+        ranked = []
+        for backend in self._candidates():
+            free = backend.free_slots()
+            if free > 0:
+                outstanding = backend.max_concurrency - free
+                ranked.append((outstanding, backend.ewma_ms or 0.0, random.random(), backend))
+        ranked.sort(key=lambda r: r[:3])
+        for *_, backend in ranked:
+            slot = backend.try_acquire()
+            if slot is not None:
+                return backend, slot
+        return None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[KokoroBackend]:
+        """Hold a slot on the best backend for the duration of one request."""
+        self._ensure_prober()
+        picked = self._pick()
+        if picked is None:
+            if self._waiters >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise PoolSaturated(f"{self._waiters} requests already waiting")
+            self._waiters += 1
+            started = time.monotonic()
+            deadline = started + self.queue_timeout
+            try:
+                while picked is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats["timeouts"] += 1
+                        raise PoolSaturated(f"no Kokoro slot free after {self.queue_timeout:.1f}s")
+                    # Local releases wake us immediately; other processes' are polled
+                    self._released.clear()
+                    try:
+                        await asyncio.wait_for(self._released.wait(), timeout=min(0.025, remaining))
+                    except asyncio.TimeoutError:
+                        pass
+                    picked = self._pick()
+            finally:
+                self._waiters -= 1
+            self.stats["queued"] += 1
+            self.stats["queue_ms_total"] += (time.monotonic() - started) * 1000
+
+        backend, slot = picked
+        backend.in_flight += 1
+        backend.stats["requests"] += 1
+        try:
+            yield backend
+        finally:
+            backend.in_flight -= 1
+            backend.release(slot)
+            self._released.set()
+
+    # ── outcomes ─────────────────────────────────────────────────────────
+
+    def record_success(self, backend: KokoroBackend, first_audio_ms: float) -> None:
+        backend.consecutive_failures = 0
+        backend.samples += 1
+        backend.ewma_ms = first_audio_ms if backend.ewma_ms is None else 0.8 * backend.ewma_ms + 0.2 * first_audio_ms
+        self._maybe_eject(backend)
+
+    def record_failure(self, backend: KokoroBackend) -> None:
+        backend.stats["failures"] += 1
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= self.max_failures:
+            self._eject(backend, f"{backend.consecutive_failures} consecutive failures")
+
+    def _maybe_eject(self, backend: KokoroBackend) -> None:
+        if backend.samples < 5 or backend.ewma_ms is None or backend.ewma_ms < self.eject_min_ms:
+            return
+        peers = [b.ewma_ms for b in self.backends if b is not backend and b.available and b.ewma_ms is not None]
+        if peers and backend.ewma_ms > self.eject_factor * statistics.median(peers):
+            self._eject(backend, f"time-to-first-audio {backend.ewma_ms:.0f}ms vs peers {statistics.median(peers):.0f}ms")
+
+    def _eject(self, backend: KokoroBackend, reason: str) -> None:
+        if not any(b.available for b in self.backends if b is not backend):
+            return
+        backend.ejected_until = time.monotonic() + self.eject_seconds
+        backend.ewma_ms = None
+        backend.samples = 0
+        backend.consecutive_failures = 0
+        backend.stats["ejections"] += 1
+        logger.warning(f"Ejecting Kokoro backend {backend.url} for {self.eject_seconds:.0f}s: {reason}")
+
+    # ── health probes ────────────────────────────────────────────────────
+
+    def attach(self) -> None:
+        self._users += 1
+
+    def detach(self) -> None:
+        self._users = max(0, self._users - 1)
+        if self._users == 0 and self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+
+    def _ensure_prober(self) -> None:
+        if len(self.backends) < 2 or (self._probe_task is not None and not self._probe_task.done()):
+            return
+        self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop(), name="kokoro-pool-probe")
+
+    async def _probe_loop(self) -> None:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(2.0)) as client:
+            while True:
+                await asyncio.gather(*(self._probe(client, b) for b in self.backends))
+                await asyncio.sleep(self.probe_interval)
+
+    async def _probe(self, client: httpx.AsyncClient, backend: KokoroBackend) -> None:
+        try:
+            healthy = (await client.get(f"{backend.url}/")).status_code < 500
+        except httpx.HTTPError:
+            healthy = False
+        if healthy != backend.healthy:
+            logger.info(f"Kokoro backend {backend.url} is {'healthy' if healthy else 'DOWN'}")
+        backend.healthy = healthy
+
+    def snapshot(self) -> dict:
+        return {
+            "backends": [b.snapshot() for b in self.backends],
+            "waiting": self._waiters,
+            **self.stats,
+        }
+
+
+_pools: dict[tuple[str, ...], KokoroPool] = {}
+
+
+def get_pool(urls: list[str], **kwargs) -> KokoroPool:
+    """Process-wide pool per backend set, so health and latency state outlive one call."""
+    key = tuple(url.rstrip("/") for url in urls)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = KokoroPool(list(key), **kwargs)
+    return pool
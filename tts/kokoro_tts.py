@@ -2,13 +2,23 @@
 
 Kokoro-82M is self-hosted via kokoro-web Docker container which provides
 an OpenAI-compatible TTS API. This plugin wraps it for LiveKit Agents.
+
+By default audio is streamed: the response body is pushed to the emitter
+chunk by chunk as it arrives (raw 16-bit PCM, so nothing has to be decoded),
+instead of waiting for the whole MP3 — time-to-first-audio no longer grows
+with sentence length. `stream=False` keeps the old buffered behaviour.
+
+Given several `base_urls` (kokoro-web replicas), requests are spread over
+them by the process-wide KokoroPool in tts/kokoro_pool.py.
 """
+import asyncio
 import logging
+import time
 from dataclasses import dataclass
 
 import httpx
 
-from livekit.agents import utils
+from livekit.agents import APIConnectionError, APIStatusError, APITimeoutError, utils
 from livekit.agents.tts import (
     TTS,
     TTSCapabilities,
@@ -17,17 +27,26 @@ from livekit.agents.tts import (
 )
 from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
 
+from tts.kokoro_pool import KokoroBackend, KokoroPool, PoolSaturated, get_pool
+
 logger = logging.getLogger("kokoro-tts")
 
+_MIME_TYPES = {
+    "pcm": "audio/pcm",
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+}
+
 
 @dataclass
 class _KokoroOptions:
-    base_url: str
     api_key: str
     voice: str
     model: str
     speed: float
     sample_rate: int
+    response_format: str
+    stream: bool
 
 
 class ChunkedStream(BaseChunkedStream):
@@ -40,35 +59,75 @@ class ChunkedStream(BaseChunkedStream):
         opts: _KokoroOptions,
     ) -> None:
         super().__init__(tts=tts, input_text=input_text, conn_options=conn_options)
+        self._tts: KokoroTTS = tts
         self._opts = opts
 
     async def _run(self, output_emitter: AudioEmitter) -> None:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self._opts.base_url}/api/v1/audio/speech",
-                headers={
-                    "Authorization": f"Bearer {self._opts.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": self._opts.model,
-                    "voice": self._opts.voice,
-                    "input": self._input_text,
-                    "speed": self._opts.speed,
-                    "response_format": "mp3",
-                },
-            )
-            response.raise_for_status()
+        pool = self._tts._pool
+        try:
+            async with pool.acquire() as backend:
+                await self._synthesize(pool, backend, output_emitter)
+        except PoolSaturated as e:
+            raise APIConnectionError(f"Kokoro pool saturated: {e}") from e
 
-            output_emitter.initialize(
-                request_id=utils.shortuuid(),
-                sample_rate=self._opts.sample_rate,
-                num_channels=1,
-                mime_type="audio/mpeg",
-            )
+    async def _synthesize(self, pool: KokoroPool, backend: KokoroBackend, output_emitter: AudioEmitter) -> None:
+        client = self._tts._ensure_client()
+        request = client.build_request(
+            "POST",
+            f"{backend.url}/api/v1/audio/speech",
+            headers={
+                "Authorization": f"Bearer {self._opts.api_key}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": self._opts.model,
+                "voice": self._opts.voice,
+                "input": self._input_text,
+                "speed": self._opts.speed,
+                "response_format": self._opts.response_format,
+            },
+            timeout=httpx.Timeout(self._conn_options.timeout * 3, connect=self._conn_options.timeout),
+        )
+        started = time.perf_counter()
+        try:
+            response = await client.send(request, stream=self._opts.stream)
+            try:
+                if response.status_code >= 400:
+                    if response.status_code >= 500:
+                        pool.record_failure(backend)
+                    body = (await response.aread()).decode(errors="replace")[:300]
+                    raise APIStatusError(
+                        f"Kokoro returned {response.status_code} ({backend.url})",
+                        status_code=response.status_code,
+                        body=body,
+                    )
 
-            output_emitter.push(response.content)
-            output_emitter.flush()
+                output_emitter.initialize(
+                    request_id=utils.shortuuid(),
+                    sample_rate=self._opts.sample_rate,
+                    num_channels=1,
+                    mime_type=_MIME_TYPES[self._opts.response_format],
+                )
+
+                if self._opts.stream:
+                    first = True
+                    async for chunk in response.aiter_bytes():
+                        if first:
+                            pool.record_success(backend, (time.perf_counter() - started) * 1000)
+                            first = False
+                        output_emitter.push(chunk)
+                else:
+                    pool.record_success(backend, (time.perf_counter() - started) * 1000)
+                    output_emitter.push(response.content)
+                output_emitter.flush()
+            finally:
+                await response.aclose()
+        except httpx.TimeoutException as e:
+            pool.record_failure(backend)
+            raise APITimeoutError() from e
+        except httpx.HTTPError as e:
+            pool.record_failure(backend)
+            raise APIConnectionError(f"Kokoro request to {backend.url} failed: {e}") from e
 
 
 class KokoroTTS(TTS):
@@ -78,25 +137,63 @@ class KokoroTTS(TTS):
         self,
         *,
         base_url: str = "http://localhost:3000",
+        base_urls: list[str] | None = None,
         api_key: str = "kokoro-key",
         voice: str = "af_heart",
         model: str = "model_q8f16",
         speed: float = 1.0,
         sample_rate: int = 24000,
+        response_format: str = "pcm",
+        stream: bool = True,
+        max_concurrency: int = 2,
+        max_queue: int = 8,
+        queue_timeout: float = 2.0,
+        slot_dir: str | None = None,
     ):
         super().__init__(
             capabilities=TTSCapabilities(streaming=False),
             sample_rate=sample_rate,
             num_channels=1,
         )
+        if response_format not in _MIME_TYPES:
+            raise ValueError(f"Unsupported Kokoro response_format: {response_format}. Use: {', '.join(_MIME_TYPES)}")
         self._opts = _KokoroOptions(
-            base_url=base_url.rstrip("/"),
             api_key=api_key,
             voice=voice,
             model=model,
             speed=speed,
             sample_rate=sample_rate,
+            response_format=response_format,
+            stream=stream,
+        )
+        self._pool = get_pool(
+            base_urls or [base_url],
+            slot_dir=slot_dir,
+            max_concurrency=max_concurrency,
+            max_queue=max_queue,
+            queue_timeout=queue_timeout,
         )
+        self._pool.attach()
+        self._attached = True
+        self._client: httpx.AsyncClient | None = None
+        self._prewarm_task: asyncio.Task | None = None
+
+    @property
+    def model(self) -> str:
+        return self._opts.model
+
+    @property
+    def provider(self) -> str:
+        return "kokoro"
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        # One keep-alive pool per TTS instance (i.e. per call) instead of a
+        # fresh TCP connection per sentence.
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=60.0),
+            )
+        return self._client
 
     def synthesize(
         self,
@@ -110,3 +207,33 @@ class KokoroTTS(TTS):
             conn_options=conn_options,
             opts=self._opts,
         )
+
+    def prewarm(self) -> None:
+        """Open a keep-alive connection to each backend before the first sentence."""
+        if self._prewarm_task is not None:
+            return
+
+        async def _warm_one(url: str) -> None:
+            try:
+                await self._ensure_client().get(f"{url}/", timeout=5.0)
+            except Exception as e:
+                logger.debug(f"Kokoro prewarm failed for {url}: {e}")
+
+        async def _warm() -> None:
+            await asyncio.gather(*(_warm_one(b.url) for b in self._pool.backends))
+
+        try:
+            self._prewarm_task = asyncio.get_running_loop().create_task(_warm())
+        except RuntimeError:
+            pass
+
+    async def aclose(self) -> None:
+        if self._attached:
+            self._attached = False
+            self._pool.detach()
+        if self._prewarm_task is not None:
+            self._prewarm_task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        await super().aclose()
@@ -0,0 +1,524 @@
+"""Cross-call cache of synthesized agent phrases.
+
+The system prompt scripts a lot of what the agent says ("Let me take a quick
+peek at our schedule for you...", "Perfect, let me get that locked in for
+you...", the goodbye variations), so the same sentences are synthesized on
+every call at full provider latency and cost. CachedTTS sits in front of the
+Deepgram / ElevenLabs / Kokoro TTS and serves repeated sentences from a
+content-addressed store instead:
+
+  - key = provider + model + voice + sample rate + normalized text
+  - memory: per-process LRU bounded by bytes
+  - disk:   one raw PCM file per phrase under CACHE_DIR, read back through
+            mmap so every job process on the host shares the page cache
+
+Each job process serves a single call, so use counts live on disk too (one
+byte appended per use to <key>.uses): a phrase is written to the shared
+store once it has been spoken min_uses times on the host, which keeps
+one-off sentences (names, dates) out while a greeting said once per call is
+stored by the second call. Disk writes and pruning run in a worker thread.
+
+For a streaming provider (Deepgram, ElevenLabs) CachedTTS streams too: the
+reply is split into sentences, cached ones are pushed straight from the
+store and the rest go to the provider's own stream. For Kokoro it reports
+itself as non-streaming and the agent pipeline wraps it in LiveKit's
+StreamAdapter, so each sentence of a reply becomes one lookup.
+"""
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import re
+import tempfile
+import time
+import unicodedata
+from collections import OrderedDict
+
+from livekit.agents import tokenize, utils
+from livekit.agents.tts import (
+    TTS,
+    TTSCapabilities,
+    ChunkedStream as BaseChunkedStream,
+    SynthesizeStream as BaseSynthesizeStream,
+    AudioEmitter,
+)
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+
+logger = logging.getLogger("tts-phrase-cache")
+
+_WS_RE = re.compile(r"\s+")
+_PUNCT = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"', "…": "..."})
+
+# Host-wide pruning runs at most this often (stamped on a file in the directory)
+PRUNE_INTERVAL = 600
+# Use counts of phrases that never reached min_uses are forgotten after this
+USES_TTL = 7 * 24 * 3600
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form for cache keys: NFKC, straight quotes, single spaces.
+
+    Case and punctuation are kept — both change how the sentence is spoken.
+    """
+    return _WS_RE.sub(" ", unicodedata.normalize("NFKC", text).translate(_PUNCT)).strip()
+
+
+class PhraseCache:
+    """Content-addressed PCM store: in-memory LRU over an mmap'd directory."""
+
+    def __init__(
+        self,
+        directory: str,
+        memory_bytes: int = 32 * 1024 * 1024,
+        disk_bytes: int = 256 * 1024 * 1024,
+        max_chars: int = 200,
+        min_uses: int = 2,
+    ):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_chars = max_chars
+        self.min_uses = min_uses
+        self._memory: OrderedDict[str, bytes | mmap.mmap] = OrderedDict()
+        self._memory_size = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "uncacheable": 0, "disk_writes": 0}
+
+    def key(self, *, provider: str, model: str, voice: str, sample_rate: int, text: str) -> str | None:
+        """Cache key for one sentence, or None if it's too long to be worth caching."""
+        normalized = normalize_text(text)
+        if not normalized or len(normalized) > self.max_chars:
+            self.stats["uncacheable"] += 1
+            return None
+        raw = "\x1f".join((provider, model, voice, str(sample_rate), normalized))
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    def _path(self, key: str, suffix: str = ".pcm") -> str:
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    # ── lookup ───────────────────────────────────────────────────────────
+
+    def get(self, key: str) -> bytes | None:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return entry[:]
+
+        entry = self._map(key)
+        if entry is not None:
+            self.stats["disk_hits"] += 1
+            self._remember(key, entry)
+            return entry[:]
+
+        self.stats["misses"] += 1
+        return None
+
+    def stored(self, key: str) -> bool:
+        """Whether the phrase is already in the shared disk store."""
+        return isinstance(self._memory.get(key), mmap.mmap)
+
+    def _map(self, key: str) -> mmap.mmap | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)  # recency for disk pruning
+            return mapped
+        except (FileNotFoundError, ValueError):  # ValueError: empty file
+            return None
+        except OSError as e:
+            logger.debug(f"Phrase cache read failed for {key}: {e}")
+            return None
+
+    # ── store ────────────────────────────────────────────────────────────
+
+    async def put(self, key: str, pcm: bytes) -> None:
+        """Record one use of a phrase; it goes to disk (off the loop) once it
+        has been spoken min_uses times on the host."""
+        if not pcm or len(pcm) > self.memory_bytes or self.stored(key):
+            return
+        self._remember(key, pcm)
+        mapped = await asyncio.to_thread(self._persist, key, pcm)
+        if mapped is not None:
+            self._remember(key, mapped)
+
+    def _persist(self, key: str, pcm: bytes) -> mmap.mmap | None:
+        # Worker thread: count the use, write once it recurs, prune now and then
+        if self._count_use(key) < self.min_uses or not self._write(key, pcm):
+            return None
+        try:
+            os.remove(self._path(key, ".uses"))
+        except OSError:
+            pass
+        self._maybe_prune()
+        return self._map(key)
+
+    def _count_use(self, key: str) -> int:
+        """Host-wide use count: one byte appended per use (O_APPEND is atomic)."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd = os.open(self._path(key, ".uses"), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, b".")
+                return os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.debug(f"Phrase cache use count failed for {key}: {e}")
+            return 0
+
+    def _remember(self, key: str, entry: bytes | mmap.mmap) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = entry
+        self._memory_size += len(entry)
+        while self._memory_size > self.memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _write(self, key: str, pcm: bytes) -> bool:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".phrase-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(pcm)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Phrase cache write failed ({self.directory}): {e}")
+            return False
+        self.stats["disk_writes"] += 1
+        return True
+
+    def _maybe_prune(self) -> None:
+        # Processes live for one call, so the interval is tracked host-wide
+        stamp = os.path.join(self.directory, ".pruned")
+        try:
+            if time.time() - os.stat(stamp).st_mtime < PRUNE_INTERVAL:
+                return
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return
+        try:
+            with open(stamp, "w"):
+                pass
+        except OSError:
+            return
+        self._prune()
+
+    def _prune(self) -> None:
+        """Drop least-recently-used files once the directory exceeds disk_bytes,
+        and use counts that never reached min_uses within USES_TTL."""
+        expired = time.time() - USES_TTL
+        try:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pcm"):
+                    st = entry.stat()
+                    files.append((st.st_mtime, st.st_size, entry.path))
+                elif entry.name.endswith(".uses") and entry.stat().st_mtime < expired:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        if total <= self.disk_bytes:
+            return
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else 0.0
+
+
+class ChunkedStream(BaseChunkedStream):
+    def __init__(
+        self,
+        *,
+        tts: "CachedTTS",
+        input_text: str,
+        conn_options: APIConnectOptions,
+    ) -> None:
+        # The wrapped TTS does its own retries; retrying here as well would
+        # multiply them.
+        super().__init__(
+            tts=tts,
+            input_text=input_text,
+            conn_options=APIConnectOptions(max_retry=0, timeout=conn_options.timeout),
+        )
+        self._tts: CachedTTS = tts
+        self._wrapped_conn_options = conn_options
+
+    async def _run(self, output_emitter: AudioEmitter) -> None:
+        tts = self._tts
+        cache = tts.cache
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=tts.sample_rate,
+            num_channels=tts.num_channels,
+            mime_type="audio/pcm",
+        )
+
+        key = cache.key(
+            provider=tts.provider,
+            model=tts.model,
+            voice=tts.voice,
+            sample_rate=tts.sample_rate,
+            text=self._input_text,
+        )
+        if key is not None:
+            pcm = cache.get(key)
+            if pcm is not None:
+                tts.stats["hits"] += 1
+                output_emitter.push(pcm)
+                output_emitter.flush()
+                tts._store(key, pcm)
+                return
+        tts.stats["misses"] += 1
+
+        started = time.perf_counter()
+        audio = bytearray() if key is not None else None
+        async with tts.wrapped.synthesize(self._input_text, conn_options=self._wrapped_conn_options) as stream:
+            async for ev in stream:
+                frame = ev.frame
+                data = frame.data.tobytes()
+                output_emitter.push(data)
+                if audio is not None:
+                    if frame.sample_rate == tts.sample_rate and frame.num_channels == tts.num_channels:
+                        audio += data
+                    else:
+                        audio = None
+        output_emitter.flush()
+        tts.stats["synth_ms"] += (time.perf_counter() - started) * 1000
+
+        if key is not None and audio:
+            tts._store(key, bytes(audio))
+
+
+class SynthesizeStream(BaseSynthesizeStream):
+    """Sentence-by-sentence stream over a streaming provider.
+
+    Each complete sentence is looked up; a hit is pushed from the cache, a
+    miss gets its own stream on the wrapped TTS (over the provider's pooled
+    websocket) as soon as the sentence is complete, so later sentences
+    synthesize while earlier ones play. Audio comes out in sentence order.
+    """
+
+    def __init__(self, *, tts: "CachedTTS", conn_options: APIConnectOptions) -> None:
+        super().__init__(tts=tts, conn_options=APIConnectOptions(max_retry=0, timeout=conn_options.timeout))
+        self._tts: CachedTTS = tts
+        self._wrapped_conn_options = conn_options
+
+    async def _run(self, output_emitter: AudioEmitter) -> None:
+        tts = self._tts
+        cache = tts.cache
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=tts.sample_rate,
+            num_channels=tts.num_channels,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+
+        sentences = tts.sentence_tokenizer.stream()
+        # In sentence order: cached PCM, or the (frames, task) of a synthesis
+        parts: utils.aio.Chan[bytes | tuple[utils.aio.Chan[bytes], asyncio.Task]] = utils.aio.Chan()
+        syntheses: list[asyncio.Task] = []
+
+        async def _forward_input() -> None:
+            async for data in self._input_ch:
+                if isinstance(data, self._FlushSentinel):
+                    sentences.flush()
+                    continue
+                sentences.push_text(data)
+            sentences.end_input()
+
+        async def _dispatch() -> None:
+            try:
+                async for ev in sentences:
+                    text = ev.token.strip()
+                    if not text:
+                        continue
+                    self._mark_started()
+                    key = cache.key(
+                        provider=tts.provider,
+                        model=tts.model,
+                        voice=tts.voice,
+                        sample_rate=tts.sample_rate,
+                        text=text,
+                    )
+                    pcm = cache.get(key) if key is not None else None
+                    if pcm is not None:
+                        tts.stats["hits"] += 1
+                        tts._store(key, pcm)
+                        parts.send_nowait(pcm)
+                        continue
+                    tts.stats["misses"] += 1
+                    frames: utils.aio.Chan[bytes] = utils.aio.Chan()
+                    syntheses.append(asyncio.create_task(self._synthesize(text, key, frames)))
+                    parts.send_nowait((frames, syntheses[-1]))
+            finally:
+                parts.close()
+
+        async def _emit() -> None:
+            async for part in parts:
+                if isinstance(part, bytes):
+                    output_emitter.push(part)
+                else:
+                    frames, task = part
+                    async for data in frames:
+                        output_emitter.push(data)
+                    await task  # raises the provider's error
+                output_emitter.flush()
+
+        tasks = [
+            asyncio.create_task(_forward_input()),
+            asyncio.create_task(_dispatch()),
+            asyncio.create_task(_emit()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await sentences.aclose()
+            await utils.aio.cancel_and_wait(*tasks, *syntheses)
+
+    async def _synthesize(self, text: str, key: str | None, frames: utils.aio.Chan[bytes]) -> None:
+        tts = self._tts
+        started = time.perf_counter()
+        audio = bytearray() if key is not None else None
+        try:
+            async with tts.wrapped.stream(conn_options=self._wrapped_conn_options) as stream:
+                stream.push_text(text)
+                stream.end_input()
+                async for ev in stream:
+                    frame = ev.frame
+                    data = frame.data.tobytes()
+                    frames.send_nowait(data)
+                    if audio is not None:
+                        if frame.sample_rate == tts.sample_rate and frame.num_channels == tts.num_channels:
+                            audio += data
+                        else:
+                            audio = None
+        finally:
+            frames.close()
+        tts.stats["synth_ms"] += (time.perf_counter() - started) * 1000
+        if key is not None and audio:
+            tts._store(key, bytes(audio))
+
+
+class CachedTTS(TTS):
+    """Serve repeated sentences from a PhraseCache; synthesize the rest."""
+
+    def __init__(self, tts: TTS, *, cache: PhraseCache, voice: str, provider: str = ""):
+        # Streams only when the wrapped TTS does; otherwise the pipeline puts
+        # a StreamAdapter in front and calls synthesize() per sentence
+        super().__init__(
+            capabilities=TTSCapabilities(streaming=tts.capabilities.streaming),
+            sample_rate=tts.sample_rate,
+            num_channels=tts.num_channels,
+        )
+        self.wrapped = tts
+        self.cache = cache
+        self.voice = voice
+        self.sentence_tokenizer = tokenize.blingfire.SentenceTokenizer(retain_format=True)
+        self._provider = provider or tts.provider
+        self._label = tts.label
+        self._stores: set[asyncio.Task] = set()
+        # Per-call counters; cache.stats are process-wide
+        self.stats = {"hits": 0, "misses": 0, "synth_ms": 0.0}
+
+    class Markup(TTS.Markup):
+        def _provider_key(self) -> str:
+            assert isinstance(self._tts, CachedTTS)
+            return self._tts.wrapped.markup._provider_key()
+
+    def _set_expressive(self, enabled: bool) -> None:
+        super()._set_expressive(enabled)
+        self.wrapped._set_expressive(enabled)
+
+    @property
+    def model(self) -> str:
+        return self.wrapped.model
+
+    @property
+    def provider(self) -> str:
+        return self._provider
+
+    def synthesize(
+        self,
+        text: str,
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> ChunkedStream:
+        return ChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(
+        self,
+        *,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> SynthesizeStream:
+        if not self.wrapped.capabilities.streaming:
+            return super().stream(conn_options=conn_options)
+        return SynthesizeStream(tts=self, conn_options=conn_options)
+
+    def _store(self, key: str, pcm: bytes) -> None:
+        # In the background: the audio is already on its way to the caller
+        if self.cache.stored(key):
+            return
+        task = asyncio.create_task(self.cache.put(key, pcm))
+        self._stores.add(task)
+        task.add_done_callback(self._stores.discard)
+
+    def prewarm(self) -> None:
+        self.wrapped.prewarm()
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    async def aclose(self) -> None:
+        if self._stores:
+            await asyncio.gather(*self._stores, return_exceptions=True)
+        await self.wrapped.aclose()
+        await super().aclose()
+
+
+_phrase_cache: PhraseCache | None = None
+
+
+def get_phrase_cache() -> PhraseCache:
+    """The process-wide PhraseCache (its disk store is shared host-wide)."""
+    global _phrase_cache
+    if _phrase_cache is None:
+        from agent.config import Config
+
+        _phrase_cache = PhraseCache(
+            directory=os.path.join(Config.CACHE_DIR, "tts-phrases"),
+            memory_bytes=Config.TTS_PHRASE_CACHE_MEMORY_MB * 1024 * 1024,
+            disk_bytes=Config.TTS_PHRASE_CACHE_DISK_MB * 1024 * 1024,
+            max_chars=Config.TTS_PHRASE_CACHE_MAX_CHARS,
+        )
+    return _phrase_cache
+
+
+def phrase_cache_stats() -> dict:
+    cache = get_phrase_cache()
+    return {**cache.stats, "hit_rate": round(cache.hit_rate(), 3)}
@@ -1,5 +1,6 @@
 """TTS provider factory — swap providers via env config."""
 import logging
+import os
 from agent.config import Config
 
 logger = logging.getLogger("tts-provider")
@@ -10,12 +11,20 @@ def get_tts():
     provider = Config.TTS_PROVIDER.lower()
 
     if provider == "kokoro":
+        if not Config.KOKORO_BASE_URLS:
+            raise ValueError("TTS_PROVIDER=kokoro needs KOKORO_BASE_URL or KOKORO_BASE_URLS")
         from tts.kokoro_tts import KokoroTTS
         logger.info(f"Using Kokoro TTS (voice={Config.KOKORO_VOICE})")
         return KokoroTTS(
-            base_url=Config.KOKORO_BASE_URL,
+            base_urls=Config.KOKORO_BASE_URLS,
             api_key=Config.KOKORO_API_KEY,
             voice=Config.KOKORO_VOICE,
+            response_format=Config.KOKORO_RESPONSE_FORMAT,
+            stream=Config.KOKORO_STREAM,
+            max_concurrency=Config.KOKORO_MAX_CONCURRENCY,
+            max_queue=Config.KOKORO_MAX_QUEUE,
+            queue_timeout=Config.KOKORO_QUEUE_TIMEOUT,
+            slot_dir=os.path.join(Config.CACHE_DIR, "kokoro-slots"),
         )
 
     elif provider == "elevenlabs":